@@ -0,0 +1,647 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks the parsing and processing functions of produce_game_frames on synthetic games (see synthetic_games), at
+single-game and full-season scale.
+
+Every run is appended to a results file, one json record per line, along with the commit and the parameters used.
+Each function is compared against the best earlier run with the same parameters, and slowdowns beyond a tolerance are
+reported as regressions. The outputs of the faster implementations are also checked against the ones they replaced,
+and incremental builds are checked to rebuild only stale stages (see check_games). The script exits with status 1 if
+any regression or mismatch is found, so it can be used as a check.
+
+Run from the Capstone2 folder:
+    python benchmark_game_frames.py --season-games 100
+
+Created on Fri Oct 16 14:40:27 2026
+
+@author: Nathan Wodarz
+"""
+
+from pathlib import Path
+import argparse
+import gzip
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+import pandas as pd
+
+import produce_game_frames as pgf
+import synthetic_games
+
+#%% Constants
+BENCHMARK_RESULTS_PATH = pgf.DATA_FOLDER + 'benchmarks.jsonl'
+# A function is reported as a regression if it takes this fraction longer than the best earlier run.
+REGRESSION_TOLERANCE = 0.2
+# Functions benchmarked, in pipeline order.
+BENCHMARK_FUNCTIONS = ['parse_live_feed', 'process_live_feed_frame', 'parse_game_html_report',
+                       'parse_game_html_report_content', 'process_parsed_report', 'combine_frames',
+                       'process_combined_frame']
+# Games processed together by process_combined_frames in the season benchmark.
+BATCH_SIZE = 100
+# Kinds of description field, with the function that tested for each before classify_desc_field.
+DESC_FIELD_TESTS = {'zone': pgf.is_zone_field, 'name': pgf.is_name_field, 'assist': pgf.is_assist_field,
+                    'dist': pgf.is_dist_field, 'shot_type': pgf.is_shot_type_field,
+                    'miss_type': pgf.is_miss_type_field}
+
+#%% Time the pipeline functions
+def time_call(function, *args):
+    '''
+    Times a single call.
+
+    Parameters
+    ----------
+    function : callable
+        Function to call.
+    *args
+        Arguments for the function.
+
+    Returns
+    -------
+    result : object
+        Return value of the function.
+    seconds : float
+        Wall time of the call.
+
+    '''
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def clear_desc_caches():
+    '''
+    Empties the shot description caches of produce_game_frames.
+
+    Returns
+    -------
+    None.
+
+    '''
+    pgf.parse_shot_description_cached.cache_clear()
+    pgf.classify_desc_field.cache_clear()
+
+def parse_game_html_report_soup(html_report):
+    '''
+    Runs the older html report parser from the raw report, building the BeautifulSoup tree as the pipeline did.
+
+    Parameters
+    ----------
+    html_report : bytes
+        Html play-by-play report.
+
+    Returns
+    -------
+    Pandas data frame
+        Same as produce_game_frames.parse_game_html_report.
+
+    '''
+    return pgf.parse_game_html_report(BeautifulSoup(html_report, 'lxml'))
+
+def time_game(live_feed_link, live_feed, html_report):
+    '''
+    Runs the pipeline functions on one game, timing each of them. Inputs are copied before each call so that no
+    function sees data modified by another. Both html parsers are timed from the raw report with empty description
+    caches, so that neither gains from work done by the other.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game.
+    live_feed : dict
+        Live feed for the game.
+    html_report : bytes
+        Html play-by-play report for the game.
+
+    Returns
+    -------
+    timings : dict
+        Seconds taken by each function in BENCHMARK_FUNCTIONS.
+    combined : Pandas data frame
+        Combined frame of the game, before processing.
+
+    '''
+    timings = {}
+    feed_frame, timings['parse_live_feed'] = time_call(pgf.parse_live_feed, live_feed)
+    feed_frame, timings['process_live_feed_frame'] = time_call(pgf.process_live_feed_frame, feed_frame)
+    clear_desc_caches()
+    _, timings['parse_game_html_report'] = time_call(parse_game_html_report_soup, html_report)
+    clear_desc_caches()
+    html_frame, timings['parse_game_html_report_content'] = time_call(pgf.parse_game_html_report_content,
+                                                                      html_report)
+    html_frame['game_id'] = pgf.extract_id_from_live_feed_link(live_feed_link)
+    html_frame, timings['process_parsed_report'] = time_call(pgf.process_parsed_report, html_frame)
+    combined, timings['combine_frames'] = time_call(pgf.combine_frames, feed_frame.copy(), html_frame.copy())
+    _, timings['process_combined_frame'] = time_call(pgf.process_combined_frame, combined)
+    return timings, combined
+
+def benchmark_single_game(repeat=5, **game_options):
+    '''
+    Times the pipeline functions on one synthetic game, several times. The shot description caches are cleared
+    before each html parser runs (see time_game), so that every repetition starts cold.
+
+    Parameters
+    ----------
+    repeat : int, optional
+        Number of repetitions. The default is 5.
+    **game_options
+        Passed on to synthetic_games.make_game.
+
+    Returns
+    -------
+    dict
+        Median seconds taken by each function.
+
+    '''
+    live_feed, html_report = synthetic_games.make_game(**game_options)
+    live_feed_link = '/api/v1/game/' + game_options.get('game_id', '2018020001') + '/feed/live'
+    runs = []
+    for _ in range(repeat):
+        runs.append(time_game(live_feed_link, live_feed, html_report)[0])
+    return { name: statistics.median(run[name] for run in runs) for name in BENCHMARK_FUNCTIONS }
+
+def benchmark_season(n_games=1271, **game_options):
+    '''
+    Times the pipeline functions over a full synthetic season, processing the games one after the other as the
+    pipeline does. Generating the games is not timed. The html parsers start each game with empty description
+    caches (see time_game).
+
+    Parameters
+    ----------
+    n_games : int, optional
+        Number of games in the season. The default is 1271.
+    **game_options
+        Passed on to synthetic_games.make_season.
+
+    Returns
+    -------
+    dict
+        Total seconds taken by each function over the season, and 'games_per_sec' for all of the functions together.
+        Also gives the seconds taken by 'process_combined_frames', processing the games in batches of BATCH_SIZE
+        instead of one at a time, which isn't counted in the throughput.
+
+    '''
+    totals = dict.fromkeys(BENCHMARK_FUNCTIONS, 0.0)
+    totals['process_combined_frames'] = 0.0
+    batch = []
+    for live_feed_link, live_feed, html_report in synthetic_games.make_season(n_games=n_games, **game_options):
+        timings, combined = time_game(live_feed_link, live_feed, html_report)
+        for name, seconds in timings.items():
+            totals[name] += seconds
+        batch.append(combined)
+        if len(batch) == BATCH_SIZE:
+            totals['process_combined_frames'] += time_call(pgf.process_combined_frames, batch)[1]
+            batch = []
+    if batch:
+        totals['process_combined_frames'] += time_call(pgf.process_combined_frames, batch)[1]
+    # The older html parser isn't part of the pipeline, so leave it out of the throughput.
+    pipeline_seconds = sum(seconds for name, seconds in totals.items()
+                           if name not in ('parse_game_html_report', 'process_combined_frames'))
+    totals['games_per_sec'] = n_games / pipeline_seconds if pipeline_seconds > 0 else None
+    return totals
+
+#%% Check results
+def check_html_parsers(soup, html_report):
+    '''
+    Checks that the lxml html report parser gives the same frame as the BeautifulSoup parser.
+
+    Parameters
+    ----------
+    soup : BeautifulSoup
+        Parsed html report.
+    html_report : bytes
+        Html play-by-play report.
+
+    Returns
+    -------
+    None.
+
+    '''
+    pd.testing.assert_frame_equal(pgf.parse_game_html_report_content(html_report), pgf.parse_game_html_report(soup))
+
+def check_desc_classifier(soup):
+    '''
+    Checks that classify_desc_field finds the same kinds as the separate is_*_field tests for every field of the shot
+    descriptions in a report.
+
+    Parameters
+    ----------
+    soup : BeautifulSoup
+        Parsed html report.
+
+    Returns
+    -------
+    None.
+
+    '''
+    parts = [ part for row in soup.find_all('tr', class_=re.compile('(evenColor|oddColor)'))
+              if pgf.parse_row_event(row) in pgf.SHOT_EVENTS
+              for part in list(row.children)[11].get_text(separator=', ').split(', ') ]
+    classified = pd.DataFrame([ { kind: kind in pgf.classify_desc_field(part) for kind in DESC_FIELD_TESTS }
+                                for part in parts ], index=parts, columns=list(DESC_FIELD_TESTS))
+    tested = pd.DataFrame([ { kind: test(part) for kind, test in DESC_FIELD_TESTS.items() } for part in parts ],
+                          index=parts, columns=list(DESC_FIELD_TESTS))
+    pd.testing.assert_frame_equal(classified, tested)
+
+def check_alignment(feed_frame, html_frame):
+    '''
+    Checks that combine_frames gives the same rows as the outer merge on pgf.ALIGNMENT_KEYS that it replaced. Groups
+    of events sharing the alignment keys are left out, since the merge paired them in every combination.
+
+    Parameters
+    ----------
+    feed_frame : Pandas data frame
+        Processed live feed frame.
+    html_frame : Pandas data frame
+        Processed html report frame.
+
+    Returns
+    -------
+    None.
+
+    '''
+    keys = pgf.ALIGNMENT_KEYS
+    duplicated = pd.concat([ frame.loc[frame.duplicated(keys, keep=False), keys].astype(str)
+                             for frame in (feed_frame, html_frame) ]).drop_duplicates()
+    unique_parts = []
+    for frame in (feed_frame, html_frame):
+        flags = frame[keys].astype(str).merge(duplicated, how='left', on=keys, indicator=True)['_merge'] == 'both'
+        unique_parts.append(frame.loc[~flags.to_numpy()].reset_index(drop=True))
+    combined = pgf.combine_frames(*unique_parts)
+    merged = pd.merge(*unique_parts, how='outer', on=keys, suffixes=['_livefeed', '_htmlreport'])
+    pd.testing.assert_frame_equal(combined.sort_values(keys, kind='stable').reset_index(drop=True),
+                                  merged.sort_values(keys, kind='stable').reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+def check_batched_processing(combined_frames):
+    '''
+    Checks that process_combined_frames gives the same frame for each game as process_combined_frame.
+
+    Parameters
+    ----------
+    combined_frames : list of Pandas data frame
+        Combined frames of several games.
+
+    Returns
+    -------
+    None.
+
+    '''
+    for batched, combined in zip(pgf.process_combined_frames(combined_frames), combined_frames):
+        pd.testing.assert_frame_equal(batched, pgf.process_combined_frame(combined).reset_index(drop=True))
+
+@contextmanager
+def offline_working_folder(games):
+    '''
+    Runs the enclosed block in a new temporary working folder holding the raw files of the given games, with every
+    request answered from the (empty) recordings, so that nothing is downloaded. The working folder, HTTP settings,
+    and stage versions are restored afterwards.
+
+    Parameters
+    ----------
+    games : list of (str, dict, bytes)
+        Live feed link, live feed, and html report of each game, as generated by synthetic_games.make_season.
+
+    Yields
+    ------
+    folder : pathlib.Path
+        The temporary working folder.
+
+    '''
+    previous_folder = Path.cwd()
+    previous_recording = pgf.HTTP_SETTINGS['recording']
+    previous_versions = dict(pgf.STAGE_VERSIONS)
+    with tempfile.TemporaryDirectory() as folder_name:
+        folder = Path(folder_name)
+        for live_feed_link, live_feed, html_report in games:
+            synthetic_games.write_game(folder, pgf.extract_id_from_live_feed_link(live_feed_link), live_feed,
+                                       html_report)
+        os.chdir(folder)
+        pgf.configure_http_session(recording='replay')
+        try:
+            yield folder
+        finally:
+            os.chdir(previous_folder)
+            pgf.configure_http_session(recording=previous_recording)
+            pgf.STAGE_VERSIONS.clear()
+            pgf.STAGE_VERSIONS.update(previous_versions)
+
+def get_downstream_stages(stage):
+    '''
+    Lists a stage of the per-game pipeline and every stage that depends on it, directly or not.
+
+    Parameters
+    ----------
+    stage : str
+        One of the keys of produce_game_frames.STAGE_INPUTS.
+
+    Returns
+    -------
+    list of str
+        The stages, in build order.
+
+    '''
+    downstream = {stage}
+    for other, inputs in pgf.STAGE_INPUTS.items():
+        if downstream & set(inputs):
+            downstream.add(other)
+    return [ other for other in pgf.STAGE_INPUTS if other in downstream ]
+
+def check_stage_rebuilds(live_feed_link, live_feed, html_report):
+    '''
+    Checks that update_game_stages rebuilds only stale stages: everything once, nothing on a second run, nothing
+    outside html_frame and its downstream stages after STAGE_VERSIONS['html_frame'] changes, and exactly the
+    downstream stages of a raw file whose content changes.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game.
+    live_feed : dict
+        Live feed for the game.
+    html_report : bytes
+        Html play-by-play report for the game.
+
+    Returns
+    -------
+    None.
+
+    '''
+    with offline_working_folder([(live_feed_link, live_feed, html_report)]):
+        rebuilt = pgf.update_game_stages(live_feed_link)
+        assert rebuilt == ['feed_frame', 'html_frame', 'combined'], 'first build rebuilt ' + str(rebuilt)
+        rebuilt = pgf.update_game_stages(live_feed_link)
+        assert rebuilt == [], 'up to date game rebuilt ' + str(rebuilt)
+
+        # A new html_frame version reruns that stage. The combined frame is only rebuilt if the html frame changed.
+        pgf.STAGE_VERSIONS['html_frame'] += 1
+        rebuilt = pgf.update_game_stages(live_feed_link)
+        assert (rebuilt[:1] == ['html_frame']) and (set(rebuilt) <= set(get_downstream_stages('html_frame'))), \
+            'html_frame version change rebuilt ' + str(rebuilt)
+
+        # Changing the zone of a shot in the html report changes the html frame and so the combined frame.
+        # Only the changed file is rewritten, since gzip output depends on the time it is written.
+        with gzip.open(str(pgf.get_stage_output_path(live_feed_link, 'raw_html')), 'wb') as outfile:
+            outfile.write(html_report.replace(b'Off. Zone', b'Def. Zone', 1))
+        rebuilt = pgf.update_game_stages(live_feed_link)
+        assert rebuilt == get_downstream_stages('html_frame'), 'html report change rebuilt ' + str(rebuilt)
+
+        # Raw files whose modification time changed are hashed again, but with the same content nothing is rebuilt.
+        for stage in ('raw_feed', 'raw_html'):
+            path = pgf.get_stage_output_path(live_feed_link, stage)
+            os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+        rebuilt = pgf.update_game_stages(live_feed_link)
+        assert rebuilt == [], 'unchanged raw files rebuilt ' + str(rebuilt)
+
+        # Moving a shot changes the feed frame and so the combined frame.
+        changed_feed = json.loads(json.dumps(live_feed))
+        play = next(play for play in changed_feed['liveData']['plays']['allPlays']
+                    if (play['result']['eventTypeId'] in pgf.SHOT_EVENTS) and ('x' in play['coordinates']))
+        play['coordinates']['x'] += 1
+        with pgf.get_stage_output_path(live_feed_link, 'raw_feed').open('w') as outfile:
+            json.dump(changed_feed, outfile)
+        rebuilt = pgf.update_game_stages(live_feed_link)
+        assert rebuilt == get_downstream_stages('feed_frame'), 'live feed change rebuilt ' + str(rebuilt)
+
+def check_batch_resume(games):
+    '''
+    Checks that run_batch checkpoints and dead-letters games: a game without an html report is dead-lettered with its
+    error while the others are checkpointed, a second run builds nothing, and a retry builds the failed game once its
+    report is back.
+
+    Parameters
+    ----------
+    games : list of (str, dict, bytes)
+        At least two games, as generated by synthetic_games.make_season. The second one is made to fail.
+
+    Returns
+    -------
+    None.
+
+    '''
+    with offline_working_folder(games) as folder:
+        links = [ live_feed_link for live_feed_link, _, _ in games ]
+        game_ids = [ pgf.extract_id_from_live_feed_link(live_feed_link) for live_feed_link in links ]
+        failed_id = game_ids[1]
+        # Requests are replayed from empty recordings, so the missing report can't be downloaded.
+        html_report_path = pgf.get_game_html_report_path(links[1])
+        html_report_path.unlink()
+
+        summary = pgf.run_batch(links, name='check')
+        assert list(summary.loc[~summary['ok'], 'game_id']) == [failed_id], \
+            'failed games ' + str(list(summary.loc[~summary['ok'], 'game_id']))
+        dead_letters = pgf.read_dead_letters('check')
+        assert list(dead_letters['game_id']) == [failed_id], 'dead letters ' + str(list(dead_letters['game_id']))
+        assert dead_letters['error'].iloc[0], 'dead letter without an error'
+        checkpointed = pgf.read_batch_checkpoint('check')
+        assert checkpointed == set(game_ids) - {failed_id}, 'checkpointed ' + str(sorted(checkpointed))
+
+        summary = pgf.run_batch(links, name='check')
+        assert len(summary) == 0, 'second run built ' + str(list(summary['game_id']))
+
+        synthetic_games.write_game(folder, failed_id, games[1][1], games[1][2])
+        summary = pgf.run_batch(links, name='check', retry=True)
+        assert list(summary['game_id']) == [failed_id] and summary['ok'].all(), \
+            'retry built ' + str(summary[['game_id', 'ok']].to_dict('records'))
+        assert len(pgf.read_dead_letters('check')) == 0, 'dead letters left after retry'
+        assert pgf.read_batch_checkpoint('check') == set(game_ids), 'not every game checkpointed after retry'
+
+def check_games(n_games, **game_options):
+    '''
+    Checks that the faster implementations give the same results as the ones they replaced, on a number of synthetic
+    games: the lxml and BeautifulSoup html parsers, classify_desc_field and the is_*_field tests, combine_frames and an
+    outer merge, and batched and per-game processing of combined frames. Also checks on the first games that
+    update_game_stages rebuilds only stale stages and that run_batch resumes and retries correctly (see
+    check_stage_rebuilds and check_batch_resume).
+
+    Parameters
+    ----------
+    n_games : int
+        Number of games to check.
+    **game_options
+        Passed on to synthetic_games.make_season.
+
+    Returns
+    -------
+    list of str
+        A description of each mismatch found. Empty if every check passed.
+
+    '''
+    failures = []
+    combined_frames = []
+    games = []
+
+    def check(name, live_feed_link, function, *args):
+        try:
+            function(*args)
+        except AssertionError as err:
+            failures.append(name + ' (' + str(live_feed_link) + '): ' + str(err).strip().split('\n')[0])
+
+    for live_feed_link, live_feed, html_report in synthetic_games.make_season(n_games=n_games, **game_options):
+        if len(games) < 3:
+            games.append((live_feed_link, live_feed, html_report))
+        soup = BeautifulSoup(html_report, 'lxml')
+        check('html parsers', live_feed_link, check_html_parsers, soup, html_report)
+        check('description fields', live_feed_link, check_desc_classifier, soup)
+        feed_frame = pgf.process_live_feed_frame(pgf.parse_live_feed(live_feed))
+        html_frame = pgf.parse_game_html_report_content(html_report)
+        html_frame['game_id'] = pgf.extract_id_from_live_feed_link(live_feed_link)
+        html_frame = pgf.process_parsed_report(html_frame)
+        check('alignment', live_feed_link, check_alignment, feed_frame.copy(), html_frame.copy())
+        combined_frames.append(pgf.combine_frames(feed_frame, html_frame))
+    check('batched processing', None, check_batched_processing, combined_frames)
+    check('stage rebuilds', games[0][0], check_stage_rebuilds, *games[0])
+    if len(games) >= 2:
+        check('batch resume', None, check_batch_resume, games)
+    return failures
+
+#%% Track results over time
+def get_commit():
+    '''
+    Obtains the current git commit, if available.
+
+    Returns
+    -------
+    str
+        Abbreviated commit hash, with '-dirty' appended if there are uncommitted changes. None if git isn't available.
+
+    '''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                               text=True, check=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def read_results(results_path):
+    '''
+    Reads earlier benchmark results.
+
+    Parameters
+    ----------
+    results_path : pathlib.Path
+        Results file, one json record per line.
+
+    Returns
+    -------
+    list of dict
+        Earlier results, oldest first. Empty if the file doesn't exist.
+
+    '''
+    if not results_path.exists():
+        return []
+    with results_path.open('r') as infile:
+        return [ json.loads(line) for line in infile if line.strip() ]
+
+def find_regressions(result, earlier_results, tolerance=REGRESSION_TOLERANCE):
+    '''
+    Compares a result with the best earlier result with the same parameters.
+
+    Parameters
+    ----------
+    result : dict
+        Result of this run.
+    earlier_results : list of dict
+        Earlier results. See read_results.
+    tolerance : float, optional
+        Fraction by which a function may be slower than its best earlier time. The default is REGRESSION_TOLERANCE.
+
+    Returns
+    -------
+    Pandas DataFrame
+        One row per scale and function with the current and best earlier seconds, the ratio of the two, and whether
+        it is a regression.
+
+    '''
+    comparable = [ earlier for earlier in earlier_results if earlier['parameters'] == result['parameters'] ]
+    rows = []
+    for scale in ('single_game', 'season'):
+        for name in BENCHMARK_FUNCTIONS + ['process_combined_frames']:
+            # Earlier runs may not have timed every function.
+            best = min((earlier[scale][name] for earlier in comparable if (earlier.get(scale) or {}).get(name)),
+                       default=None)
+            current = result[scale].get(name) if result.get(scale) else None
+            if (best is None) or (current is None):
+                continue
+            rows.append({'scale': scale, 'function': name, 'seconds': current, 'best_seconds': best,
+                         'ratio': current / best if best > 0 else None,
+                         'regression': current > best * (1 + tolerance)})
+    return pd.DataFrame(rows, columns=['scale', 'function', 'seconds', 'best_seconds', 'ratio', 'regression'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark produce_game_frames on synthetic games.')
+    parser.add_argument('--events', type=int, default=synthetic_games.DEFAULT_EVENT_COUNT,
+                        help='Events per game. Default: ' + str(synthetic_games.DEFAULT_EVENT_COUNT) + '.')
+    parser.add_argument('--shot-share', type=float, default=synthetic_games.DEFAULT_SHOT_SHARE,
+                        help='Fraction of events that are shots. Default: ' +
+                        str(synthetic_games.DEFAULT_SHOT_SHARE) + '.')
+    parser.add_argument('--on-ice', type=str, default=None,
+                        help='Single on-ice situation used for every event, as away and home positions separated '
+                        'by a colon. Example: CLRDDG:CLDDG. Default: a realistic mix.')
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions for the single-game benchmark. Default: 5.')
+    parser.add_argument('--season-games', type=int, default=1271,
+                        help='Games in the season benchmark. Use 0 to skip it. Default: 1271.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic games. Default: 0.')
+    parser.add_argument('--results', type=str, default=BENCHMARK_RESULTS_PATH,
+                        help='Results file, relative to the working directory. Default: ' + BENCHMARK_RESULTS_PATH +
+                        '.')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help='Allowed slowdown relative to the best earlier run. Default: ' +
+                        str(REGRESSION_TOLERANCE) + '.')
+    parser.add_argument('--check-games', type=int, default=20,
+                        help='Games on which outputs are checked against the implementations they replaced. Use 0 to '
+                        'skip the checks. Default: 20.')
+    parser.add_argument('--no-save', action='store_true', help='Don\'t append this run to the results file.')
+    args = parser.parse_args()
+
+    game_options = {'n_events': args.events, 'shot_share': args.shot_share, 'seed': args.seed}
+    if args.on_ice is not None:
+        game_options['on_ice_shapes'] = {tuple(args.on_ice.split(':')): 1.0}
+
+    result = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'parameters': {'events': args.events, 'shot_share': args.shot_share, 'on_ice': args.on_ice,
+                       'repeat': args.repeat, 'season_games': args.season_games, 'seed': args.seed},
+        'single_game': benchmark_single_game(repeat=args.repeat, **game_options),
+        'season': benchmark_season(n_games=args.season_games, **game_options) if args.season_games > 0 else None
+    }
+
+    timings = pd.DataFrame({'single_game': result['single_game']})
+    if result['season'] is not None:
+        timings = timings.join(pd.Series(result['season'], name='season').drop('games_per_sec'), how='outer')
+    print(timings.to_string())
+    if result['season'] is not None:
+        print('Season throughput: ' + format(result['season']['games_per_sec'], '.2f') + ' games/sec')
+
+    results_path = Path.cwd().joinpath(args.results)
+    regressions = find_regressions(result, read_results(results_path), tolerance=args.tolerance)
+    if len(regressions) > 0:
+        print(regressions.to_string(index=False))
+    if not args.no_save:
+        results_path.parent.resolve().mkdir(parents=True, exist_ok=True)
+        with results_path.open('a') as outfile:
+            outfile.write(json.dumps(result) + '\n')
+    failures = check_games(args.check_games, **game_options) if args.check_games > 0 else []
+    for failure in failures:
+        print('Mismatch: ' + failure)
+    if regressions['regression'].any():
+        print('Regressions found: ' + ', '.join(regressions.loc[regressions['regression'], 'scale'] + '/' +
+                                                regressions.loc[regressions['regression'], 'function']))
+    return 1 if regressions['regression'].any() or failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
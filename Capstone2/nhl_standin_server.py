@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the NHL stats API and the html report server, so that the downloaders in produce_game_frames can be
+load-tested, and pipeline throughput measured, without network access.
+
+Requests are answered from recorded responses (see HTTP_SETTINGS['recording'] in produce_game_frames) when there is
+one, and otherwise from synthetic games (see synthetic_games): season schedules, live feeds, and PL*.HTM play-by-play
+reports. Latency, error rates, and throttling can be set, so that the concurrency and retry behavior of the
+downloaders can be benchmarked reproducibly. Responses carry ETag and Last-Modified validators, and conditional
+requests for unchanged content are answered with 304 Not Modified.
+
+Run from the Capstone2 folder:
+    python nhl_standin_server.py --port 8000 --latency 0.05 --error-rate 0.02 --rate-limit 20
+and point produce_game_frames at it:
+    python produce_game_frames.py --api-root-url http://localhost:8000 \\
+        --html-report-root-url http://localhost:8000/scores/htmlreports
+
+Created on Fri Oct 16 21:05:48 2026
+
+@author: Nathan Wodarz
+"""
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from datetime import date, timedelta
+from functools import lru_cache
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+import produce_game_frames as pgf
+import synthetic_games
+
+logger = logging.getLogger(__name__)
+
+#%% Constants
+DEFAULT_PORT = 8000
+# Number of regular season games in each synthetic season.
+DEFAULT_SEASON_GAMES = 1271
+# Synthetic games scheduled on each calendar date, starting from SEASON_START.
+GAMES_PER_DATE = 8
+# Month and day of the first game of each synthetic season.
+SEASON_START = (10, 3)
+# Status of the responses given for simulated server errors. All of them are retried by produce_game_frames.http_get.
+ERROR_STATUSES = (500, 502, 503, 504)
+# Last-Modified date given for synthetic responses, which never change.
+SYNTHETIC_LAST_MODIFIED = 'Mon, 01 Jul 2019 00:00:00 GMT'
+# Seconds clients are asked to wait when throttled.
+THROTTLE_RETRY_AFTER = 1
+# Paths served, with the parts of each path needed to build the response.
+SCHEDULE_PATH = re.compile(r'^/api/v1/schedule$')
+LIVE_FEED_PATH = re.compile(r'^/api/v1/game/(\d{10})/feed/live$')
+HTML_REPORT_PATH = re.compile(r'^/scores/htmlreports/(\d{8})/PL(\d{6})\.HTM$')
+
+#%% Synthetic responses
+@lru_cache(maxsize=64)
+def get_synthetic_game(game_id):
+    '''
+    Generates a synthetic game, reusing recent ones since the live feed and the html report of a game are usually
+    requested close together.
+
+    Parameters
+    ----------
+    game_id : str
+        Ten-character game id. Example: '2018020240'.
+
+    Returns
+    -------
+    live_feed : bytes
+        Json live feed for the game.
+    html_report : bytes
+        Html play-by-play report for the game.
+
+    '''
+    live_feed, html_report = synthetic_games.make_game(game_id, seed=int(game_id))
+    return json.dumps(live_feed).encode('utf-8'), html_report
+
+def make_schedule(season, n_games, start_date=None, end_date=None, today=None):
+    '''
+    Produces the schedule of a synthetic season, in the layout used by the statsapi.
+
+    Parameters
+    ----------
+    season : str
+        The season. Example: '20182019'.
+    n_games : int
+        Number of regular season games.
+    start_date, end_date : datetime.date, optional
+        First and last dates to include. If None, the schedule isn't limited. The default is None.
+    today : datetime.date, optional
+        Games before this date are final, and the others are scheduled. If None, uses the current date. The default
+        is None.
+
+    Returns
+    -------
+    dict
+        Schedule, with the games grouped by calendar date.
+
+    '''
+    today = date.today() if today is None else today
+    first_date = date(int(season[:4]), *SEASON_START)
+    dates = []
+    for k in range(n_games):
+        game_day = first_date + timedelta(days=k // GAMES_PER_DATE)
+        if ((start_date is not None) and (game_day < start_date)) or ((end_date is not None) and (game_day > end_date)):
+            continue
+        game_date = game_day.isoformat()
+        if (not dates) or (dates[-1]['date'] != game_date):
+            dates.append({'date': game_date, 'games': []})
+        game_id = season[:4] + '02' + '{:04d}'.format(k + 1)
+        state = ('Final', 'Final') if game_day < today else ('Preview', 'Scheduled')
+        dates[-1]['games'].append({'gamePk': int(game_id), 'link': '/api/v1/game/' + game_id + '/feed/live',
+                                   'gameType': 'R', 'season': season, 'gameDate': game_date + 'T23:00:00Z',
+                                   'status': {'abstractGameState': state[0], 'detailedState': state[1]}})
+    return {'totalGames': sum(len(game_date['games']) for game_date in dates), 'dates': dates}
+
+def get_synthetic_response(path, query, n_games, today=None):
+    '''
+    Builds the synthetic response for a request.
+
+    Parameters
+    ----------
+    path : str
+        Path of the request.
+    query : dict
+        Query of the request, as given by urllib.parse.parse_qs.
+    n_games : int
+        Number of regular season games in each season.
+    today : datetime.date, optional
+        Date separating final games from scheduled ones. See make_schedule. The default is None.
+
+    Returns
+    -------
+    status : int
+        Status of the response.
+    content_type : str
+        Content type of the response.
+    body : bytes
+        Body of the response.
+
+    '''
+    if SCHEDULE_PATH.match(path):
+        if 'season' in query:
+            schedule = make_schedule(query['season'][0], n_games, today=today)
+        elif ('startDate' in query) and ('endDate' in query):
+            start_date = date.fromisoformat(query['startDate'][0])
+            end_date = date.fromisoformat(query['endDate'][0])
+            # A range can span the end of one season and the start of the next.
+            seasons = { str(year) + str(year + 1) for year in range(start_date.year - 1, end_date.year + 1) }
+            schedules = [ make_schedule(season, n_games, start_date, end_date, today) for season in sorted(seasons) ]
+            schedule = {'totalGames': sum(part['totalGames'] for part in schedules),
+                        'dates': [ game_date for part in schedules for game_date in part['dates'] ]}
+        else:
+            return 400, 'application/json', b'{"message": "Missing season or date range"}'
+        return 200, 'application/json', json.dumps(schedule).encode('utf-8')
+    match = LIVE_FEED_PATH.match(path)
+    if match and (int(match.group(1)[-4:]) <= n_games):
+        return 200, 'application/json', get_synthetic_game(match.group(1))[0]
+    match = HTML_REPORT_PATH.match(path)
+    if match and (int(match.group(2)[-4:]) <= n_games):
+        game_id = match.group(1)[:4] + match.group(2)
+        return 200, 'text/html', get_synthetic_game(game_id)[1]
+    return 404, 'text/plain', b'Not found'
+
+#%% Server
+class StandinHandler(BaseHTTPRequestHandler):
+    '''
+    Answers GET requests as described in the module documentation. Settings are read from the server; see
+    make_server.
+    '''
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.count_request()
+        status, headers, body = self.get_response()
+        if status == 200:
+            status, headers, body = self.apply_validators(headers, body)
+        if server.latency > 0:
+            time.sleep(server.latency * random.uniform(1 - server.jitter, 1 + server.jitter))
+        if ('gzip' in self.headers.get('Accept-Encoding', '')) and (len(body) > 0):
+            body = gzip.compress(body, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+        headers['Content-Length'] = str(len(body))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        server.count_status(status)
+
+    def get_response(self):
+        '''
+        Builds the response to the current request, applying throttling and simulated errors first.
+
+        Returns
+        -------
+        status : int
+            Status of the response.
+        headers : dict
+            Headers of the response.
+        body : bytes
+            Body of the response, not yet compressed.
+
+        '''
+        server = self.server
+        if not server.acquire_token():
+            return 429, {'Retry-After': str(THROTTLE_RETRY_AFTER), 'Content-Type': 'text/plain'}, b'Too many requests'
+        error_status = server.draw_error_status()
+        if error_status is not None:
+            return error_status, {'Content-Type': 'text/plain'}, b'Simulated error'
+        if server.recording_folder is not None:
+            recorded = pgf.read_recording(self.path, server.recording_folder)
+            if recorded is not None:
+                return recorded.status_code, dict(recorded.headers), recorded.content
+        if not server.synthetic:
+            return 404, {'Content-Type': 'text/plain'}, b'Not recorded'
+        parsed = urlparse(self.path)
+        status, content_type, body = get_synthetic_response(parsed.path, parse_qs(parsed.query), server.season_games,
+                                                            server.today)
+        headers = {'Content-Type': content_type}
+        if status == 200:
+            headers['Last-Modified'] = SYNTHETIC_LAST_MODIFIED
+        return status, headers, body
+
+    def apply_validators(self, headers, body):
+        '''
+        Adds an ETag to a successful response, and replaces it with 304 Not Modified if the request is conditional and
+        the client's copy is current.
+
+        Parameters
+        ----------
+        headers : dict
+            Headers of the response.
+        body : bytes
+            Body of the response.
+
+        Returns
+        -------
+        status : int
+            200, or 304 if the client's copy is current.
+        headers : dict
+            Headers of the response, including the validators.
+        body : bytes
+            Body of the response. Empty for 304.
+
+        '''
+        # Recorded responses keep the header names used by the original server.
+        names = { name.lower(): name for name in headers }
+        etag_name = names.get('etag', 'ETag')
+        headers.setdefault(etag_name, '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"')
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            not_modified = headers[etag_name] in [ tag.strip() for tag in if_none_match.split(',') ]
+        else:
+            if_modified_since = self.headers.get('If-Modified-Since')
+            not_modified = (if_modified_since is not None) and \
+                (if_modified_since == headers.get(names.get('last-modified', 'Last-Modified')))
+        if not_modified:
+            return 304, { name: value for name, value in headers.items()
+                          if name.lower() in ('etag', 'last-modified') }, b''
+        return 200, headers, body
+
+    def log_message(self, format, *args):
+        logger.debug(self.address_string() + ' ' + format % args)
+
+class StandinServer(ThreadingHTTPServer):
+    '''
+    Threaded HTTP server holding the settings and request counts of the stand-in. See make_server.
+    '''
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, jitter=0.5, error_rate=0.0, rate_limit=None, burst=None,
+                 recording_folder=None, synthetic=True, season_games=DEFAULT_SEASON_GAMES, seed=0, today=None):
+        super().__init__(address, StandinHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        # The bucket must hold at least one token, or every request would be throttled.
+        self.burst = burst if burst is not None else max(1, rate_limit or 0)
+        self.recording_folder = recording_folder
+        self.synthetic = synthetic
+        self.season_games = season_games
+        self.today = today
+        # Random numbers for simulated errors are drawn under the lock (see draw_error_status), so that a seeded run
+        # fails the same requests.
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = self.burst
+        self.tokens_updated = time.monotonic()
+        self.requests = 0
+        self.statuses = {}
+
+    def acquire_token(self):
+        '''
+        Takes a token from the token bucket used for throttling.
+
+        Returns
+        -------
+        bool
+            True if the request is allowed, False if it should be throttled. Always True without a rate limit.
+
+        '''
+        if not self.rate_limit:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.tokens_updated) * self.rate_limit)
+            self.tokens_updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def draw_error_status(self):
+        '''
+        Decides whether the current request gets a simulated error. Both random numbers for a request are drawn under
+        the lock, so that the n-th request to be decided gets the same outcome in every run with the same seed.
+
+        Returns
+        -------
+        int or None
+            One of ERROR_STATUSES, or None if the request should be answered normally.
+
+        '''
+        with self.lock:
+            if self.rng.random() < self.error_rate:
+                return self.rng.choice(ERROR_STATUSES)
+            return None
+
+    def count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def count_status(self, status):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def get_stats(self):
+        '''
+        Obtains the request counts.
+
+        Returns
+        -------
+        dict
+            Total number of 'requests', and the number of responses given with each status under 'statuses'.
+
+        '''
+        with self.lock:
+            return {'requests': self.requests, 'statuses': dict(self.statuses)}
+
+def make_server(port=DEFAULT_PORT, host='localhost', **settings):
+    '''
+    Creates a stand-in server.
+
+    Parameters
+    ----------
+    port : int, optional
+        Port to listen on. Use 0 for any free port. The default is DEFAULT_PORT.
+    host : str, optional
+        Address to listen on. The default is 'localhost'.
+    **settings
+        Passed on to StandinServer:
+            latency: mean delay in seconds added to each response. Default: 0.
+            jitter: the delay varies uniformly by this fraction of the latency. Default: 0.5.
+            error_rate: fraction of requests answered with one of ERROR_STATUSES. Default: 0.
+            rate_limit: requests per second allowed before answering with 429. Default: None, for no limit.
+            burst: requests allowed at once before throttling. Default: rate_limit, but at least 1.
+            recording_folder: folder of recorded responses to serve, relative to the working directory. Default: None.
+            synthetic: if True, answers requests that weren't recorded with synthetic data. Default: True.
+            season_games: number of regular season games in each synthetic season. Default: DEFAULT_SEASON_GAMES.
+            seed: seed for the simulated errors. Default: 0.
+            today: games in synthetic schedules before this datetime.date are final. Default: None, for the current
+                date.
+
+    Returns
+    -------
+    StandinServer
+        The server, not yet serving.
+
+    '''
+    return StandinServer((host, port), **settings)
+
+def start_server(port=0, host='localhost', **settings):
+    '''
+    Starts a stand-in server in a background thread, for use from benchmarks.
+
+    Parameters
+    ----------
+    port : int, optional
+        Port to listen on. The default is 0, for any free port.
+    host : str, optional
+        Address to listen on. The default is 'localhost'.
+    **settings
+        See make_server.
+
+    Returns
+    -------
+    server : StandinServer
+        The running server. Call its shutdown method to stop it.
+    base_url : str
+        Base URL of the server, for use with produce_game_frames.set_base_urls. Html reports are served under
+        base_url + '/scores/htmlreports'.
+
+    '''
+    server = make_server(port, host, **settings)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, 'http://' + host + ':' + str(server.server_address[1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded or synthetic NHL schedules, live feeds, and html '
+                                     'reports.')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Default: ' + str(DEFAULT_PORT) + '.')
+    parser.add_argument('--host', type=str, default='localhost', help='Default: localhost.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mean seconds added to each response. Default: 0.')
+    parser.add_argument('--jitter', type=float, default=0.5,
+                        help='Latency varies uniformly by this fraction. Default: 0.5.')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with a server error. Default: 0.')
+    parser.add_argument('--rate-limit', type=float, default=None,
+                        help='Requests per second allowed before answering with 429. Default: no limit.')
+    parser.add_argument('--burst', type=int, default=None,
+                        help='Requests allowed at once before throttling. Default: the rate limit, but at least 1.')
+    parser.add_argument('--recordings', type=str, default=None,
+                        help='Folder of recorded responses to serve, such as ' + pgf.HTTP_SETTINGS['recording_folder']
+                        + '. Default: none.')
+    parser.add_argument('--no-synthetic', action='store_true',
+                        help='Answer requests that weren\'t recorded with 404 instead of synthetic data.')
+    parser.add_argument('--season-games', type=int, default=DEFAULT_SEASON_GAMES,
+                        help='Regular season games in each synthetic season. Default: ' + str(DEFAULT_SEASON_GAMES)
+                        + '.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the simulated errors. Default: 0.')
+    parser.add_argument('--today', type=date.fromisoformat, default=None,
+                        help='Games in synthetic schedules before this date (YYYY-MM-DD) are final. Default: the '
+                        'current date.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    server = make_server(args.port, args.host, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                         rate_limit=args.rate_limit, burst=args.burst, recording_folder=args.recordings,
+                         synthetic=not args.no_synthetic, season_games=args.season_games, seed=args.seed,
+                         today=args.today)
+    logger.info('Serving on http://' + args.host + ':' + str(server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info('Request counts: ' + json.dumps(server.get_stats()))
+
+if __name__ == '__main__':
+    main()
@@ -8,16 +8,80 @@ Created on Fri Nov 27 13:16:44 2020
 """
 
 from pathlib import Path
-import requests
+import importlib.util
+import sys
 import json
-import pandas as pd
-from bs4 import BeautifulSoup
 import pickle
 import re
-from collections import Counter
-import numpy as np
 import logging
-logging.basicConfig(filename='logs.log', level=logging.INFO, format='%(asctime)s %(message)s', datefmt='%m/%d/%Y %I:%M:%S %p')
+try:
+    # orjson decodes the live feeds several times faster than json, but isn't required.
+    import orjson
+except ImportError:
+    orjson = None
+import threading
+import time
+import random
+import os
+import gzip
+import mmap
+import hashlib
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import datetime, date, timedelta
+import argparse
+from functools import partial, lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+class MissingModule:
+    '''
+    Stands in for a module that isn't installed, raising ModuleNotFoundError when one of its attributes is used
+    rather than when this module is imported.
+    '''
+
+    def __init__(self, name):
+        self.__name = name
+
+    def __getattr__(self, attribute):
+        raise ModuleNotFoundError('No module named ' + repr(self.__name), name=self.__name)
+
+def lazy_import(name):
+    '''
+    Imports a module or package the first time one of its attributes is used, so that importing this module stays
+    fast for callers that only need a few helpers. A missing module only raises ModuleNotFoundError once it is used.
+
+    Parameters
+    ----------
+    name : str
+        Full name of the module. Example: 'pandas'.
+
+    Returns
+    -------
+    module or MissingModule
+        The module, which is only executed on first attribute access, or a MissingModule if it isn't installed.
+
+    '''
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return MissingModule(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+# Heavy dependencies are loaded on first use. lxml and pyarrow are imported where they are needed, since lxml's
+# compiled core can't be loaded lazily and pyarrow is only used by the shot store.
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+requests = lazy_import('requests')
+bs4 = lazy_import('bs4')
+
+logger = logging.getLogger(__name__)
 
 #%% Constants
 # Event location data was first added to the game feeds in the 2010-2011 season. Consequently, that will be the oldest season
@@ -25,14 +89,50 @@ logging.basicConfig(filename='logs.log', level=logging.INFO, format='%(asctime)s
 # The last season used will be the 2018-19 season. This season is chosen because it's the most-recent non-COVID season and because
 # shot location information in the 2019-20 season was incorrect. For details, see https://www.ontheforecheck.com/2019/10/15/20915205/nhl-shot-location-play-by-play-data-has-changed-pbp-shotmaps-analytics-expected-goals-model
 
-# Stem for NHL Stats API
-API_ROOT_URL = 'https://statsapi.web.nhl.com'
+# Stem for NHL Stats API. It can be pointed elsewhere, such as at a local stand-in server (see nhl_standin_server),
+# with the NHL_API_ROOT_URL environment variable or set_base_urls.
+API_ROOT_URL = os.environ.get('NHL_API_ROOT_URL', 'https://statsapi.web.nhl.com')
+# Stem for the html play-by-play reports, which can be changed in the same way with NHL_HTML_REPORT_ROOT_URL.
+HTML_REPORT_ROOT_URL = os.environ.get('NHL_HTML_REPORT_ROOT_URL', 'http://www.nhl.com/scores/htmlreports')
 # For local storage.
 DATA_FOLDER = 'data/'
 GAME_FRAME_FOLDER = DATA_FOLDER + 'games/'
 RAW_FOLDER = DATA_FOLDER + 'raw/'
 RAW_LIVE_FEED_FOLDER = RAW_FOLDER + 'feeds/'
 RAW_HTML_REPORT_FOLDER = RAW_FOLDER + 'html/'
+# How downloaded live feeds are stored: 'full' keeps the whole payload, 'slim' keeps only the fields used by
+# parse_live_feed and the feed catalog, gzip-compressed, and 'both' keeps both. Slim feeds are read in preference to
+# full feeds when both exist.
+LIVE_FEED_STORAGE = 'full'
+# Version of the slim live feed format. Slim feeds of older versions are ignored, so increase it whenever the fields
+# below change.
+SLIM_LIVE_FEED_VERSION = 1
+# Fields kept in slim live feeds, as nested dictionaries of keys. None keeps the whole value. Keys that are missing
+# from a feed stay missing.
+SLIM_LIVE_FEED_TEAM_FIELDS = {'id': None, 'triCode': None, 'teamName': None}
+SLIM_LIVE_FEED_GAME_FIELDS = {
+    'game': {'pk': None, 'season': None, 'type': None},
+    'datetime': {'dateTime': None},
+    'teams': {'away': SLIM_LIVE_FEED_TEAM_FIELDS, 'home': SLIM_LIVE_FEED_TEAM_FIELDS},
+    'venue': {'name': None}
+}
+SLIM_LIVE_FEED_PLAY_FIELDS = {
+    'about': {'eventIdx': None, 'period': None, 'ordinalNum': None, 'periodType': None, 'periodTime': None},
+    'result': {'event': None, 'secondaryType': None},
+    'team': {'id': None, 'triCode': None},
+    'coordinates': None
+}
+# Raw html reports are stored as the downloaded bytes, gzip-compressed. Decompression speed doesn't depend on the
+# level, so this only trades download-time CPU against disk space.
+HTML_REPORT_COMPRESSION_LEVEL = 6
+# Season-partitioned columnar store of combined shot frames. Each season has a single compacted Parquet file, plus
+# a bounded number of per-game files appended since the last compaction.
+SHOT_STORE_FOLDER = DATA_FOLDER + 'shots/'
+SHOT_STORE_COMPRESSION = 'zstd'
+SHOT_STORE_MAX_PENDING = 64
+# Streaming season builds hold at most this many bytes of combined frames in memory before writing them out as a
+# Parquet row group.
+STREAM_MEMORY_LIMIT = 64 * 2**20
 # List of seasons to use.
 SEASON_LIST = ['20102011', '20112012', '20122013', '20132014', '20142015', '20152016', '20162017', 
                '20172018', '20182019', '20192020']
@@ -62,17 +162,772 @@ EVENT_TRANSLATION = {
     'Early Intermission End': 'EIEND', 
     'Emergency Goaltender': 'EGT'
 }
+# Categories used for the event column of live feed frames, and the category code for each live feed event.
+# Events that aren't translated are given the code -1, which marks a missing value.
+LIVE_FEED_EVENT_CATEGORIES = [ code for code in dict.fromkeys(EVENT_TRANSLATION.values()) if code is not None ]
+LIVE_FEED_EVENT_CODES = { event: LIVE_FEED_EVENT_CATEGORIES.index(code) if code is not None else -1
+                         for event, code in EVENT_TRANSLATION.items() }
 # Track whether the code marks a shot or some other event.
 # Shots are coded by the categories as 'Goal', 'Missed Shot', 'Shot', and 'Blocked Shot'
 SHOT_EVENTS = [ 'SHOT', 'BLOCK', 'GOAL', 'MISS']
+# Strength codes, from the viewpoint of the event team: even strength, power-play, and short-handed.
+STRENGTH_CODES = ['EV', 'PP', 'SH']
+# Zones in which an event can take place, from the viewpoint of the event team.
+ZONE_CODES = ['Off. Zone', 'Neu. Zone', 'Def. Zone']
+# Game types: preseason, regular season, playoffs, and all-star.
+GAME_TYPE_CODES = ['PR', 'R', 'P', 'A']
+PERIOD_TYPE_CODES = ['REGULAR', 'OVERTIME', 'SHOOTOUT']
+# Columns identifying the same shot in the live feed and the html report. Several shots can share all three, so
+# shots are matched in order within each group (see align_shot_events).
+ALIGNMENT_KEYS = ['period', 'time_elapsed', 'event']
+ALIGNMENT_EVENT_CODES = { code: k for k, code in enumerate(LIVE_FEED_EVENT_CATEGORIES) }
 # Faceoffs are used as proxies for stoppages, since a faceoff is always used to restart play after a stoppage.
 FACEOFF_EVENTS = [ 'FAC' ]
+# A rebound is any shot taken within this many seconds of the previous shot, with no intervening stoppage.
+REBOUND_WINDOW_SECONDS = 3
 # Mark positions as Forwards/Defense/Goaltender. The positions Center, Left, and Right Wing are all forwards. The generic
 # position Forward found in some play-by-plays is also a forward.
 FWD_DEF_MAPPING = { 'C': 'FWD', 'L': 'FWD', 'R': 'FWD', 'F': 'FWD', 'D': 'DEF', 'G': 'GOAL'}
 # Mark position as skater (synonymously attacker) or goaltender. All positions other than goaltender are considered 
 # skater positions.
 SKATER_MAPPING = { 'C': 'SKTR', 'L': 'SKTR', 'R': 'SKTR', 'F': 'SKTR', 'D': 'SKTR', 'G': 'GOAL'}
+# Positions counted for the players on ice. Each side gets one small integer column per position, named
+# 'pos_<position>_a' for the away team and 'pos_<position>_h' for the home team.
+ON_ICE_POSITIONS = ['C', 'L', 'R', 'F', 'D', 'G']
+# Column types of combined frames. A list gives the fixed categories of a categorical column, while 'category' gives
+# a categorical column whose categories are taken from the data. Integer columns that have missing values use the
+# corresponding nullable type. Columns not listed keep the type they are built with.
+COMBINED_FRAME_DTYPES = {
+    'game_id_livefeed': 'category',
+    'season': 'category',
+    'type': GAME_TYPE_CODES,
+    'away_code': 'category',
+    'home_code': 'category',
+    'venue': 'category',
+    'period': 'int8',
+    'period_ord': 'category',
+    'period_type': PERIOD_TYPE_CODES,
+    'cum_time_elapsed': 'int16',
+    'event': SHOT_EVENTS,
+    'event_team_code': 'category',
+    'event_team_is_home': 'boolean',
+    'event_coord_x': 'float32',
+    'event_coord_y': 'float32',
+    'secondary_type': 'category',
+    'is_rebound': 'boolean',
+    'strength': STRENGTH_CODES,
+    'game_id_htmlreport': 'category',
+    'seconds_remaining': 'int16',
+    'shot_dist': 'float32',
+    'event_zone': ZONE_CODES,
+    'miss_type': 'category',
+    'shot_type': 'category',
+    'calc_dist': 'float32',
+    'dist_difference': 'float32'
+}
+# Checkpoints and dead-letter lists of batch runs (see run_batch).
+BATCH_FOLDER = DATA_FOLDER + 'batches/'
+# Number of times run_batch tries a failed game before leaving it in the dead-letter list for good.
+BATCH_MAX_ATTEMPTS = 3
+# Maximum number of games whose combined frames are processed together by build_game_combined_frames. Batches are
+# smaller when there are too few games to keep every worker busy.
+COMBINED_BATCH_SIZE = 100
+# Per-run pipeline metrics (see get_metrics_summary) are written to this folder by write_metrics_file.
+METRICS_FOLDER = DATA_FOLDER + 'metrics/'
+# Build manifest recording, for each game and stage, the hashes of the stage inputs and output and the version of
+# the code that built it. Used by update_game_stages to rebuild only stale artifacts.
+BUILD_MANIFEST_PATH = DATA_FOLDER + 'manifest.sqlite'
+# Catalog of downloaded live feeds, recording summary information about each game so that it can be filtered without
+# reloading the feeds.
+FEED_CATALOG_PATH = DATA_FOLDER + 'catalog.sqlite'
+# Games with known problems, by game id. Flagged games are excluded from the build (see get_bad_links).
+KNOWN_GAME_FLAGS = {
+    # The play-by-play in the html reports for these games is broken.
+    '2010020124': 'broken_html_report',
+    '2013020971': 'broken_html_report'
+}
+# Stages of the per-game pipeline, in build order, with the stages that each depends on.
+STAGE_INPUTS = {
+    'raw_feed': [],
+    'raw_html': [],
+    'feed_frame': ['raw_feed'],
+    'html_frame': ['raw_html'],
+    'combined': ['feed_frame', 'html_frame']
+}
+# Incremental schedule syncs (see sync_season_schedule) query date windows longer than this many days in chunks, with
+# up to SCHEDULE_SYNC_MAX_WORKERS chunks requested at once.
+SCHEDULE_SYNC_CHUNK_DAYS = 14
+SCHEDULE_SYNC_MAX_WORKERS = 4
+# Month and day after which no games of a season are played, ending the sync window of the season.
+SEASON_END = (6, 30)
+# Game states, as given by 'detailedState' in the schedule, after which a game is not expected to change. Postponed
+# games are listed again on their new date.
+SCHEDULE_SETTLED_STATES = ['Final', 'Postponed']
+# Game states after which the raw files of a game are complete, so that its frames can be built.
+SCHEDULE_FINAL_STATES = ['Final']
+# Version of the code producing each derived stage. Increase a stage's version whenever a code change alters its
+# output; that stage, and any stage downstream whose inputs actually change, is then rebuilt by update_game_stages.
+STAGE_VERSIONS = {'feed_frame': 1, 'html_frame': 1, 'combined': 3}
+# Number of simultaneous requests used by retrieve_all_concurrent.
+DOWNLOAD_MAX_WORKERS = 8
+# Maximum number of requests per second sent to the API server and to the html report server, wherever they are
+# (see set_base_urls). Servers sharing a host, such as a local stand-in, share the sum of their limits.
+SERVER_RATE_LIMITS = {'api': 10.0, 'html_report': 5.0}
+# Maximum number of requests per second sent to each host. Hosts that aren't listed are not rate limited. Starts with
+# the hosts of API_ROOT_URL and HTML_REPORT_ROOT_URL; see get_server_host_rate_limits.
+HOST_RATE_LIMITS = {}
+# Settings for the shared HTTP session used for every API and html report request.
+#   timeout: (connect, read) timeouts in seconds.
+#   max_retries: number of retries after the first attempt for connection errors and retry_statuses.
+#   backoff_base, backoff_max: retry n waits a random time up to min(backoff_max, backoff_base * 2**n) seconds.
+#   pool_connections, pool_maxsize: number of hosts to keep pools for, and keep-alive connections per host.
+#   recording: None to use the network only, 'record' to also save every response, or 'replay' to answer every request
+#       from saved responses without using the network. Can also be set with the NHL_HTTP_RECORDING environment
+#       variable.
+#   recording_folder: where responses are saved. Responses are keyed by path and query, so that recordings can be
+#       replayed, or served by nhl_standin_server, whatever the base URLs.
+HTTP_SETTINGS = {
+    'timeout': (5.0, 30.0),
+    'max_retries': 5,
+    'backoff_base': 0.5,
+    'backoff_max': 30.0,
+    'retry_statuses': (429, 500, 502, 503, 504),
+    'pool_connections': 4,
+    'pool_maxsize': 2 * DOWNLOAD_MAX_WORKERS,
+    'recording': os.environ.get('NHL_HTTP_RECORDING') or None,
+    'recording_folder': DATA_FOLDER + 'recordings/'
+}
+# Response headers that aren't saved with recordings, since recorded bodies are stored decoded.
+RECORDING_SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+#%% Request rate limiting
+# Earliest time (from time.monotonic) that the next request may be sent to each host.
+_host_next_request_time = {}
+_host_rate_lock = threading.Lock()
+
+def wait_for_host_rate_limit(url, rate_limits=None):
+    '''
+    Blocks until a request to the host of url is allowed by the rate limits. Safe to call from multiple threads.
+
+    Parameters
+    ----------
+    url : str
+        The URL that is about to be requested.
+    rate_limits : dict, optional
+        Maps host names to the maximum number of requests per second sent to that host, taking precedence over
+        HOST_RATE_LIMITS for the hosts it lists. The default is None.
+
+    Returns
+    -------
+    None.
+
+    '''
+    host = urlparse(url).netloc
+    if (rate_limits is not None) and (host in rate_limits):
+        rate = rate_limits[host]
+    else:
+        rate = HOST_RATE_LIMITS.get(host)
+    if not rate:
+        return
+    # Reserve the next available slot for the host while holding the lock, but sleep after releasing it so that
+    # requests to other hosts aren't held up.
+    with _host_rate_lock:
+        now = time.monotonic()
+        slot = max(now, _host_next_request_time.get(host, now))
+        _host_next_request_time[host] = slot + 1.0 / rate
+    if slot > now:
+        time.sleep(slot - now)
+
+#%% Shared HTTP session
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    '''
+    Obtains the shared HTTP session, creating it on first use. The session keeps a pool of keep-alive connections
+    for each host and requests gzip transfer encoding.
+
+    Returns
+    -------
+    requests.Session
+        Session shared by every request made by this module.
+
+    '''
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            # Retries are handled by http_get, so that backoff can include jitter and honor Retry-After.
+            adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_SETTINGS['pool_connections'],
+                                                    pool_maxsize=HTTP_SETTINGS['pool_maxsize'],
+                                                    max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+            _http_session = session
+        return _http_session
+
+def configure_http_session(**settings):
+    '''
+    Updates HTTP_SETTINGS and discards the current shared session so that the next request uses the new settings.
+
+    Parameters
+    ----------
+    **settings
+        Any of the keys of HTTP_SETTINGS.
+
+    Returns
+    -------
+    None.
+
+    '''
+    global _http_session
+    unknown = set(settings) - set(HTTP_SETTINGS)
+    if unknown:
+        raise ValueError('Unknown HTTP settings: ' + ', '.join(sorted(unknown)))
+    with _http_session_lock:
+        HTTP_SETTINGS.update(settings)
+        if _http_session is not None:
+            _http_session.close()
+        _http_session = None
+
+def set_base_urls(api_root_url=None, html_report_root_url=None):
+    '''
+    Points the API and html report requests at other servers, such as a local stand-in (see nhl_standin_server). The
+    environment variables are updated as well, so that worker processes started afterward use the same servers.
+
+    Parameters
+    ----------
+    api_root_url : str, optional
+        New API_ROOT_URL. Example: 'http://localhost:8000'. If None, it is left unchanged. The default is None.
+    html_report_root_url : str, optional
+        New HTML_REPORT_ROOT_URL. Example: 'http://localhost:8000/scores/htmlreports'. If None, it is left unchanged.
+        The default is None.
+
+    Returns
+    -------
+    None.
+
+    '''
+    global API_ROOT_URL, HTML_REPORT_ROOT_URL
+    previous_hosts = get_server_host_rate_limits()
+    if api_root_url is not None:
+        API_ROOT_URL = api_root_url.rstrip('/')
+        os.environ['NHL_API_ROOT_URL'] = API_ROOT_URL
+    if html_report_root_url is not None:
+        HTML_REPORT_ROOT_URL = html_report_root_url.rstrip('/')
+        os.environ['NHL_HTML_REPORT_ROOT_URL'] = HTML_REPORT_ROOT_URL
+    # The rate limits follow the servers to their new hosts, so that a stand-in is requested at the same rates.
+    for host in previous_hosts:
+        HOST_RATE_LIMITS.pop(host, None)
+    HOST_RATE_LIMITS.update(get_server_host_rate_limits())
+
+def get_server_host_rate_limits():
+    '''
+    Gives the rate limits of the hosts of API_ROOT_URL and HTML_REPORT_ROOT_URL, from SERVER_RATE_LIMITS.
+
+    Returns
+    -------
+    dict
+        Maximum number of requests per second for each host. A host serving both the API and the html reports gets
+        the sum of the two limits.
+
+    '''
+    limits = {}
+    for root_url, rate in ((API_ROOT_URL, SERVER_RATE_LIMITS['api']),
+                           (HTML_REPORT_ROOT_URL, SERVER_RATE_LIMITS['html_report'])):
+        host = urlparse(root_url).netloc
+        limits[host] = limits.get(host, 0.0) + rate
+    return limits
+
+HOST_RATE_LIMITS.update(get_server_host_rate_limits())
+
+#%% Record and replay HTTP responses
+def get_recording_paths(url, recording_folder=None):
+    '''
+    Obtains the files holding the recorded response for a URL.
+
+    Parameters
+    ----------
+    url : str
+        The requested URL. Only the path and query are used, so the host doesn't matter.
+    recording_folder : str, optional
+        Folder of the recordings, relative to the working directory. If None, uses HTTP_SETTINGS['recording_folder'].
+        The default is None.
+
+    Returns
+    -------
+    meta_path : pathlib.Path
+        Json file with the URL, status, and headers of the response.
+    body_path : pathlib.Path
+        Gzip-compressed body of the response.
+
+    '''
+    parsed = urlparse(url)
+    key = parsed.path + ('?' + parsed.query if parsed.query else '')
+    name = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+    folder = Path.cwd().joinpath(HTTP_SETTINGS['recording_folder'] if recording_folder is None else recording_folder)
+    return folder.joinpath(name + '.json'), folder.joinpath(name + '.body.gz')
+
+def save_recording(url, response, recording_folder=None):
+    '''
+    Saves a response so that it can be replayed. See get_recording_paths.
+
+    Parameters
+    ----------
+    url : str
+        The requested URL.
+    response : requests.Response
+        The response received.
+    recording_folder : str, optional
+        Folder of the recordings. See get_recording_paths. The default is None.
+
+    Returns
+    -------
+    None.
+
+    '''
+    meta_path, body_path = get_recording_paths(url, recording_folder)
+    meta_path.parent.resolve().mkdir(parents=True, exist_ok=True)
+    meta = {'url': url, 'status_code': response.status_code,
+            'headers': { name: value for name, value in response.headers.items()
+                         if name.lower() not in RECORDING_SKIPPED_HEADERS }}
+    # Write the body first and the metadata last, so that a recording with metadata is always complete.
+    tmp_path = body_path.with_name(body_path.name + '.tmp')
+    with gzip.open(str(tmp_path), 'wb', compresslevel=6) as outfile:
+        outfile.write(response.content)
+    os.replace(tmp_path, body_path)
+    tmp_path = meta_path.with_name(meta_path.name + '.tmp')
+    with tmp_path.open('w') as outfile:
+        json.dump(meta, outfile)
+    os.replace(tmp_path, meta_path)
+
+def read_recording(url, recording_folder=None):
+    '''
+    Reads the recorded response for a URL, if there is one.
+
+    Parameters
+    ----------
+    url : str
+        The requested URL.
+    recording_folder : str, optional
+        Folder of the recordings. See get_recording_paths. The default is None.
+
+    Returns
+    -------
+    requests.Response
+        The recorded response. Returns None if the URL hasn't been recorded.
+
+    '''
+    meta_path, body_path = get_recording_paths(url, recording_folder)
+    if not meta_path.exists():
+        return None
+    with meta_path.open('r') as infile:
+        meta = json.load(infile)
+    response = requests.Response()
+    response.status_code = meta['status_code']
+    response.headers.update(meta['headers'])
+    response.url = url
+    with gzip.open(str(body_path), 'rb') as infile:
+        response._content = infile.read()
+    return response
+
+def get_retry_delay(attempt, response=None):
+    '''
+    Determines how long to wait before retrying a request.
+
+    Parameters
+    ----------
+    attempt : int
+        Number of attempts that have already failed, starting from 0.
+    response : requests.Response, optional
+        The failed response, if one was received. A numeric Retry-After header is used as a lower bound on the delay.
+        The default is None.
+
+    Returns
+    -------
+    float
+        Delay in seconds. Uses exponential backoff with full jitter.
+
+    '''
+    cap = min(HTTP_SETTINGS['backoff_max'], HTTP_SETTINGS['backoff_base'] * 2 ** attempt)
+    delay = random.uniform(0, cap)
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), HTTP_SETTINGS['backoff_max']))
+    return delay
+
+def http_get(url, rate_limits=None, **kwargs):
+    '''
+    Sends a GET request through the shared session, respecting HOST_RATE_LIMITS. Connection errors, timeouts, and
+    responses with a status in HTTP_SETTINGS['retry_statuses'] are retried with exponential backoff. Responses are
+    saved or replayed according to HTTP_SETTINGS['recording'].
+
+    Parameters
+    ----------
+    url : str
+        URL to request.
+    rate_limits : dict, optional
+        Per-host limits used instead of HOST_RATE_LIMITS. See wait_for_host_rate_limit. The default is None.
+    **kwargs
+        Passed on to requests.Session.get. A timeout of HTTP_SETTINGS['timeout'] is used unless one is given.
+
+    Returns
+    -------
+    requests.Response
+        The first response with a status that isn't retried, or the last response once retries are exhausted.
+        Connection errors and timeouts are re-raised once retries are exhausted. When replaying, a URL that wasn't
+        recorded raises requests.ConnectionError.
+
+    '''
+    if HTTP_SETTINGS['recording'] == 'replay':
+        response = read_recording(url)
+        if response is None:
+            raise requests.ConnectionError('No recorded response for ' + url)
+        return response
+    kwargs.setdefault('timeout', HTTP_SETTINGS['timeout'])
+    session = get_http_session()
+    max_retries = HTTP_SETTINGS['max_retries']
+    for attempt in range(max_retries + 1):
+        wait_for_host_rate_limit(url, rate_limits)
+        try:
+            response = session.get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as err:
+            if attempt == max_retries:
+                raise
+            delay = get_retry_delay(attempt)
+            logger.warning('Retrying ' + url + ' in ' + format(delay, '.1f') + 's (' + repr(err) + ')')
+        else:
+            if (response.status_code not in HTTP_SETTINGS['retry_statuses']) or (attempt == max_retries):
+                # A 304 only makes sense for the conditional request that got it, so only full responses are saved.
+                if (HTTP_SETTINGS['recording'] == 'record') and (response.status_code != 304):
+                    save_recording(url, response)
+                return response
+            delay = get_retry_delay(attempt, response)
+            logger.warning('Retrying ' + url + ' in ' + format(delay, '.1f') + 's (Status: '
+                            + str(response.status_code) + ')')
+            # Release the connection back to the pool before waiting.
+            response.close()
+        time.sleep(delay)
+
+#%% Conditional downloads
+def get_validators_path(artifact_path):
+    '''
+    Obtains the handle for the file holding the validators of a raw file: the ETag and Last-Modified headers sent by
+    the server with the file, and a hash of its content. The same file is used for every format of the raw file.
+
+    Parameters
+    ----------
+    artifact_path : pathlib.Path
+        The raw file. Example: the path given by get_game_html_report_path.
+
+    Returns
+    -------
+    pathlib.Path
+        Path object for the validators file, whether or not it exists.
+
+    '''
+    return artifact_path.with_name(artifact_path.name.split('.')[0] + '.validators.json')
+
+def read_validators(artifact_path):
+    '''
+    Reads the validators of a raw file. See get_validators_path.
+
+    Parameters
+    ----------
+    artifact_path : pathlib.Path
+        The raw file.
+
+    Returns
+    -------
+    dict
+        Validators, with keys 'url', 'etag', 'last_modified', 'content_hash', and 'checked_at'. Returns None if the raw
+        file or its validators don't exist.
+
+    '''
+    validators_path = get_validators_path(artifact_path)
+    if (not artifact_path.exists()) or (not validators_path.exists()):
+        return None
+    with validators_path.open('r') as infile:
+        return json.load(infile)
+
+def save_validators(artifact_path, url, response, content_hash=None):
+    '''
+    Saves the validators of a raw file. Should be called once the raw file itself is saved, so that the validators
+    never describe content that isn't stored.
+
+    Parameters
+    ----------
+    artifact_path : pathlib.Path
+        The raw file.
+    url : str
+        URL the raw file was downloaded from.
+    response : requests.Response
+        The response to the latest request for the file. Validators missing from a 304 response are kept.
+    content_hash : str, optional
+        Hash of the content of the file. If None, the hash of the content of response is used. The default is None.
+
+    Returns
+    -------
+    None.
+
+    '''
+    previous = read_validators(artifact_path) or {}
+    validators = {
+        'url': url,
+        'etag': response.headers.get('ETag', previous.get('etag')),
+        'last_modified': response.headers.get('Last-Modified', previous.get('last_modified')),
+        'content_hash': content_hash if content_hash is not None else
+            hashlib.blake2b(response.content, digest_size=16).hexdigest(),
+        'checked_at': datetime.now().isoformat(timespec='seconds')
+    }
+    validators_path = get_validators_path(artifact_path)
+    tmp_path = validators_path.with_name(validators_path.name + '.tmp')
+    with tmp_path.open('w') as outfile:
+        json.dump(validators, outfile)
+    os.replace(tmp_path, validators_path)
+
+def fetch_raw(url, stage, live_feed_link=None, artifact_path=None, rate_limits=None):
+    '''
+    Requests a raw file. If a local copy with validators exists, the request is conditional, so that the server can
+    answer 304 Not Modified instead of sending the file again. A 304, or a full response whose content hashes the same
+    as the local copy, is counted as a cache hit in the metrics of the stage.
+
+    Parameters
+    ----------
+    url : str
+        URL to request.
+    stage : str
+        Name of the stage for the metrics. Example: 'download_feed'.
+    live_feed_link : str, optional
+        The live feed link of the game, if the file belongs to a game. The default is None.
+    artifact_path : pathlib.Path, optional
+        The local copy of the file. If None, the request is unconditional. The default is None.
+    rate_limits : dict, optional
+        Per-host limits used instead of HOST_RATE_LIMITS. See wait_for_host_rate_limit. The default is None.
+
+    Returns
+    -------
+    response : requests.Response
+        The response.
+    unchanged : bool
+        True if the local copy is still current, in which case its validators have been updated and it shouldn't be
+        rewritten.
+
+    '''
+    validators = read_validators(artifact_path) if artifact_path is not None else None
+    headers = {}
+    if validators is not None:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    with stage_timer(stage, live_feed_link) as metrics:
+        response = http_get(url, rate_limits, headers=headers)
+        metrics['bytes_read'] = len(response.content)
+        unchanged = False
+        if validators is not None:
+            unchanged = (response.status_code == 304) or ((response.status_code == 200) and
+                (hashlib.blake2b(response.content, digest_size=16).hexdigest() == validators['content_hash']))
+            metrics['cache_hit'] = unchanged
+    if unchanged:
+        logger.info('Unchanged since last download: ' + url)
+        save_validators(artifact_path, url, response, content_hash=validators['content_hash'])
+    return response, unchanged
+
+#%% Pipeline metrics
+_stage_metrics = []
+_stage_metrics_lock = threading.Lock()
+# Record of the enclosing stage in each thread. Nested stages take their game from it when they don't know the game,
+# and their wall time is taken out of its exclusive time.
+_stage_context = threading.local()
+_metrics_started_at = time.time()
+
+@contextmanager
+def stage_timer(stage, live_feed_link=None):
+    '''
+    Records the wall and CPU time spent in a pipeline stage. The yielded record can be updated with 'bytes_read',
+    'bytes_written', and 'cache_hit' (True if a saved result was used, False if it was rebuilt) before the block ends.
+    Stages can be nested: the record of a nested stage names the enclosing stage under 'parent', and 'self_wall' is
+    the wall time of a stage less that of the stages nested directly in it.
+
+    Parameters
+    ----------
+    stage : str
+        Name of the stage. Example: 'parse_html'.
+    live_feed_link : str, optional
+        The live feed link of the game being processed. If None, uses the game of the enclosing stage, if any.
+        The default is None.
+
+    Yields
+    ------
+    record : dict
+        The metrics record for this run of the stage.
+
+    '''
+    enclosing = getattr(_stage_context, 'record', None)
+    if live_feed_link is not None:
+        game_id = extract_id_from_live_feed_link(live_feed_link)
+    else:
+        game_id = enclosing['game_id'] if enclosing is not None else None
+    record = {'game_id': game_id, 'stage': stage, 'parent': enclosing['stage'] if enclosing is not None else None,
+              'wall': 0.0, 'self_wall': 0.0, 'cpu': 0.0, 'bytes_read': 0, 'bytes_written': 0, 'cache_hit': None,
+              'pid': os.getpid()}
+    _stage_context.record = record
+    wall_start = time.perf_counter()
+    # Thread time, since downloads run in several threads at once.
+    cpu_start = time.thread_time()
+    try:
+        yield record
+    finally:
+        record['wall'] = time.perf_counter() - wall_start
+        record['cpu'] = time.thread_time() - cpu_start
+        # Nested stages have already taken their time out of self_wall.
+        record['self_wall'] += record['wall']
+        if enclosing is not None:
+            enclosing['self_wall'] -= record['wall']
+        _stage_context.record = enclosing
+        with _stage_metrics_lock:
+            _stage_metrics.append(record)
+
+def record_metrics(records):
+    '''
+    Adds metrics records collected elsewhere, such as in a worker process, to the metrics of this process.
+
+    Parameters
+    ----------
+    records : list of dict
+        Records produced by stage_timer.
+
+    Returns
+    -------
+    None.
+
+    '''
+    with _stage_metrics_lock:
+        _stage_metrics.extend(records)
+
+def get_metrics(clear=False):
+    '''
+    Obtains the metrics recorded in this process.
+
+    Parameters
+    ----------
+    clear : bool, optional
+        If True, also removes the returned records. The default is False.
+
+    Returns
+    -------
+    list of dict
+        Records produced by stage_timer, in the order the stages finished.
+
+    '''
+    with _stage_metrics_lock:
+        records = list(_stage_metrics)
+        if clear:
+            _stage_metrics.clear()
+    return records
+
+def reset_metrics():
+    '''
+    Discards all recorded metrics and restarts the run clock used for throughput.
+
+    Returns
+    -------
+    None.
+
+    '''
+    global _metrics_started_at
+    get_metrics(clear=True)
+    _metrics_started_at = time.time()
+
+def get_metrics_summary(records=None):
+    '''
+    Summarizes the metrics for each stage.
+
+    Parameters
+    ----------
+    records : list of dict, optional
+        Records produced by stage_timer. If None, uses the metrics recorded in this process. The default is None.
+
+    Returns
+    -------
+    Pandas DataFrame
+        One row per stage, with the enclosing stage ('parent', None for top-level stages), the number of runs and of
+        games, the total, median, and 95th percentile wall time, the total CPU time, the bytes read and written, the
+        fraction of runs using a saved result (for stages that can), and the number of games processed per second of
+        wall time spent in the stage. Wall and CPU times include nested stages, so they can't be added up across
+        stages. 'self_total' is the wall time spent in the stage itself, outside any nested stage, and 'self_share'
+        its fraction of the self time of all stages; these do add up, and show where the time goes.
+
+    '''
+    records = get_metrics() if records is None else records
+    columns = ['parent', 'runs', 'games', 'wall_total', 'wall_p50', 'wall_p95', 'self_total', 'self_share',
+               'cpu_total', 'bytes_read', 'bytes_written', 'cache_hit_rate', 'games_per_sec']
+    if not records:
+        return pd.DataFrame(columns=columns)
+    metrics = pd.DataFrame(records)
+    metrics['cache_hit'] = metrics['cache_hit'].astype(float)
+    grouped = metrics.groupby('stage', sort=False)
+    summary = pd.DataFrame({
+        # A stage nested in different stages is listed under the first one seen.
+        'parent': grouped['parent'].first(),
+        'runs': grouped.size(),
+        'games': grouped['game_id'].nunique(),
+        'wall_total': grouped['wall'].sum(),
+        'wall_p50': grouped['wall'].quantile(0.5),
+        'wall_p95': grouped['wall'].quantile(0.95),
+        'self_total': grouped['self_wall'].sum(),
+        'cpu_total': grouped['cpu'].sum(),
+        'bytes_read': grouped['bytes_read'].sum(),
+        'bytes_written': grouped['bytes_written'].sum(),
+        'cache_hit_rate': grouped['cache_hit'].mean()
+    })
+    summary['self_share'] = summary['self_total'] / summary['self_total'].sum()
+    summary['games_per_sec'] = summary['games'] / summary['wall_total']
+    return summary[columns]
+
+def write_metrics_file(path=None, records=None):
+    '''
+    Writes the metrics of the run to a json file, with the per-stage summary and every record.
+
+    Parameters
+    ----------
+    path : pathlib.Path, optional
+        File to write. If None, writes to a new time-stamped file in METRICS_FOLDER. The default is None.
+    records : list of dict, optional
+        Records produced by stage_timer. If None, uses the metrics recorded in this process. The default is None.
+
+    Returns
+    -------
+    pathlib.Path
+        The file written.
+
+    '''
+    records = get_metrics() if records is None else records
+    finished_at = time.time()
+    if path is None:
+        path = Path.cwd().joinpath(METRICS_FOLDER + 'metrics_' +
+                                   datetime.fromtimestamp(finished_at).strftime('%Y%m%d_%H%M%S') + '.json')
+    path.parent.resolve().mkdir(parents=True, exist_ok=True)
+    games = len({ record['game_id'] for record in records if record['game_id'] is not None })
+    elapsed = finished_at - _metrics_started_at
+    summary = get_metrics_summary(records)
+    metrics = {
+        'started_at': datetime.fromtimestamp(_metrics_started_at).isoformat(timespec='seconds'),
+        'finished_at': datetime.fromtimestamp(finished_at).isoformat(timespec='seconds'),
+        'elapsed_seconds': elapsed,
+        'games': games,
+        'games_per_sec': games / elapsed if elapsed > 0 else None,
+        # Missing values (such as cache hit rates of stages without a cache) are written as null.
+        'stages': json.loads(summary.reset_index().to_json(orient='records')),
+        'records': records
+    }
+    with path.open('w') as outfile:
+        json.dump(metrics, outfile, indent=1)
+    logger.info('Wrote metrics to ' + str(path))
+    return path
+
 #%% Process Schedules
 def get_schedule_local_path(season):
     '''
@@ -119,7 +974,26 @@ def get_schedule_api_url(season):
         # statistics are officially counted.
         return API_ROOT_URL + '/api/v1/schedule?' + 'season=' + season + '&gameType=R,P'
     else:
-        return 'https://statsapi.web.nhl.com/api/v1/schedule?startDate=2016-10-12&endDate=2017-06-11&gameType=R,P'
+        return get_schedule_date_range_url(date(2016, 10, 12), date(2017, 6, 11))
+
+def get_schedule_date_range_url(start_date, end_date):
+    '''
+    Builds the link to the NHL API schedule endpoint for a range of calendar dates.
+
+    Parameters
+    ----------
+    start_date, end_date : datetime.date
+        First and last dates of the range, inclusive.
+
+    Returns
+    -------
+    str
+        URL giving the API endpoint to obtain the schedule for the dates, restricted to regular season and playoff
+        games.
+
+    '''
+    return API_ROOT_URL + '/api/v1/schedule?startDate=' + start_date.isoformat() + '&endDate=' + \
+        end_date.isoformat() + '&gameType=R,P'
         
 def extract_season_game_feed_links(season):
     '''
@@ -139,18 +1013,37 @@ def extract_season_game_feed_links(season):
     '''
     # api_url is restricted to regular season and playoff games by get_schedule_api_link.
     api_url = get_schedule_api_url(season)
-    api_request = requests.get(api_url)
+    return get_schedule_links_from_response(season, http_get(api_url))
+
+def get_schedule_links_from_response(season, api_request):
+    '''
+    Extracts the live feed links from a response to a schedule request.
+
+    Parameters
+    ----------
+    season : str
+        The season for the schedule. Example: '20182019' for the 2018-19 season.
+    api_request : requests.Response
+        Response to the request for the URL given by get_schedule_api_url.
+
+    Returns
+    -------
+    schedule_links : list of str
+        List of links to live feeds of games for the season.
+        Returns None if the API request failed.
+
+    '''
     if (api_request.status_code == 200):
-        season = api_request.json()
-        logging.info('Success downloading ' + season + 'schedule')
+        schedule = api_request.json()
+        logger.info('Success downloading ' + season + ' schedule')
         # The json returned by the API provides a list of calendar dates under the key 'dates'. Each calendar date in
         # turn provides a list of games for that date, keyed by 'games'. Finally, each game provides the live feed link.
         schedule_links = [ game['link'] 
-                      for game_date in season['dates'] 
+                      for game_date in schedule['dates'] 
                       for game in game_date['games'] ]    
         return schedule_links
     else:
-        logging.error('Error downloading ' + season + 'schedule (Status: ' + str(api_request.status_code)+')')
+        logger.error('Error downloading ' + season + ' schedule (Status: ' + str(api_request.status_code)+')')
         return None
 
 def read_game_feed_links(season):
@@ -172,7 +1065,7 @@ def read_game_feed_links(season):
     '''
     game_feed_link_path = get_schedule_local_path(season)
     if game_feed_link_path.exists():
-        logging.info('Reading ' + season + ' schedule.')
+        logger.info('Reading ' + season + ' schedule.')
         with game_feed_link_path.open('r') as infile:
             game_feed_links = json.load(infile)
         return game_feed_links
@@ -189,7 +1082,8 @@ def get_season_game_feed_links(season, refresh = None):
         The season for the schedule. Example: '20182019' for the 2018-19 season.
     refresh : str, optional
         If not None, ignores the existence of any local files and re-downloads and processes
-        the data from the API. This will result in overwriting any current saves. The default is None.
+        the data from the API. The request is conditional, and the local file is only overwritten if the schedule
+        changed. The default is None.
 
     Returns
     -------
@@ -202,12 +1096,18 @@ def get_season_game_feed_links(season, refresh = None):
     # Read the data if it exists and no request to refresh/reconstruct the data was sent.
     read_from_file = read_game_feed_links(season) if refresh is None else None
     if read_from_file is None:
-        game_feed_links = extract_season_game_feed_links(season)
-        # Save the data before returing.
+        api_url = get_schedule_api_url(season)
         live_feed_path = get_schedule_local_path(season)
-        live_feed_path.touch()
-        with live_feed_path.open('w') as outfile:
-            json.dump(game_feed_links, outfile)
+        api_request, unchanged = fetch_raw(api_url, 'download_schedule', artifact_path=live_feed_path)
+        if unchanged:
+            return read_game_feed_links(season)
+        game_feed_links = get_schedule_links_from_response(season, api_request)
+        # Save the data before returing.
+        if game_feed_links is not None:
+            live_feed_path.parent.resolve().mkdir(parents=True, exist_ok=True)
+            with live_feed_path.open('w') as outfile:
+                json.dump(game_feed_links, outfile)
+            save_validators(live_feed_path, api_url, api_request)
         return game_feed_links
     else:
         return read_from_file
@@ -250,18 +1150,252 @@ def get_game_feed_links(seasons, refresh=None):
                     for season in seasons 
                     for link in get_season_game_feed_links(season, refresh)]            
  
-#%% Download, store, and retrieve raw live feed files
-
-def extract_id_from_live_feed_link(live_feed_link):
+#%% Incremental schedule sync
+def get_schedule_state_path(season):
     '''
-    Extracts the ten-character game id from the live_feed_link.
+    Obtains a path object for the file holding the state of the incremental schedule sync of a season.
 
     Parameters
     ----------
-    live_feed_link : str
-        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
-        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
-        for more information.
+    season : str
+        The season for the schedule. Example: '20182019' for the 2018-19 season.
+
+    Returns
+    -------
+    pathlib.Path
+        Path object for the state file, whether or not it exists.
+
+    '''
+    return Path.cwd().joinpath(DATA_FOLDER + 'schedule_' + season + '.state.json')
+
+def read_schedule_state(season):
+    '''
+    Reads the state of the incremental schedule sync of a season.
+
+    Parameters
+    ----------
+    season : str
+        The season for the schedule. Example: '20182019' for the 2018-19 season.
+
+    Returns
+    -------
+    dict
+        State, with the first date still to be checked under 'next_sync_date', and the 'link', 'date', and 'status' of
+        each game under 'games', keyed by game id. Returns None if the season hasn't been synced.
+
+    '''
+    state_path = get_schedule_state_path(season)
+    if not state_path.exists():
+        return None
+    with state_path.open('r') as infile:
+        return json.load(infile)
+
+def extract_schedule_games(schedule):
+    '''
+    Lists the games in a schedule returned by the API.
+
+    Parameters
+    ----------
+    schedule : dict
+        Schedule returned by the API.
+
+    Returns
+    -------
+    dict
+        The 'link', calendar 'date', and 'status' of each game, keyed by game id. A game listed on several dates,
+        as postponed games are, keeps its latest date.
+
+    '''
+    games = {}
+    for game_date in schedule['dates']:
+        for game in game_date['games']:
+            status = game.get('status', {})
+            games[extract_id_from_live_feed_link(game['link'])] = {
+                'link': game['link'],
+                'date': game_date['date'],
+                'status': status.get('detailedState', status.get('abstractGameState'))
+            }
+    return games
+
+def download_schedule_games(start_date, end_date, chunk_days=SCHEDULE_SYNC_CHUNK_DAYS,
+                            max_workers=SCHEDULE_SYNC_MAX_WORKERS):
+    '''
+    Downloads the games scheduled between two dates, splitting long ranges into chunks requested concurrently.
+
+    Parameters
+    ----------
+    start_date, end_date : datetime.date
+        First and last dates of the range, inclusive.
+    chunk_days : int, optional
+        Maximum number of days requested at once. The default is SCHEDULE_SYNC_CHUNK_DAYS.
+    max_workers : int, optional
+        Maximum number of chunks requested at once. The default is SCHEDULE_SYNC_MAX_WORKERS.
+
+    Returns
+    -------
+    dict
+        Games in the range. See extract_schedule_games. Returns None if any chunk couldn't be downloaded.
+
+    '''
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(end_date, chunk_start + timedelta(days=chunk_days - 1))
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+
+    def download_chunk(chunk):
+        with stage_timer('download_schedule') as metrics:
+            api_request = http_get(get_schedule_date_range_url(*chunk))
+            metrics['bytes_read'] = len(api_request.content)
+        if api_request.status_code != 200:
+            logger.error('Error downloading schedule for ' + chunk[0].isoformat() + ' to ' + chunk[1].isoformat()
+                         + ' (Status: ' + str(api_request.status_code) + ')')
+            return None
+        return extract_schedule_games(api_request.json())
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        chunk_games = list(executor.map(download_chunk, chunks))
+    if any(games is None for games in chunk_games):
+        return None
+    # Chunks are in date order, so later listings of a game replace earlier ones.
+    games = {}
+    for chunk in chunk_games:
+        games.update(chunk)
+    return games
+
+def sync_season_schedule(season, today=None):
+    '''
+    Brings the local schedule of a season up to date, querying only the dates that may have changed since the last
+    sync. The first sync of a season downloads the whole schedule. Later syncs query from the earliest date with a
+    game that wasn't settled (see SCHEDULE_SETTLED_STATES) at the last sync, up to today. The local schedule file read
+    by get_season_game_feed_links is updated as well.
+
+    Parameters
+    ----------
+    season : str
+        The season for the schedule. Example: '20182019' for the 2018-19 season.
+    today : datetime.date, optional
+        Last date to query. If None, uses the current date. The default is None.
+
+    Returns
+    -------
+    list of str
+        Live feed links of the games that are new or whose status changed, in schedule order. Returns None if the
+        schedule couldn't be downloaded, in which case nothing is updated.
+
+    '''
+    today = date.today() if today is None else today
+    state = read_schedule_state(season)
+    season_end = date(int(season[4:]), *SEASON_END)
+    if state is None:
+        api_request = http_get(get_schedule_api_url(season))
+        if api_request.status_code != 200:
+            logger.error('Error downloading ' + season + ' schedule (Status: ' + str(api_request.status_code) + ')')
+            return None
+        fetched = extract_schedule_games(api_request.json())
+        # Games already in a schedule saved before syncing was used aren't reported as new.
+        known_links = read_game_feed_links(season) or []
+        state = {'season': season, 'games': { extract_id_from_live_feed_link(link): {'link': link}
+                                               for link in known_links }}
+    else:
+        start_date = date.fromisoformat(state['next_sync_date'])
+        end_date = min(today, season_end)
+        if start_date > end_date:
+            logger.info('Schedule for ' + season + ' is up to date')
+            return []
+        fetched = download_schedule_games(start_date, end_date)
+        if fetched is None:
+            return None
+
+    changed = []
+    for game_id, game in fetched.items():
+        previous = state['games'].get(game_id)
+        if (previous is None) or (previous.get('status') is not None and previous['status'] != game['status']) \
+                or (previous.get('date') is not None and previous['date'] != game['date']):
+            changed.append(game['link'])
+        state['games'][game_id] = game
+    # Games that were played, or should have been, but aren't settled yet are checked again next time.
+    games = sorted(state['games'].values(), key=lambda game: (game.get('date') or '', game['link']))
+    unsettled = [ game['date'] for game in games
+                  if game.get('date') is not None and game['date'] <= today.isoformat()
+                  and game.get('status') not in SCHEDULE_SETTLED_STATES ]
+    state['next_sync_date'] = min(unsettled) if unsettled else (min(today, season_end) + timedelta(days=1)).isoformat()
+    state['synced_at'] = datetime.now().isoformat(timespec='seconds')
+
+    schedule_path = get_schedule_local_path(season)
+    schedule_path.parent.resolve().mkdir(parents=True, exist_ok=True)
+    with schedule_path.open('w') as outfile:
+        json.dump([ game['link'] for game in games ], outfile)
+    state_path = get_schedule_state_path(season)
+    tmp_path = state_path.with_name(state_path.name + '.tmp')
+    with tmp_path.open('w') as outfile:
+        json.dump(state, outfile)
+    os.replace(tmp_path, state_path)
+    logger.info('Synced ' + season + ' schedule: ' + str(len(changed)) + ' new or changed games')
+    return sorted(changed, key=lambda link: (state['games'][extract_id_from_live_feed_link(link)]['date'], link))
+
+def sync_schedules(seasons, today=None):
+    '''
+    Syncs the schedules of several seasons. See sync_season_schedule.
+
+    Parameters
+    ----------
+    seasons : list of str
+        Seasons to sync. Example: ['20172018', '20182019'].
+    today : datetime.date, optional
+        Last date to query. If None, uses the current date. The default is None.
+
+    Returns
+    -------
+    list of str
+        Live feed links of the games that are new or changed in any of the seasons. Seasons whose schedule couldn't
+        be downloaded are skipped.
+
+    '''
+    changed = []
+    for season in seasons:
+        changed.extend(sync_season_schedule(season, today) or [])
+    return changed
+
+def get_unfinished_links(seasons):
+    '''
+    Lists the games that the last schedule sync found not to be over yet (see SCHEDULE_FINAL_STATES), such as games
+    in progress, scheduled, or postponed. Their raw files are incomplete, so their frames shouldn't be built yet.
+
+    Parameters
+    ----------
+    seasons : list of str
+        Seasons to check. Example: ['20172018', '20182019'].
+
+    Returns
+    -------
+    list of str
+        Live feed links of the unfinished games. Games of seasons that haven't been synced, and games whose status
+        hasn't been seen by a sync, aren't listed.
+
+    '''
+    unfinished = []
+    for season in seasons:
+        state = read_schedule_state(season)
+        if state is None:
+            continue
+        unfinished.extend(game['link'] for game in state['games'].values()
+                          if game.get('status') is not None and game['status'] not in SCHEDULE_FINAL_STATES)
+    return unfinished
+
+#%% Download, store, and retrieve raw live feed files
+
+def extract_id_from_live_feed_link(live_feed_link):
+    '''
+    Extracts the ten-character game id from the live_feed_link.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
 
     Returns
     -------
@@ -295,9 +1429,170 @@ def get_live_feed_path(live_feed_link):
     live_feed_path = current_dir.joinpath(relative_path)
     return live_feed_path
  
+def get_slim_live_feed_path(live_feed_link):
+    '''
+    Obtains the handle for the local slim version of the live feed file. See slim_live_feed.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+
+    Returns
+    -------
+    pathlib.Path
+        Path object for the slim live feed file of the current SLIM_LIVE_FEED_VERSION, whether or not it exists.
+
+    '''
+    current_dir = Path.cwd()
+    relative_path = RAW_LIVE_FEED_FOLDER + 'livefeed_' + extract_id_from_live_feed_link(live_feed_link) + \
+        '.slim' + str(SLIM_LIVE_FEED_VERSION) + '.json.gz'
+    return current_dir.joinpath(relative_path)
+
+def get_local_live_feed_path(live_feed_link):
+    '''
+    Obtains the handle for the local live feed file that read_live_feed_local would read.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+
+    Returns
+    -------
+    pathlib.Path
+        Path object for the slim live feed file if it exists, otherwise for the full live feed file, whether or not
+        it exists.
+
+    '''
+    slim_path = get_slim_live_feed_path(live_feed_link)
+    return slim_path if slim_path.exists() else get_live_feed_path(live_feed_link)
+
+def select_fields(value, fields):
+    '''
+    Copies the given fields of a json object.
+
+    Parameters
+    ----------
+    value : dict
+        The json object.
+    fields : dict
+        Nested dictionary of the keys to keep. A value of None keeps the whole value for that key.
+
+    Returns
+    -------
+    dict
+        Json object with only the given fields.
+
+    '''
+    return { key: value[key] if subfields is None else select_fields(value[key], subfields)
+             for key, subfields in fields.items() if key in value }
+
+def slim_live_feed(live_feed):
+    '''
+    Reduces a live feed to the fields used by the pipeline (see SLIM_LIVE_FEED_GAME_FIELDS and
+    SLIM_LIVE_FEED_PLAY_FIELDS), keeping the layout of the full feed so that it can be used in its place.
+
+    Parameters
+    ----------
+    live_feed : dict
+        The full live feed.
+
+    Returns
+    -------
+    dict
+        The slim live feed, with its format version under 'slimVersion'.
+
+    '''
+    plays = live_feed['liveData']['plays']['allPlays']
+    return {
+        'slimVersion': SLIM_LIVE_FEED_VERSION,
+        'gameData': select_fields(live_feed['gameData'], SLIM_LIVE_FEED_GAME_FIELDS),
+        'liveData': {'plays': {'allPlays': [ select_fields(play, SLIM_LIVE_FEED_PLAY_FIELDS) for play in plays ]}}
+    }
+
+def save_live_feed(live_feed_link, live_feed, storage=None):
+    '''
+    Saves a live feed locally, in the full format, the slim format, or both. Saving only the full format removes any
+    slim version, so that the new feed is the one read.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    live_feed : dict
+        The full live feed.
+    storage : str, optional
+        'full', 'slim', or 'both'. Other values raise ValueError. If None, uses LIVE_FEED_STORAGE. The default is
+        None.
+
+    Returns
+    -------
+    bytes
+        Contents of the file that read_live_feed_local now reads (see get_local_live_feed_path).
+
+    '''
+    storage = LIVE_FEED_STORAGE if storage is None else storage
+    if storage not in ('full', 'slim', 'both'):
+        raise ValueError('Unknown live feed storage ' + repr(storage) + ". Use 'full', 'slim', or 'both'.")
+    live_feed_path = get_live_feed_path(live_feed_link)
+    # Make sure that the folder exists.
+    live_feed_path.parent.resolve().mkdir(parents=True, exist_ok=True)
+    if storage in ('full', 'both'):
+        saved = json.dumps(live_feed).encode()
+        with live_feed_path.open('wb') as outfile:
+            outfile.write(saved)
+    if storage in ('slim', 'both'):
+        slim = slim_live_feed(live_feed)
+        content = orjson.dumps(slim) if orjson is not None else json.dumps(slim).encode()
+        saved = gzip.compress(content)
+        with get_slim_live_feed_path(live_feed_link).open('wb') as outfile:
+            outfile.write(saved)
+    else:
+        # Readers prefer the slim version, so an older one would hide the feed just saved.
+        get_slim_live_feed_path(live_feed_link).unlink(missing_ok=True)
+    return saved
+
+def slim_local_live_feeds(link_list, keep_full=True):
+    '''
+    Saves slim versions of the live feeds already stored locally in the full format.
+
+    Parameters
+    ----------
+    link_list : list of str
+        List of API links to the game live feeds.
+    keep_full : bool, optional
+        If False, deletes each full live feed once its slim version is saved. The default is True.
+
+    Returns
+    -------
+    int
+        Number of live feeds converted.
+
+    '''
+    converted = 0
+    for live_feed_link in link_list:
+        live_feed_path = get_live_feed_path(live_feed_link)
+        if not live_feed_path.exists():
+            continue
+        if not get_slim_live_feed_path(live_feed_link).exists():
+            with live_feed_path.open('rb') as infile:
+                live_feed = orjson.loads(infile.read()) if orjson is not None else json.load(infile)
+            save_live_feed(live_feed_link, live_feed, storage='slim')
+            converted += 1
+        if not keep_full:
+            live_feed_path.unlink()
+    return converted
+
 def read_live_feed_local(live_feed_link):
     '''
-    Reads the local copy of the live feed for the given link, if it exists.
+    Reads the local copy of the live feed for the given link, if it exists. The slim version is read if it exists.
 
     Parameters
     ----------
@@ -313,16 +1608,103 @@ def read_live_feed_local(live_feed_link):
         Otherwise returns None.
 
     '''
+    slim_path = get_slim_live_feed_path(live_feed_link)
+    if slim_path.exists():
+        logger.info('Reading slim raw feed ' + live_feed_link)
+        with gzip.open(str(slim_path), 'rb') as infile:
+            content = infile.read()
+        return orjson.loads(content) if orjson is not None else json.loads(content)
     feed_path = get_live_feed_path(live_feed_link)
     if feed_path.exists():
-        logging.info('Reading raw feed ' + live_feed_link)
-        with feed_path.open('r') as infile:
-            live_feed = json.load(infile)
+        logger.info('Reading raw feed ' + live_feed_link)
+        if orjson is not None:
+            live_feed = orjson.loads(feed_path.read_bytes())
+        else:
+            with feed_path.open('r') as infile:
+                live_feed = json.load(infile)
             
         return live_feed
     else:
         return None
 
+def decode_json_between(buffer, start_key, end_key, position=0):
+    '''
+    Decodes the value of a single key of a json object without decoding the rest of the document. The value is taken
+    to run from start_key to the comma before end_key, the key that follows it in the object.
+
+    Parameters
+    ----------
+    buffer : bytes or mmap.mmap
+        The json document.
+    start_key : bytes
+        The quoted key of the value to decode. Example: b'"gameData"'.
+    end_key : bytes
+        The quoted key following start_key in the same object.
+    position : int, optional
+        Position in the buffer to start searching from. The default is 0.
+
+    Returns
+    -------
+    value : object
+        The decoded value, or None if the keys aren't found or the text between them isn't a single json value.
+    end : int
+        Position of end_key in the buffer, or -1 if the value couldn't be decoded.
+
+    '''
+    start = buffer.find(start_key, position)
+    if start < 0:
+        return None, -1
+    value_start = start + len(start_key)
+    end = buffer.find(end_key, value_start)
+    if end < 0:
+        return None, -1
+    # Skip the colon following the key and the comma preceding the next key.
+    value_start = buffer.find(b':', value_start, end) + 1
+    value_end = buffer.rfind(b',', value_start, end)
+    try:
+        content = buffer[value_start:value_end]
+        return (orjson.loads(content) if orjson is not None else json.loads(content)), end
+    except ValueError:
+        return None, -1
+
+def read_live_feed_partial(live_feed_link):
+    '''
+    Reads only the parts of the local live feed used by the pipeline: 'gameData' and the plays in 'liveData'. Full
+    feeds are memory-mapped, and the 'gameData' and 'allPlays' values are each copied out and decoded in one go, so
+    this only saves the work and memory of decoding the rest of the feed, such as the boxscore and linescore. It is
+    not a streaming parser: the plays are still decoded all at once into a list of dicts for parse_live_feed. The
+    values are found by the keys that follow them in the feeds produced by the API ('liveData' and 'scoringPlays').
+    If the feed doesn't have that layout, the whole feed is read instead.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+
+    Returns
+    -------
+    dict
+        Live feed with keys 'gameData' and 'liveData', where 'liveData' holds only the plays, if the feed is saved
+        locally. Otherwise returns None.
+
+    '''
+    feed_path = get_live_feed_path(live_feed_link)
+    # Slim feeds are already limited to the fields that are used.
+    if get_slim_live_feed_path(live_feed_link).exists() or (not feed_path.exists()) or feed_path.stat().st_size == 0:
+        return read_live_feed_local(live_feed_link)
+    logger.info('Reading plays from raw feed ' + live_feed_link)
+    with feed_path.open('rb') as infile, mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        game_data, end = decode_json_between(buffer, b'"gameData"', b'"liveData"')
+        all_plays = None
+        if game_data is not None:
+            all_plays, _ = decode_json_between(buffer, b'"allPlays"', b'"scoringPlays"', end)
+    if (game_data is None) or (all_plays is None):
+        logger.info('Unexpected layout, reading full raw feed ' + live_feed_link)
+        return read_live_feed_local(live_feed_link)
+    return {'gameData': game_data, 'liveData': {'plays': {'allPlays': all_plays}}}
+
 def download_live_feed(live_feed_link):
     '''
     Downloads the live feed for the given link from the API.
@@ -341,16 +1723,37 @@ def download_live_feed(live_feed_link):
         Otherwise returns None.
 
     '''
-    api_request = requests.get(API_ROOT_URL + live_feed_link)
-    
+    api_request, _ = fetch_raw(API_ROOT_URL + live_feed_link, 'download_feed', live_feed_link)
+    return get_live_feed_from_response(live_feed_link, api_request)
+
+def get_live_feed_from_response(live_feed_link, api_request):
+    '''
+    Extracts the live feed from the response to a live feed request.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    api_request : requests.Response
+        Response to the request for the live feed.
+
+    Returns
+    -------
+    dict
+        Representation of the json object in the response, if the request succeeded.
+        Otherwise returns None.
+
+    '''
     if (api_request.status_code == 200):
-        logging.info('Success downloading raw feed ' + live_feed_link)
+        logger.info('Success downloading raw feed ' + live_feed_link)
         return api_request.json()
     else:
-        logging.error('Error downloading raw feed ' + live_feed_link +' (Status: ' + str(api_request.status_code)+')')
+        logger.error('Error downloading raw feed ' + live_feed_link +' (Status: ' + str(api_request.status_code)+')')
         return None
 
-def get_live_feed(live_feed_link, refresh=False):
+def get_live_feed(live_feed_link, refresh=False, storage=None, rate_limits=None):
     '''
     
     Obtains the raw live feed for the link.
@@ -363,7 +1766,12 @@ def get_live_feed(live_feed_link, refresh=False):
         for more information.
     refresh : bool, optional
         If True, ignores the existence of any local files and re-downloads and processes
-        the data from the API. This will result in overwriting any current saves. The default is False.
+        the data from the API. The request is conditional, and local files are only overwritten if the feed
+        changed. The default is False.
+    storage : str, optional
+        How a downloaded feed is saved. See save_live_feed. The default is None.
+    rate_limits : dict, optional
+        Per-host limits used instead of HOST_RATE_LIMITS. See wait_for_host_rate_limit. The default is None.
 
     Returns
     -------
@@ -375,15 +1783,22 @@ def get_live_feed(live_feed_link, refresh=False):
     # Read the file if it already exists locally and there is no request to re-download.
     read_from_file = read_live_feed_local(live_feed_link) if not refresh else None
     if read_from_file is None:
-        live_feed = download_live_feed(live_feed_link)
+        api_url = API_ROOT_URL + live_feed_link
+        api_request, unchanged = fetch_raw(api_url, 'download_feed', live_feed_link,
+                                           get_local_live_feed_path(live_feed_link), rate_limits)
+        # Leaving the local files alone also leaves every frame built from them up to date.
+        if unchanged:
+            return read_live_feed_local(live_feed_link)
+        live_feed = get_live_feed_from_response(live_feed_link, api_request)
         # Once the raw data is downloaded, save it for faster future processing.
         if live_feed is not None:
-           live_feed_path = get_live_feed_path(live_feed_link)
-           # Make sure that the folder exists.
-           live_feed_path.parent.resolve().mkdir(parents=True, exist_ok=True)
-           live_feed_path.touch()
-           with live_feed_path.open('w') as outfile:
-               json.dump(live_feed, outfile)
+           saved = save_live_feed(live_feed_link, live_feed, storage)
+           save_validators(get_local_live_feed_path(live_feed_link), api_url, api_request)
+           try:
+               catalog_live_feed(live_feed_link, live_feed, content=saved)
+           except sqlite3.Error as err:
+               # The feed is saved, so the download succeeded. update_feed_catalog records it later.
+               logger.warning('Could not catalog ' + live_feed_link + ' (' + repr(err) + ')')
         return live_feed
     else:
         return read_from_file    
@@ -427,62 +1842,146 @@ def parse_live_feed(feed):
         Date Frame containing event data from the live feed file. 
 
     '''
-            
-    return pd.DataFrame({
-        # Game metadata
-        'game_id': str(feed['gameData']['game']['pk']),
-        'season': str(feed['gameData']['game']['season']),
-        'type': feed['gameData']['game']['type'],
-        'game_time': feed['gameData']['datetime']['dateTime'],
-        'away_code': feed['gameData']['teams']['away']['triCode'] \
-            if 'triCode' in feed['gameData']['teams']['away'].keys() else feed['gameData']['teams']['away']['teamName'],
-        'home_code': feed['gameData']['teams']['home']['triCode'] \
-            if 'triCode' in feed['gameData']['teams']['home'].keys() else feed['gameData']['teams']['home']['teamName'],
-        # Venue information. Ideally, we'd just use venue_id, but it is missing for many games, so track venue as well.
-        'venue': feed['gameData']['venue']['name'],
-        #'venue_id': int(feed['gameData']['venue']['id']) if 'id' in feed['gameData']['venue'].keys() else None,
-            
+    game_data = feed['gameData']
+    away_team = game_data['teams']['away']
+    home_team = game_data['teams']['home']
+    home_id = home_team['id']
+    plays = feed['liveData']['plays']['allPlays']
+
+    # Walk the plays once, filling a typed array (or list, for strings) for each column.
+    n_plays = len(plays)
+    event_idx = np.empty(n_plays, dtype=np.int32)
+    period = np.empty(n_plays, dtype=np.int8)
+    cum_time_elapsed = np.empty(n_plays, dtype=np.int32)
+    event_code = np.empty(n_plays, dtype=np.int8)
+    event_coord_x = np.full(n_plays, np.nan, dtype=np.float32)
+    event_coord_y = np.full(n_plays, np.nan, dtype=np.float32)
+    period_ord = [None] * n_plays
+    period_type = [None] * n_plays
+    time_elapsed = [None] * n_plays
+    event_team_code = [None] * n_plays
+    event_team_is_home = [None] * n_plays
+    secondary_type = [None] * n_plays
+    for i, play in enumerate(plays):
+        about = play['about']
+        result = play['result']
+        coordinates = play['coordinates']
         # Use the event ordering used by the feed.
-        'event_idx': [int(play['about']['eventIdx']) for play in feed['liveData']['plays']['allPlays']],
+        event_idx[i] = int(about['eventIdx'])
         # Game time of the event.
         # The period and time elapsed are sufficient, but combining these into 'cum_time_elapsed' allows
         # for more succinct determination of time between separate events.
-        'period': [int(play['about']['period']) for play in feed['liveData']['plays']['allPlays']],
+        play_period = int(about['period'])
+        period[i] = play_period
         # While the ordinal is not crucial, it offers a readable way to determine when the period is a shootout.
-        'period_ord': [play['about']['ordinalNum'] for play in feed['liveData']['plays']['allPlays']],
+        period_ord[i] = about['ordinalNum']
         # Similarly allows easy distinguishing between regulation, overtime, and shootouts.
-        'period_type': [play['about']['periodType'] for play in feed['liveData']['plays']['allPlays']],
-        'time_elapsed': [play['about']['periodTime'] for play in feed['liveData']['plays']['allPlays']],
+        period_type[i] = about['periodType']
+        time_elapsed[i] = about['periodTime']
         # Calculate the number of seconds into the game of the event.
-        'cum_time_elapsed': [ convert_to_seconds(play['about']['periodTime'], int(play['about']['period'])) 
-                                        for play in feed['liveData']['plays']['allPlays']],
-        # Information about the actual event.
-        'event': map(EVENT_TRANSLATION.get, [play['result']['event'] for play in feed['liveData']['plays']['allPlays']]),
-        # Track the team corresponding to the event. This will matter for correction of venue bias.
-        'event_team_code': [ play['team']['triCode'] \
-                            if (('team' in play.keys()) and ('triCode' in play['team'].keys())) else None 
-                            for play in feed['liveData']['plays']['allPlays']],
-        # Determine whether the event is associated to the home team.
-        'event_team_is_home': [(feed['gameData']['teams']['home']['id'] == play['team']['id']) 
-                               if ('team' in play.keys()) else None for play in feed['liveData']['plays']['allPlays']],
-        # Event coordinates. Note: blocked shots are marked at the location of the block, not the shot.
-        'event_coord_x': [float(play['coordinates']['x']) if ('x' in play['coordinates'].keys()) else None 
-                          for play in feed['liveData']['plays']['allPlays']],
-        'event_coord_y': [float(play['coordinates']['y']) if ('y' in play['coordinates'].keys()) else None 
-                          for play in feed['liveData']['plays']['allPlays']],
+        cum_time_elapsed[i] = convert_to_seconds(about['periodTime'], play_period)
+        # Information about the actual event, as a code into LIVE_FEED_EVENT_CATEGORIES.
+        event_code[i] = LIVE_FEED_EVENT_CODES.get(result['event'], -1)
         # Contains shot type for shots and penalty information for penalties
-        'secondary_type': [play['result']['secondaryType'] if ('secondaryType' in play['result'].keys()) else None 
-                           for play in feed['liveData']['plays']['allPlays']]       
+        secondary_type[i] = result.get('secondaryType')
+        if 'team' in play:
+            team = play['team']
+            # Track the team corresponding to the event. This will matter for correction of venue bias.
+            event_team_code[i] = team.get('triCode')
+            # Determine whether the event is associated to the home team.
+            event_team_is_home[i] = (home_id == team['id'])
+        # Event coordinates. Note: blocked shots are marked at the location of the block, not the shot.
+        if 'x' in coordinates:
+            event_coord_x[i] = coordinates['x']
+        if 'y' in coordinates:
+            event_coord_y[i] = coordinates['y']
+
+    return pd.DataFrame({
+        # Game metadata
+        'game_id': str(game_data['game']['pk']),
+        'season': str(game_data['game']['season']),
+        'type': game_data['game']['type'],
+        'game_time': game_data['datetime']['dateTime'],
+        'away_code': away_team['triCode'] if 'triCode' in away_team else away_team['teamName'],
+        'home_code': home_team['triCode'] if 'triCode' in home_team else home_team['teamName'],
+        # Venue information. Ideally, we'd just use venue_id, but it is missing for many games, so track venue as well.
+        'venue': game_data['venue']['name'],
+        'event_idx': event_idx,
+        'period': period,
+        'period_ord': period_ord,
+        'period_type': period_type,
+        'time_elapsed': time_elapsed,
+        'cum_time_elapsed': cum_time_elapsed,
+        'event': pd.Categorical.from_codes(event_code, categories=LIVE_FEED_EVENT_CATEGORIES),
+        'event_team_code': event_team_code,
+        'event_team_is_home': event_team_is_home,
+        'event_coord_x': event_coord_x,
+        'event_coord_y': event_coord_y,
+        'secondary_type': secondary_type
     })
     
-def process_live_feed_frame(frame):
+def flag_rebounds(frame, rebound_window=REBOUND_WINDOW_SECONDS, stoppage_events=FACEOFF_EVENTS, by='game_id'):
+    '''
+    Determines which events of a parsed live feed frame are rebounds, using whole-column operations.
+
+    A rebound is any shot taken within rebound_window seconds of the previous shot, provided that there has been
+    no stoppage between the two shots.
+
+    Parameters
+    ----------
+    frame : Pandas DataFrame
+        Data frame that has been generated by parsing the live feed, in event order. May hold several games.
+    rebound_window : int, optional
+        Maximum number of seconds since the previous shot. The default is REBOUND_WINDOW_SECONDS.
+    stoppage_events : list of str, optional
+        Events marking a stoppage in play. The default is FACEOFF_EVENTS.
+    by : str, optional
+        Column identifying the game of each event, so that shots are never matched across games. The default is
+        'game_id'.
+
+    Returns
+    -------
+    Pandas Series
+        Boolean series, aligned with frame, which is True for rebounds.
+
+    '''
+    is_shot = frame['event'].isin(SHOT_EVENTS)
+    is_stoppage = frame['event'].isin(stoppage_events)
+    games = frame[by]
+
+    def previous_marked_value(column, is_marked):
+        # Number the stretches of events between marked events, where each stretch ends with a marked event. The
+        # running maximum within a stretch, taken at the marked event that ends it, is the value for that marked event.
+        # Carrying it forward gives every event the value from the most recent marked event before it.
+        # Arbitrarily use -1 for events before the first marked event.
+        stretch = is_marked.groupby(games).cumsum() - is_marked
+        stretch_max = frame[column].groupby([games, stretch]).cummax()
+        return stretch_max.where(is_marked).groupby(games).shift().groupby(games).ffill().fillna(-1)
+
+    prev_shot_time = previous_marked_value('cum_time_elapsed', is_shot)
+    prev_shot_idx = previous_marked_value('event_idx', is_shot)
+    # Only the index, not the time, is needed for stoppages, because the only concern with stoppages is guaranteeing
+    # that there was no intervening stoppage between shots. The indexing maintains the order (and allows
+    # distinguishing between events occurring less than a second apart).
+    prev_stoppage_idx = previous_marked_value('event_idx', is_stoppage)
+
+    return (frame['cum_time_elapsed'] <= prev_shot_time + rebound_window) & (prev_shot_idx > prev_stoppage_idx) \
+        & is_shot
+
+def process_live_feed_frame(frame, rebound_window=REBOUND_WINDOW_SECONDS, stoppage_events=FACEOFF_EVENTS):
     '''
     Performs post-parsing processing of the live feed data frame.
 
     Parameters
     ----------
     frame : Pandas DataFrame
-        Data frame that has been generated by parsing the live feed for a game.
+        Data frame that has been generated by parsing the live feed for a game. Frames holding several games,
+        distinguished by 'game_id', can be processed in one call.
+    rebound_window : int, optional
+        Maximum number of seconds after the previous shot for a shot to count as a rebound.
+        The default is REBOUND_WINDOW_SECONDS.
+    stoppage_events : list of str, optional
+        Events used as proxies for stoppages in play. The default is FACEOFF_EVENTS.
 
     Returns
     -------
@@ -495,44 +1994,16 @@ def process_live_feed_frame(frame):
     # This project follows the convention described in http://blog.war-on-ice.com/annotated-glossary/ that a rebound is 
     # any shot taken within 3 seconds of the previous shot.
     # This is a bit tricky since a shot shouldn't count as a rebound if there was an intervening play stoppage.
-    
-    # Track whether the event is a shot
-    frame['is_shot'] = frame['event'].isin(SHOT_EVENTS)
-    # Same concept, but determine whether the event is a stoppage event. While many events stop play, all restarts
-    # (except for penalty shots) are done by faceoff. Penalty shots will be dropped later, meaning they are not
-    # a concern. As a result, faceoffs are used as proxies for stoppage events.
-    frame['is_faceoff'] = frame['event'].isin(FACEOFF_EVENTS) 
-        
-    # Find the recent shot event, not including the current event.
-    # Count the number of previous shot events
-    frame['prev_shot_num'] = frame['is_shot'].cumsum() - frame['is_shot']
-    # Get the times and indices of shot events.
-    shot_times = frame.groupby('prev_shot_num')['cum_time_elapsed'].max()
-    shot_indexes = frame.groupby('prev_shot_num')['event_idx'].max()
-    # Arbitrarily use -1 for events before the first shot.
-    frame['prev_shot_time'] = [shot_times[shot_num - 1] if shot_num > 0 else -1 for shot_num in frame['prev_shot_num']]
-    frame['prev_shot_idx'] = [shot_indexes[shot_num - 1] if shot_num > 0 else -1 for shot_num in frame['prev_shot_num']]
-    
-    # And the most recent faceoff event. Only need the index, not the time, for faceoffs, because the only concern
-    # with faceoffs is guaranteeing that there was no intervening faceoff/stoppage between shots. The indexing maintains
-    # the order (and allows distinguishing between events occurring less than a second apart).
-    frame['prev_faceoff_num'] = frame['is_faceoff'].cumsum() - frame['is_faceoff']
-    faceoff_indexes = frame.groupby('prev_faceoff_num')['event_idx'].max()
-    frame['prev_faceoff_idx'] = [ faceoff_indexes[fo_num - 1] if fo_num > 0 else -1 for fo_num in frame['prev_faceoff_num'] ]
-         
-    # Now, rebounds are defined as any shot taken 3 seconds or less after the preceding shot so long as there has
-    # been no intervening faceoff.
-    frame['is_rebound'] = (frame['cum_time_elapsed'] <= frame['prev_shot_time'] + 3) \
-        & (frame['prev_shot_idx'] > frame['prev_faceoff_idx']) & (frame['is_shot'])
+    # While many events stop play, all restarts (except for penalty shots) are done by faceoff. Penalty shots will be
+    # dropped later, meaning they are not a concern. As a result, faceoffs are used as proxies for stoppage events.
+    frame['is_rebound'] = flag_rebounds(frame, rebound_window, stoppage_events)
 
     # Limit to shots
-    frame = frame[frame['is_shot']].copy()
+    frame = frame[frame['event'].isin(SHOT_EVENTS)].copy()
     
-    # Most of the columns generated above are no longer needed
-    frame.drop(['is_shot', 'is_faceoff', 'prev_shot_num', 'prev_shot_time', 'prev_shot_idx', 'prev_faceoff_num', 
-                'prev_faceoff_idx', 'event_idx'], axis=1, inplace=True)
+    # The event index is no longer needed
+    frame.drop(['event_idx'], axis=1, inplace=True)
     
-   
     return frame
     
     
@@ -557,14 +2028,23 @@ def construct_game_live_feed_frame(live_feed_link, refresh=False):
         Returns None otherwise.
 
     '''
-    feed = get_live_feed(live_feed_link, refresh)
+    # Only the game data and plays are needed, so avoid decoding the whole feed when it's saved locally.
+    with stage_timer('read_feed', live_feed_link) as metrics:
+        feed = read_live_feed_partial(live_feed_link) if not refresh else None
+        metrics['cache_hit'] = feed is not None
+        if feed is None:
+            feed = get_live_feed(live_feed_link, refresh)
+        feed_path = get_local_live_feed_path(live_feed_link)
+        metrics['bytes_read'] = feed_path.stat().st_size if feed_path.exists() else 0
     
     if feed is not None:
         # There are two key steps to producing the frame.
         # First, parse the frame and pull out necessary data.
-        frame = parse_live_feed(feed)
+        with stage_timer('parse_feed', live_feed_link):
+            frame = parse_live_feed(feed)
         # Second, process the frame and add derived columns    
-        return process_live_feed_frame(frame)
+        with stage_timer('process_feed', live_feed_link):
+            return process_live_feed_frame(frame)
     else:
         return None
 
@@ -615,8 +2095,10 @@ def read_game_live_feed_frame(live_feed_link):
 
     file = get_game_live_feed_frame_path(live_feed_link)
     if file.exists():
-        logging.info('Reading live feed data frame for ' + extract_id_from_live_feed_link(live_feed_link))
-        game_frame = pd.read_pickle(str(file))
+        logger.info('Reading live feed data frame for ' + extract_id_from_live_feed_link(live_feed_link))
+        with stage_timer('read_feed_frame', live_feed_link) as metrics:
+            game_frame = pd.read_pickle(str(file))
+            metrics['bytes_read'] = file.stat().st_size
         return game_frame
     else:
         return None
@@ -645,20 +2127,24 @@ def get_game_live_feed_frame(live_feed_link, refresh=False, refresh_frame=False)
 
     '''   
     refresh_any = refresh | refresh_frame
-    read_from_file = read_game_live_feed_frame(live_feed_link) if not refresh_any else None
-    if read_from_file is None:
-        game_frame = construct_game_live_feed_frame(live_feed_link, refresh)
-        # Save the frame
-        if game_frame is not None:
-            # Make sure that the folder exists.
-            game_frame_path = get_game_live_feed_frame_path(live_feed_link)
-            game_frame_path.parent.resolve().mkdir(parents=True, exist_ok=True)  
-            # Now the file can be saved.              
-            game_frame.to_pickle(str(game_frame_path)) 
-            
-        return game_frame
-    else:
-        return read_from_file
+    with stage_timer('feed_frame', live_feed_link) as metrics:
+        read_from_file = read_game_live_feed_frame(live_feed_link) if not refresh_any else None
+        metrics['cache_hit'] = read_from_file is not None
+        if read_from_file is None:
+            game_frame = construct_game_live_feed_frame(live_feed_link, refresh)
+            # Save the frame
+            if game_frame is not None:
+                # Make sure that the folder exists.
+                game_frame_path = get_game_live_feed_frame_path(live_feed_link)
+                game_frame_path.parent.resolve().mkdir(parents=True, exist_ok=True)  
+                # Now the file can be saved.              
+                with stage_timer('write_feed_frame', live_feed_link) as write_metrics:
+                    game_frame.to_pickle(str(game_frame_path)) 
+                    write_metrics['bytes_written'] = game_frame_path.stat().st_size
+                
+            return game_frame
+        else:
+            return read_from_file
 #%% Download, store, and retrieve raw play-by-play html reports
 def get_game_html_report_frame_path(live_feed_link):
     '''
@@ -733,7 +2219,7 @@ def get_html_report_url(live_feed_link):
     # The game portion is the last six characters of the id portion of the link.
     # For '/api/v1/game/2018020240/feed/live', it will be '020240'.
     game = extract_id_from_live_feed_link(live_feed_link)[-6:]
-    return 'http://www.nhl.com/scores/htmlreports/' + season + '/PL' + game + '.HTM'
+    return HTML_REPORT_ROOT_URL + '/' + season + '/PL' + game + '.HTM'
 
 def download_game_html_report(live_feed_link):
     '''
@@ -748,43 +2234,168 @@ def download_game_html_report(live_feed_link):
 
     Returns
     -------
-    BeautifulSoup
-        BeautifulSoup representation of the html report corresponding to the link, if it exists.
+    bytes
+        Raw content of the html report corresponding to the link, if it exists. The report isn't parsed here;
+        parsing is left to the frame stage.
         Otherwise returns None.
 
     '''
     html_report_url = get_html_report_url(live_feed_link)
-    report = requests.get(html_report_url)
-    if (report.status_code == 200):
-        logging.info('Success reading html report ' + html_report_url)
-        return BeautifulSoup(report.content, 'html.parser')
-    else:
-        logging.error('Failure reading html report ' + html_report_url + ' (status: ' + str(report.status_code) +')')
-        return None
-
+    report, _ = fetch_raw(html_report_url, 'download_html', live_feed_link)
+    return get_html_report_from_response(html_report_url, report)
 
-def get_game_html_report_path(live_feed_link):
+def get_html_report_from_response(html_report_url, report):
     '''
-    Obtains the handle for the local version of the html report file.
+    Extracts the html report from the response to an html report request.
 
     Parameters
     ----------
-    live_feed_link : str
-        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
-        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+    html_report_url : str
+        URL of the html report. See get_html_report_url.
+    report : requests.Response
+        Response to the request for the html report.
+
+    Returns
+    -------
+    bytes
+        Raw content of the html report, if the request succeeded.
+        Otherwise returns None.
+
+    '''
+    if (report.status_code == 200):
+        logger.info('Success reading html report ' + html_report_url)
+        return report.content
+    else:
+        logger.error('Failure reading html report ' + html_report_url + ' (status: ' + str(report.status_code) +')')
+        return None
+
+
+def get_game_html_report_path(live_feed_link):
+    '''
+    Obtains the handle for the local version of the html report file. The file holds the raw bytes of the report,
+    gzip-compressed.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
         for more information.
 
     Returns
     -------
-    live_feed_path : pathlib.Path
-        Path object for the local live feed file, if it exists. If it doesn't exist, points
+    html_report_path : pathlib.Path
+        Path object for the local html report file, if it exists. If it doesn't exist, points
         to the location that it would exist, allowing saving at that location.
 
+    '''
+    current_dir = Path.cwd()
+    relative_path = RAW_HTML_REPORT_FOLDER + 'htmlreport_' + extract_id_from_live_feed_link(live_feed_link) + '.html.gz'
+    html_report_path = current_dir.joinpath(relative_path)
+    return html_report_path
+
+def get_legacy_game_html_report_path(live_feed_link):
+    '''
+    Obtains the handle for an html report saved in the older format, a pickled string of the parsed report.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+
+    Returns
+    -------
+    pathlib.Path
+        Path object for the older local html report file, whether or not it exists.
+
     '''
     current_dir = Path.cwd()
     relative_path = RAW_HTML_REPORT_FOLDER + 'htmlreport_' + extract_id_from_live_feed_link(live_feed_link) + '.pkl'
-    live_feed_path = current_dir.joinpath(relative_path)
-    return live_feed_path
+    return current_dir.joinpath(relative_path)
+
+def read_game_html_report_content(live_feed_link):
+    '''
+    Reads the local copy of the html report for the game corresponding to the given link, if it exists, without
+    parsing it.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+
+    Returns
+    -------
+    bytes or str
+        Raw content of the html report, if it is saved locally. Reports saved in the older pickle format are
+        returned as a str.
+        Otherwise returns None.
+
+    '''
+    html_report_path = get_game_html_report_path(live_feed_link)
+    if html_report_path.exists():
+        logger.info('Reading raw html report ' + live_feed_link)
+        with gzip.open(str(html_report_path), 'rb') as infile:
+            return infile.read()
+    legacy_path = get_legacy_game_html_report_path(live_feed_link)
+    if legacy_path.exists():
+        logger.info('Reading raw html report ' + live_feed_link)
+        with legacy_path.open('rb') as infile:
+            return pickle.load(infile)
+    return None
+
+def get_game_html_report_content(live_feed_link, refresh = False, rate_limits=None):
+    '''
+    Obtains the raw html report data for the game corresponding to the live_feed_link, without parsing it.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    refresh : bool, optional
+        If True, ignores the existence of any local files and re-downloads and processes
+        the data from the API. The request is conditional, and the local file is only overwritten if the report
+        changed. The default is False.
+    rate_limits : dict, optional
+        Per-host limits used instead of HOST_RATE_LIMITS. See wait_for_host_rate_limit. The default is None.
+
+    Returns
+    -------
+    bytes or str
+        Raw content of the html report for the game. See read_game_html_report_content.
+        Returns None if the report can't be obtained.
+
+    '''
+    read_from_file = read_game_html_report_content(live_feed_link) if not refresh else None
+    if read_from_file is None:
+        html_report_url = get_html_report_url(live_feed_link)
+        html_report_path = get_game_html_report_path(live_feed_link)
+        report, unchanged = fetch_raw(html_report_url, 'download_html', live_feed_link, html_report_path,
+                                      rate_limits)
+        if unchanged:
+            return read_game_html_report_content(live_feed_link)
+        html_report = get_html_report_from_response(html_report_url, report)
+         # Save the report
+        if html_report is not None:
+            # Make sure that the folder exists.
+            html_report_path.parent.resolve().mkdir(parents=True, exist_ok=True)  
+            # Now the file can be saved. 
+            with gzip.open(str(html_report_path), 'wb', compresslevel=HTML_REPORT_COMPRESSION_LEVEL) as outfile:
+                outfile.write(html_report)
+            save_validators(html_report_path, html_report_url, report)
+            try:
+                catalog_html_report(live_feed_link)
+            except sqlite3.Error as err:
+                # The report is saved, so the download succeeded. catalog_live_feed detects it later.
+                logger.warning('Could not catalog the html report of ' + live_feed_link + ' (' + repr(err) + ')')
+        return html_report
+    else:
+        return read_from_file
 
 def read_game_html_report(live_feed_link):
     '''
@@ -804,13 +2415,9 @@ def read_game_html_report(live_feed_link):
         Otherwise returns None.
 
     '''
-    html_report_path = get_game_html_report_path(live_feed_link)
-    if html_report_path.exists():
-        logging.info('Reading raw html report ' + live_feed_link)
-        with html_report_path.open('rb') as infile:
-            html_report = pickle.load(infile)
-        report_soup = BeautifulSoup(html_report, 'lxml')
-        return report_soup
+    html_report = read_game_html_report_content(live_feed_link)
+    if html_report is not None:
+        return bs4.BeautifulSoup(html_report, 'lxml')
     else:
         return None
 
@@ -834,22 +2441,11 @@ def get_game_html_report(live_feed_link, refresh = False):
         BeautifulSoup object representing the html report for the game.
 
     '''
-    read_from_file = read_game_html_report(live_feed_link) if not refresh else None
-    if read_from_file is None:
-        html_report = download_game_html_report(live_feed_link)
-         # Save the report
-        if html_report is not None:
-            # There are currently issues saving the HTML reports locally. Ignore that for the time being.
-            pass
-            # Make sure that the folder exists.
-            html_report_path = get_game_html_report_path(live_feed_link)
-            html_report_path.parent.resolve().mkdir(parents=True, exist_ok=True)  
-            # Now the file can be saved. 
-            with html_report_path.open('wb') as outfile:
-                pickle.dump(str(html_report), outfile)
-        return html_report
+    html_report = get_game_html_report_content(live_feed_link, refresh)
+    if html_report is not None:
+        return bs4.BeautifulSoup(html_report, 'lxml')
     else:
-        return read_from_file
+        return None
 
 #%% Process html play-by-play reports into data frame, store, and retrieve data frames.
 def parse_row_index(row):
@@ -944,6 +2540,48 @@ def parse_row_event(row):
     '''
     return list(row.children)[9].get_text()
 
+# Patterns identifying the kinds of field found in a shot description. See parse_row_desc_components.
+DESC_FIELD_PATTERNS = {
+    'zone': r'[Zz]one$',
+    'name': r'\#',
+    'assist': r'Assist',
+    'dist': r'ft\.$',
+    'shot_type': r'S[nl]ap|Backhand|Wrist|Deflected|Tip|Wrap',
+    'miss_type': r'Net|Goalpost|Crossbar'
+}
+DESC_FIELD_REGEXES = { kind: re.compile(pattern) for kind, pattern in DESC_FIELD_PATTERNS.items() }
+# All of the patterns combined into a single tokenizer. Each kind is an optional lookahead from the start of the field,
+# so a single match reports every kind that the field belongs to.
+DESC_FIELD_TOKENIZER = re.compile(''.join('(?:(?=(?P<' + kind + '>.*?(?:' + pattern + '))))?'
+                                          for kind, pattern in DESC_FIELD_PATTERNS.items()), re.DOTALL)
+DISTANCE_PATTERN = re.compile(r'\d+(?=.*ft\.)')
+# Maximum number of distinct descriptions and description fields remembered by the description parser.
+# Descriptions repeat heavily across a season, so most rows are answered from the cache.
+DESC_CACHE_SIZE = 65536
+# Columns that the html report parsers produce from shot descriptions, in the order of the tuples returned by
+# parse_shot_description_cached. They are missing for events that aren't shots.
+SHOT_DESCRIPTION_FIELDS = ('shot_dist', 'event_zone', 'miss_type', 'shot_type')
+NO_SHOT_DESCRIPTION = (None, None, None, None)
+
+@lru_cache(maxsize=DESC_CACHE_SIZE)
+def classify_desc_field(part):
+    '''
+    Determines every kind of field that a text field from a shot description could be.
+
+    Parameters
+    ----------
+    part : str
+        Text field extracted from the description.
+
+    Returns
+    -------
+    frozenset of str
+        The keys of DESC_FIELD_PATTERNS whose pattern is found in the field.
+
+    '''
+    match = DESC_FIELD_TOKENIZER.match(part)
+    return frozenset(kind for kind, found in match.groupdict().items() if found is not None)
+
 def is_zone_field(part):
     '''
     Determines if the text field marks an ice zone.
@@ -959,7 +2597,7 @@ def is_zone_field(part):
         True if the field marks a zone of the ice (Offensive/Defensive/Neutral), false otherwise.
 
     '''
-    return bool(re.search(r'[Zz]one$', part))
+    return bool(DESC_FIELD_REGEXES['zone'].search(part))
 
 def is_name_field(part):
     '''
@@ -977,7 +2615,7 @@ def is_name_field(part):
                                                also in the field).
 
     '''
-    return bool(re.search(r'\#', part))
+    return bool(DESC_FIELD_REGEXES['name'].search(part))
 
 def is_assist_field(part):
     '''
@@ -993,7 +2631,7 @@ def is_assist_field(part):
         True if the field describes assists (determined by the presence of the word 'Assist'). False otherwise.
 
     '''
-    return bool(re.search(r'Assist', part))
+    return bool(DESC_FIELD_REGEXES['assist'].search(part))
                 
 def is_dist_field(part):
     '''
@@ -1010,7 +2648,7 @@ def is_dist_field(part):
         True if the field describes a distance (determined by presence of the unit 'ft.'). False otherwise.
 
     '''
-    return bool(re.search(r'ft\.$', part))
+    return bool(DESC_FIELD_REGEXES['dist'].search(part))
 
 def is_shot_type_field(part):
     '''
@@ -1028,7 +2666,7 @@ def is_shot_type_field(part):
         'Wraparound'.
 
     '''
-    return bool(re.search(r'S[nl]ap|Backhand|Wrist|Deflected|Tip|Wrap', part))
+    return bool(DESC_FIELD_REGEXES['shot_type'].search(part))
 
 def is_miss_type_field(part):
     '''
@@ -1045,7 +2683,7 @@ def is_miss_type_field(part):
         True if the field describes how a shot missed. This could be 'Wide of Net', 'Over Net', 'Hit Goalpost', 'Hit Crossbar'.
 
     '''
-    return bool(re.search(r'Net|Goalpost|Crossbar', part))
+    return bool(DESC_FIELD_REGEXES['miss_type'].search(part))
 
 def extract_distance(part):
     '''
@@ -1062,7 +2700,7 @@ def extract_distance(part):
         The integer value (in feet) of the shot distance. Returns None if no unit marker was found.
 
     '''
-    res = re.search('\d+(?=.*ft\.)', part)
+    res = DISTANCE_PATTERN.search(part)
     if res:
         return int(res.group(0))
     else:
@@ -1104,19 +2742,19 @@ def parse_row_desc_components(parts, event):
               'miss_type': None, 'shot_type': None }
     
     # Check for assists, which only matters for goals.
-    if ((idx < len(parts)) & (event=='GOAL')):
-        if (is_assist_field(parts[idx])):
+    if ((idx < len(parts)) and (event=='GOAL')):
+        if ('assist' in classify_desc_field(parts[idx])):
             # Always ignore the assist field
             idx += 1
     
     # Next, check for a distance field
-    if ((idx < len(parts)) & is_dist_field(parts[idx])):
+    if ((idx < len(parts)) and ('dist' in classify_desc_field(parts[idx]))):
         dist = extract_distance(parts[idx])
         parsed['shot_dist'] = dist
         idx += 1
         
     # Next, check for a zone field
-    if ((idx < len(parts)) & is_zone_field(parts[idx])):
+    if ((idx < len(parts)) and ('zone' in classify_desc_field(parts[idx]))):
         parsed['event_zone'] = parts[idx]
         idx += 1
 
@@ -1124,7 +2762,7 @@ def parse_row_desc_components(parts, event):
     # as well.
     if (idx < len(parts)):
         if (event=='MISS'):
-            if (is_miss_type_field(parts[idx])):
+            if ('miss_type' in classify_desc_field(parts[idx])):
                 # If it's an obvious miss, then include it.
                 parsed['miss_type'] = parts[idx]
                 idx += 1
@@ -1133,7 +2771,7 @@ def parse_row_desc_components(parts, event):
                 # miss in case the field includes an unusual description or incorrect spelling.
                 # The only evidence against being a miss-type is evidence for the field being a name field
                 # or a shot-type field.
-                guess_false = is_name_field(parts[idx]) | is_shot_type_field(parts[idx])
+                guess_false = bool(classify_desc_field(parts[idx]) & {'name', 'shot_type'})
                 if not guess_false:
                     # There is no good evidence against it being a miss type.
                     parsed['miss_type'] = parts[idx]
@@ -1146,20 +2784,101 @@ def parse_row_desc_components(parts, event):
            
     # Final field to check is presumptively the shot-type field.
     if (idx < len(parts)):
-        if (is_shot_type_field(parts[idx])):
+        if ('shot_type' in classify_desc_field(parts[idx])):
             # Obvious shot
             parsed['shot_type'] = parts[idx]
         else:
             # Like with miss-type, this field is presumptively the shot-type, unless it is obviously a name field.
-            if not is_name_field(parts[idx]):
+            if 'name' not in classify_desc_field(parts[idx]):
                 parsed['shot_type'] = parts[idx]
                 
        
     return parsed
 
+@lru_cache(maxsize=DESC_CACHE_SIZE)
+def parse_shot_description_cached(desc, event):
+    '''
+    Memoized core of parse_shot_description. Holds at most DESC_CACHE_SIZE descriptions.
+
+    Parameters
+    ----------
+    desc : str
+        The event description, with fields separated by ', '.
+    event : str
+        A string indicating the type of event that the description field describes. Can be 'SHOT', 'GOAL', 'MISS',
+        or 'BLOCK'.
+
+    Returns
+    -------
+    tuple
+        The 'shot_dist', 'event_zone', 'miss_type', and 'shot_type' found by parse_row_desc_components, in that order.
+        A tuple is returned rather than a dict since cached values are shared, and must not be modified by callers.
+
+    '''
+    parsed = parse_row_desc_components(desc.split(', '), event)
+    return (parsed['shot_dist'], parsed['event_zone'], parsed['miss_type'], parsed['shot_type'])
+
+def parse_shot_description(desc, event):
+    '''
+    Extracts the shot distance, event zone, shot type, and miss type from the full description of a shot.
+    Results are cached on the description and event, since the same descriptions appear many times in a season.
+
+    Parameters
+    ----------
+    desc : str
+        The event description, with fields separated by ', '.
+    event : str
+        A string indicating the type of event that the description field describes. Can be 'SHOT', 'GOAL', 'MISS',
+        or 'BLOCK'.
+
+    Returns
+    -------
+    dict
+        Same as parse_row_desc_components.
+
+    '''
+    return dict(zip(SHOT_DESCRIPTION_FIELDS, parse_shot_description_cached(desc, event)))
+
+def get_shot_description_columns(descriptions):
+    '''
+    Splits the parsed descriptions of a report's events into one column per field.
+
+    Parameters
+    ----------
+    descriptions : list of tuple
+        Parsed description of each event, as returned by parse_row_desc.
+
+    Returns
+    -------
+    dict
+        Maps each name in SHOT_DESCRIPTION_FIELDS to the list of its values.
+
+    '''
+    if not descriptions:
+        return { field: [] for field in SHOT_DESCRIPTION_FIELDS }
+    return dict(zip(SHOT_DESCRIPTION_FIELDS, map(list, zip(*descriptions))))
+
+def get_desc_parser_cache_stats():
+    '''
+    Reports how effective the description parser caches have been in the current process.
+
+    Returns
+    -------
+    Pandas DataFrame
+        One row each for the 'descriptions' cache (parse_shot_description) and the 'fields' cache
+        (classify_desc_field), with columns 'hits', 'misses', 'size', 'maxsize', and 'hit_rate'.
+
+    '''
+    stats = { 'descriptions': parse_shot_description_cached.cache_info(), 'fields': classify_desc_field.cache_info() }
+    frame = pd.DataFrame({ name: { 'hits': info.hits, 'misses': info.misses, 'size': info.currsize,
+                                   'maxsize': info.maxsize } for name, info in stats.items() }).T
+    lookups = frame['hits'] + frame['misses']
+    frame['hit_rate'] = np.where(lookups > 0, frame['hits'] / lookups.where(lookups > 0, 1), np.nan)
+    return frame
+
 def parse_row_desc(row):
     '''
-    Extracts the description from an event and splits it for ease of future parsing.
+    Extracts the description from an event and parses it, if the event is a shot.
 
     Parameters
     ----------
@@ -1168,9 +2887,9 @@ def parse_row_desc(row):
 
     Returns
     -------
-    list of str
-        The event description split at commas. For goals, an additional split is added after the 
-        distance and before the assists.
+    tuple
+        For shot events, the parsed description (see parse_shot_description_cached). NO_SHOT_DESCRIPTION for other
+        events.
 
     '''
     # The description can contain non-breaking spaces, which are replaced with normal spaces.
@@ -1182,14 +2901,10 @@ def parse_row_desc(row):
     # The order of items depends on the type of row being parsed.
     
     event = parse_row_event(row)
-    desc = list(row.children)[11].get_text(separator=', ')
-
-                                                                                            
     if (event in SHOT_EVENTS):
-        desc_parts = desc.split(', ')
-        return parse_row_desc_components(desc_parts, event)
+        return parse_shot_description_cached(list(row.children)[11].get_text(separator=', '), event)
     else:
-        return desc
+        return NO_SHOT_DESCRIPTION
 
 
 def parse_on_ice_pos(row, home):
@@ -1205,9 +2920,10 @@ def parse_on_ice_pos(row, home):
 
     Returns
     -------
-    Counter
-        Counter of all positions found on the ice for the event. Example: if there are two centers, a left winger,
-        two defense and a goaltender, will return Counter({'C': 2, 'L': 1, 'D': 2, 'G': 1})
+    str
+        The positions of the players found on the ice for the event, one letter per player. Example: if there are
+        two centers, a left winger, two defense and a goaltender, might return 'CCLDDG'.
+        Returns None if the section has no players.
 
     '''
     # The visiting team uses index 13, the home team 15. Start by grabbing the correct section of the row.
@@ -1217,7 +2933,7 @@ def parse_on_ice_pos(row, home):
         # If the section exists, we can break it down further into subsections for each player
         player_list = sec.find_all('table')
         # Each player subsection contains two cells. The player position is the text from the second cell.
-        return Counter([ player.find_all('td')[1].get_text() for player in player_list])
+        return ''.join([ player.find_all('td')[1].get_text() for player in player_list])
     else:
         return None
 
@@ -1240,6 +2956,45 @@ def parse_penalty_shot(row):
     return bool(re.search('Penalty Shot', list(row.children)[11].get_text().replace('\xa0',' ')))
  
     
+def count_on_ice_positions(position_strings, side):
+    '''
+    Converts the positions on ice for each event into fixed-width integer columns. The letters of all events are
+    counted at once through a lookup table, rather than event by event.
+
+    Parameters
+    ----------
+    position_strings : list of str
+        Positions on ice for each event, one letter per player, as returned by parse_on_ice_pos. None for events
+        without players on ice.
+    side : str
+        'a' for the away team or 'h' for the home team.
+
+    Returns
+    -------
+    dict
+        Maps the column name 'pos_<position>_<side>' for each position in ON_ICE_POSITIONS to a nullable Int8 array
+        giving the number of players at that position. Events without players on ice are missing (NA).
+        Letters not in ON_ICE_POSITIONS are ignored.
+
+    '''
+    n_events = len(position_strings)
+    missing = np.fromiter((positions is None for positions in position_strings), dtype=bool, count=n_events)
+    lengths = np.fromiter((len(positions) if positions is not None else 0 for positions in position_strings),
+                          dtype=np.int64, count=n_events)
+    # Non-ascii characters are replaced one for one, so each event keeps its length and the replacements are ignored.
+    letters = np.frombuffer(''.join(positions for positions in position_strings if positions is not None)
+                            .encode('ascii', 'replace'), dtype=np.uint8)
+    lookup = np.full(256, -1, dtype=np.int64)
+    lookup[[ ord(position) for position in ON_ICE_POSITIONS ]] = np.arange(len(ON_ICE_POSITIONS))
+    columns = lookup[letters]
+    rows = np.repeat(np.arange(n_events), lengths)
+    known = columns >= 0
+    counts = np.bincount(rows[known] * len(ON_ICE_POSITIONS) + columns[known],
+                         minlength=n_events * len(ON_ICE_POSITIONS)).reshape(n_events, len(ON_ICE_POSITIONS))
+    counts = counts.astype(np.int8)
+    return { 'pos_' + position + '_' + side: pd.arrays.IntegerArray(counts[:, j].copy(), missing.copy())
+            for j, position in enumerate(ON_ICE_POSITIONS) }
+
 def parse_game_html_report(report):
     '''
     Parses game html report to produce a pandas data frame.
@@ -1275,14 +3030,125 @@ def parse_game_html_report(report):
         'time_elapsed': [ parse_row_time(row, True) for row in event_rows],
         'time_remaining': [ parse_row_time(row, False) for row in event_rows],
         'event': [ parse_row_event(row) for row in event_rows],
-        'desc': [ parse_row_desc(row) for row in event_rows],
         'is_penalty_shot': [ parse_penalty_shot(row) for row in event_rows],
         # Positions for players on ice, away and home respectively
-        'pos_a':  [ parse_on_ice_pos(row, False) for row in event_rows],
-        'pos_h': [ parse_on_ice_pos(row, True) for row in event_rows]
+        **count_on_ice_positions([ parse_on_ice_pos(row, False) for row in event_rows], 'a'),
+        **count_on_ice_positions([ parse_on_ice_pos(row, True) for row in event_rows], 'h'),
+        **get_shot_description_columns([ parse_row_desc(row) for row in event_rows])
     })    
     return frame
 
+# Queries used by parse_game_html_report_content. Compiled by get_html_report_queries on first use.
+HTML_REPORT_QUERIES = {
+    # Play-by-play rows are either all the same class or one of two classes.
+    'event_rows': "//tr[contains(@class, 'evenColor') or contains(@class, 'oddColor')]",
+    'row_cells': './td',
+    'cell_text': './text()',
+    'descendant_text': './/text()',
+    'tables': './/table',
+    'player_cells': './/td'
+}
+PENALTY_SHOT_PATTERN = re.compile('Penalty Shot')
+
+@lru_cache(maxsize=None)
+def get_html_report_queries():
+    '''
+    Compiles the queries in HTML_REPORT_QUERIES.
+
+    Returns
+    -------
+    dict
+        Compiled lxml XPath object for each query.
+
+    '''
+    from lxml import etree
+    return { name: etree.XPath(query) for name, query in HTML_REPORT_QUERIES.items() }
+
+def parse_on_ice_cell(cell):
+    '''
+    Extracts the positions of the players on ice for one of the teams from the lxml element for the on-ice cell of
+    an event. Equivalent to parse_on_ice_pos.
+
+    Parameters
+    ----------
+    cell : lxml.html.HtmlElement
+        The away (8th) or home (9th) cell of an event row.
+
+    Returns
+    -------
+    str
+        The positions of the players found on the ice for the event, one letter per player. Returns None if the cell
+        has no players.
+
+    '''
+    queries = get_html_report_queries()
+    tables = queries['tables'](cell)
+    if not tables:
+        return None
+    # The first table holds one nested table per player. Each player table contains two cells, the player number
+    # and the player position.
+    return ''.join([ queries['player_cells'](player)[1].text_content() for player in queries['tables'](tables[0]) ])
+
+def parse_game_html_report_content(html_report):
+    '''
+    Parses the raw game html report to produce a pandas data frame. Produces the same frame as
+    parse_game_html_report, but walks the play-by-play table once with lxml instead of building a BeautifulSoup tree
+    and making a separate pass for each column.
+
+    Parameters
+    ----------
+    html_report : bytes or str
+        Raw content of the html report page.
+
+    Returns
+    -------
+    frame :     Pandas DataFrame
+        Date Frame containing event data from the html report. 
+
+    '''
+    import lxml.html
+    queries = get_html_report_queries()
+    document = lxml.html.fromstring(html_report)
+    columns = { 'period': [], 'strength': [], 'time_elapsed': [], 'time_remaining': [], 'event': [],
+               'is_penalty_shot': [] }
+    descriptions = []
+    positions_a = []
+    positions_h = []
+    for row in queries['event_rows'](document):
+        # Cells are
+        #   0: Index
+        #   1: Period (In regular season, OT is 4 and SO is 5)
+        #   2: Strength (Even strength = EV, Power play = PP, Short-handed = SH)
+        #   3: Time elapse / Time remaining
+        #   4: Event type
+        #   5: Event detailed description
+        #   6: Visiting/away players on ice / jersey numbers and positions
+        #   7: Home players on ice / jersey numbers and positions
+        cells = queries['row_cells'](row)
+        columns['period'].append(int(cells[1].text_content()))
+        # The strength can contain non-breaking spaces, which are replaced with normal spaces.
+        columns['strength'].append(cells[2].text_content().replace('\xa0', ' '))
+        # The times are missing initial '0's, meaning they don't match with the live feeds without adjustment.
+        times = queries['cell_text'](cells[3])
+        columns['time_elapsed'].append(times[0].rjust(5, '0'))
+        columns['time_remaining'].append(times[1].rjust(5, '0'))
+        event = cells[4].text_content()
+        columns['event'].append(event)
+        # See parse_row_desc for the handling of the description.
+        if (event in SHOT_EVENTS):
+            descriptions.append(parse_shot_description_cached(', '.join(queries['descendant_text'](cells[5])), event))
+        else:
+            descriptions.append(NO_SHOT_DESCRIPTION)
+        columns['is_penalty_shot'].append(
+            bool(PENALTY_SHOT_PATTERN.search(cells[5].text_content().replace('\xa0', ' '))))
+        positions_a.append(parse_on_ice_cell(cells[6]))
+        positions_h.append(parse_on_ice_cell(cells[7]))
+    # Positions for players on ice, away and home respectively
+    columns.update(count_on_ice_positions(positions_a, 'a'))
+    columns.update(count_on_ice_positions(positions_h, 'h'))
+    columns.update(get_shot_description_columns(descriptions))
+    return pd.DataFrame(columns)
+
 def process_parsed_report(frame):
     '''
     Performs post-parsing processing of the html report data frame.
@@ -1295,38 +3161,28 @@ def process_parsed_report(frame):
     Returns
     -------
     frame : Pandas DataFrame
-        The input data frame with additional columns 'event_zone', 'how_missed', 'shot_dist', and 'shot_type'.
+        The input data frame with the number of forwards ('fwd_a'/'fwd_h'), defensemen ('def_a'/'def_h'), and skaters ('skaters_a'/
+        'skaters_h') on ice for each side and whether each side's goalie is pulled ('goalie_pulled_a'/'goalie_pulled_h').
         All non-shot events are also removed.
 
     '''
     frame['seconds_remaining'] = frame['time_remaining'].apply(lambda x: convert_to_seconds(x))
     
-    #FWD_DEF_MAPPING = { 'C': 'FWD', 'L': 'FWD', 'R': 'FWD', 'F': 'FWD', 'D': 'DEF', 'G': 'GOAL'}
-    #SKATER_MAPPING = { 'C': 'SKTR', 'L': 'SKTR', 'R': 'SKTR', 'F': 'SKTR', 'D': 'SKTR', 'G': 'GOAL'}
-
-    frame['fwd_def_a'] = frame['pos_a'].apply(lambda x: 
-                                              Counter(map(FWD_DEF_MAPPING.get, x.elements())) if x is not None else None)
-    frame['fwd_def_h'] = frame['pos_h'].apply(lambda x: 
-                                              Counter(map(FWD_DEF_MAPPING.get, x.elements())) if x is not None else None)
-    frame['skaters_a'] = frame['pos_a'].apply(lambda x: 
-                                              Counter(map(SKATER_MAPPING.get, x.elements())) if x is not None else None)
-    frame['skaters_h'] = frame['pos_h'].apply(lambda x: 
-                                              Counter(map(SKATER_MAPPING.get, x.elements())) if x is not None else None)
-                                                                                                                                          
-    frame['goalie_pulled_a'] = frame['pos_a'].apply(lambda x: x['G']==0 if x is not None else None)
-    frame['goalie_pulled_h'] = frame['pos_h'].apply(lambda x: x['G']==0 if x is not None else None)
+    # Summarize the players on ice for each side with plain integer arithmetic on the position count columns.
+    # Events without players on ice stay missing (NA) in every summary column.
+    for side in ['a', 'h']:
+        frame['fwd_' + side] = sum(frame['pos_' + position + '_' + side] for position in ON_ICE_POSITIONS
+                                   if FWD_DEF_MAPPING[position] == 'FWD')
+        frame['def_' + side] = sum(frame['pos_' + position + '_' + side] for position in ON_ICE_POSITIONS
+                                   if FWD_DEF_MAPPING[position] == 'DEF')
+        frame['skaters_' + side] = sum(frame['pos_' + position + '_' + side] for position in ON_ICE_POSITIONS
+                                       if SKATER_MAPPING[position] == 'SKTR')
+        frame['goalie_pulled_' + side] = frame['pos_G_' + side] == 0
     
-    expanded_dicts = frame['desc'].apply(pd.Series)
-    frame['shot_dist'] = expanded_dicts['shot_dist']
-    frame['event_zone'] = expanded_dicts['event_zone']
-    frame['miss_type'] = expanded_dicts['miss_type']
-    frame['shot_type'] = expanded_dicts['shot_type']
-    
-    # Finally, reduce the table to only shot events.
-    frame = frame[frame['event'].isin(SHOT_EVENTS)].copy()    
-    
-    # Eliminate description, as it is no longer needed.
-    frame.drop('desc', inplace=True, axis=1)
+    # Finally, reduce the table to only shot events, keeping the shot description columns last.
+    columns = [ column for column in frame.columns if column not in SHOT_DESCRIPTION_FIELDS ] + \
+        list(SHOT_DESCRIPTION_FIELDS)
+    frame = frame.loc[frame['event'].isin(SHOT_EVENTS), columns].copy()
     return frame
     
 def construct_game_html_report_frame(live_feed_link, refresh = False):
@@ -1350,13 +3206,20 @@ def construct_game_html_report_frame(live_feed_link, refresh = False):
         Returns None otherwise.
 
     '''
-    report = get_game_html_report(live_feed_link, refresh)
+    with stage_timer('read_html', live_feed_link) as metrics:
+        report = read_game_html_report_content(live_feed_link) if not refresh else None
+        metrics['cache_hit'] = report is not None
+        if report is None:
+            report = get_game_html_report_content(live_feed_link, refresh)
+        metrics['bytes_read'] = 0 if report is None else len(report)
     if report is None:
         return None
     else:
-        frame = parse_game_html_report(report)
+        with stage_timer('parse_html', live_feed_link):
+            frame = parse_game_html_report_content(report)
         frame['game_id'] = extract_id_from_live_feed_link(live_feed_link)
-        return process_parsed_report(frame)
+        with stage_timer('process_html', live_feed_link):
+            return process_parsed_report(frame)
     
 def read_game_html_report_frame(live_feed_link):
     '''
@@ -1378,8 +3241,10 @@ def read_game_html_report_frame(live_feed_link):
     '''
     frame_path = get_game_html_report_frame_path(live_feed_link)
     if frame_path.exists():
-        logging.info('Reading html frame ' + live_feed_link)
-        game_frame = pd.read_pickle(str(frame_path))
+        logger.info('Reading html frame ' + live_feed_link)
+        with stage_timer('read_html_frame', live_feed_link) as metrics:
+            game_frame = pd.read_pickle(str(frame_path))
+            metrics['bytes_read'] = frame_path.stat().st_size
         return game_frame
     else:
         return None
@@ -1409,23 +3274,69 @@ def get_game_html_report_frame(live_feed_link, refresh = False, refresh_frame=Fa
 
     '''
     refresh_any = refresh | refresh_frame
-    read_from_file = read_game_html_report_frame(live_feed_link) if not refresh_any else None
-    if read_from_file is None:
-        game_frame = construct_game_html_report_frame(live_feed_link, refresh)
-         # Save the frame
-        if game_frame is not None:
-            # Make sure that the folder exists.
-            game_frame_path = get_game_html_report_frame_path(live_feed_link)
-            game_frame_path.parent.resolve().mkdir(parents=True, exist_ok=True)  
-            # Now the file can be saved.              
-            game_frame.to_pickle(str(game_frame_path)) 
-        return game_frame
-    else:
-        return read_from_file
+    with stage_timer('html_frame', live_feed_link) as metrics:
+        read_from_file = read_game_html_report_frame(live_feed_link) if not refresh_any else None
+        metrics['cache_hit'] = read_from_file is not None
+        if read_from_file is None:
+            game_frame = construct_game_html_report_frame(live_feed_link, refresh)
+             # Save the frame
+            if game_frame is not None:
+                # Make sure that the folder exists.
+                game_frame_path = get_game_html_report_frame_path(live_feed_link)
+                game_frame_path.parent.resolve().mkdir(parents=True, exist_ok=True)  
+                # Now the file can be saved.              
+                with stage_timer('write_html_frame', live_feed_link) as write_metrics:
+                    game_frame.to_pickle(str(game_frame_path)) 
+                    write_metrics['bytes_written'] = game_frame_path.stat().st_size
+            return game_frame
+        else:
+            return read_from_file
 #%% Read and combine partial game frames into a single combined frame for the game.
-def combine_frames(live_feed_frame, html_report_frame):
+def get_alignment_keys(frame):
     '''
-    Combine the frames created from the game live feed and the html play-by-play report.
+    Orders the shot events of a frame by period, time elapsed, event code, and position within the events sharing
+    those three values, giving each an integer key.
+
+    Parameters
+    ----------
+    frame : Pandas data frame
+        Data frame obtained from the game live feed or the html play-by-play report.
+
+    Returns
+    -------
+    order : numpy array of int
+        Positions of the events in the frame, in key order.
+    key : numpy array of int64
+        Key of each event in order, unique within the frame.
+    duplicate_buckets : numpy array of int64
+        Keys, without the position, of the groups holding more than one event.
+
+    '''
+    # Times are 'mm:ss'. Reading the digits directly is much faster than splitting strings.
+    digits = np.asarray(frame['time_elapsed'].to_numpy(dtype=object).astype('U5').astype('S5')).view(np.uint8) \
+        .reshape(-1, 5).astype(np.int64) - ord('0')
+    seconds = (digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 3] * 10 + digits[:, 4]
+    # Events outside the live feed categories are given a code of their own, after all of the known ones.
+    event = np.array([ ALIGNMENT_EVENT_CODES.get(code, len(ALIGNMENT_EVENT_CODES)) for code in frame['event'].tolist() ],
+                     dtype=np.int64)
+    # Periods last at most 20 minutes, so seconds fit in 11 bits, and there are fewer than 32 event codes.
+    bucket = (frame['period'].to_numpy(dtype=np.int64) * 2048 + seconds) * 32 + event
+    # Frames are normally in game order already, in which case the sort is a single pass.
+    order = np.argsort(bucket, kind='stable')
+    bucket = bucket[order]
+    # Number the events within each group by their order in the frame.
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    sizes = np.diff(np.r_[starts, len(bucket)])
+    rank = np.arange(len(bucket)) - np.repeat(starts, sizes)
+    return order, bucket * 2**16 + rank, bucket[starts[sizes > 1]]
+
+def align_shot_events(live_feed_frame, html_report_frame):
+    '''
+    Matches the shot events of the live feed with those of the html play-by-play report. Both are treated as
+    sequences ordered by period, time elapsed, and event, and the n-th event of a given period, second, and event in
+    one is matched with the n-th such event in the other. Every event is matched at most once. Aligned rows follow
+    the order of the live feed, and each unmatched html report event follows the event preceding it by period, time
+    elapsed, and event.
 
     Parameters
     ----------
@@ -1434,16 +3345,123 @@ def combine_frames(live_feed_frame, html_report_frame):
     html_report_frame : Pandas data frame
         Data frame obtained from the html play-by-play report.
 
+    Returns
+    -------
+    live_feed_positions : numpy array of int
+        Position in live_feed_frame of the event in each aligned row, or -1 if the row has no live feed event.
+    html_report_positions : numpy array of int
+        Position in html_report_frame of the event in each aligned row, or -1 if the row has no html report event.
+    stats : dict
+        Quality of the alignment: the number of 'matched' events, of events left unmatched on each side
+        ('unmatched_livefeed' and 'unmatched_htmlreport'), and of 'duplicate_buckets', groups of events sharing
+        period, time elapsed, and event on either side.
+
+    '''
+    live_order, live_key, live_duplicates = get_alignment_keys(live_feed_frame)
+    html_order, html_key, html_duplicates = get_alignment_keys(html_report_frame)
+    if np.array_equal(live_key, html_key):
+        # Usual case: every event has a match.
+        live_positions, html_positions = live_order, html_order
+    elif (len(live_key) == 0) or (len(html_key) == 0):
+        # Nothing to match against, such as an html report without shots. Every event of the other side is unmatched.
+        live_positions = np.concatenate([live_order, np.full(len(html_order), -1, dtype=live_order.dtype)])
+        html_positions = np.concatenate([np.full(len(live_order), -1, dtype=html_order.dtype), html_order])
+    else:
+        # Keys are unique and sorted, so the outer join is a linear merge of the two sequences.
+        joined, live_idx, html_idx = pd.Index(live_key).join(pd.Index(html_key), how='outer', return_indexers=True)
+        # No indexer is given for a side whose keys are exactly the joined keys.
+        live_idx = np.arange(len(joined)) if live_idx is None else live_idx
+        html_idx = np.arange(len(joined)) if html_idx is None else html_idx
+        live_positions = np.where(live_idx >= 0, live_order[live_idx], -1)
+        html_positions = np.where(html_idx >= 0, html_order[html_idx], -1)
+    if not np.array_equal(live_positions, np.arange(len(live_positions))):
+        # Rows are in key order. Sort them by live feed position, placing each html report only row right after the
+        # nearest row before it in key order that has a live feed event.
+        has_live = live_positions >= 0
+        anchor = np.maximum.accumulate(np.where(has_live, np.arange(len(live_positions)), -1))
+        anchor_position = np.where(anchor >= 0, live_positions[anchor], -1)
+        row_order = np.argsort(anchor_position * 2 + ~has_live, kind='stable')
+        live_positions, html_positions = live_positions[row_order], html_positions[row_order]
+    matched = int(((live_positions >= 0) & (html_positions >= 0)).sum())
+    stats = {'matched': matched, 'unmatched_livefeed': len(live_key) - matched,
+             'unmatched_htmlreport': len(html_key) - matched,
+             'duplicate_buckets': len(np.union1d(live_duplicates, html_duplicates))}
+    return live_positions, html_positions, stats
+
+def take_aligned(frame, positions):
+    '''
+    Selects rows of a frame by position, giving a row of missing values for each position of -1.
+
+    Parameters
+    ----------
+    frame : Pandas data frame
+        Frame to select from.
+    positions : numpy array of int
+        Position of each row to select, or -1.
+
     Returns
     -------
     Pandas data frame
-        Data frame describing every shot event in a single game.
+        The selected rows, with a new default index.
+
+    '''
+    frame = frame.reset_index(drop=True)
+    if np.array_equal(positions, np.arange(len(frame))):
+        return frame
+    if (positions >= 0).all():
+        return frame.take(positions).reset_index(drop=True)
+    return frame.reindex(positions).reset_index(drop=True)
+
+def combine_frames(live_feed_frame, html_report_frame, return_stats=False):
+    '''
+    Combine the frames created from the game live feed and the html play-by-play report. Events are matched one to one
+    by align_shot_events, and unmatched events from either frame are kept with missing values for the other. Rows are
+    in live feed order.
+
+    Parameters
+    ----------
+    live_feed_frame : Pandas data frame
+        Data frame obtained from the game live feed.
+    html_report_frame : Pandas data frame
+        Data frame obtained from the html play-by-play report.
+    return_stats : bool, optional
+        If True, also returns the alignment statistics. The default is False.
+
+    Returns
+    -------
+    combined : Pandas data frame
+        Data frame describing every shot event in a single game. Columns other than ALIGNMENT_KEYS present in both
+        frames are given the suffixes '_livefeed' and '_htmlreport'.
+    stats : dict
+        Alignment statistics. See align_shot_events. Only returned if return_stats is True.
 
     '''
-    return pd.merge(live_feed_frame, html_report_frame, how='outer', left_on=['period', 'time_elapsed', 'event'], 
-             right_on=['period', 'time_elapsed', 'event'],  suffixes=['_livefeed', '_htmlreport'])
+    live_positions, html_positions, stats = align_shot_events(live_feed_frame, html_report_frame)
+    if stats['unmatched_livefeed'] or stats['unmatched_htmlreport']:
+        logger.debug('Unmatched shot events: ' + str(stats['unmatched_livefeed']) + ' in live feed, ' +
+                     str(stats['unmatched_htmlreport']) + ' in html report')
+    live_part = take_aligned(live_feed_frame, live_positions)
+    html_part = take_aligned(html_report_frame, html_positions)
+    # Take the alignment columns from whichever side has the event.
+    from_html = live_positions < 0
+    if from_html.any():
+        for column in ALIGNMENT_KEYS:
+            coalesced = live_part[column].astype(object).where(~from_html, html_part[column].astype(object))
+            # Missing rows turned integer columns into floats; restore a type holding both frames, as a merge would.
+            live_dtype, html_dtype = live_feed_frame[column].dtype, html_report_frame[column].dtype
+            if live_dtype == html_dtype:
+                live_part[column] = coalesced.astype(live_dtype)
+            elif pd.api.types.is_integer_dtype(live_dtype) and pd.api.types.is_integer_dtype(html_dtype):
+                live_part[column] = coalesced.astype(np.result_type(live_dtype, html_dtype))
+            else:
+                live_part[column] = coalesced.infer_objects()
+    html_part = html_part.drop(columns=ALIGNMENT_KEYS)
+    shared = live_part.columns.intersection(html_part.columns)
+    combined = pd.concat([live_part.rename(columns={ column: column + '_livefeed' for column in shared }),
+                          html_part.rename(columns={ column: column + '_htmlreport' for column in shared })], axis=1)
+    return (combined, stats) if return_stats else combined
  
-def process_combined_frame(combined_frame):
+def process_combined_frame(combined_frame, end_columns=None):
     '''
     Work toward cleaning the combined data frame obtained from combine_frames
 
@@ -1451,6 +3469,10 @@ def process_combined_frame(combined_frame):
     ----------
     combined_frame : Pandas data frame
         Combined data frame obtained from combine_frames.
+    end_columns : list of str, optional
+        Columns identifying the rows in which each team attacks the same end of the ice. If None, uses ['period'],
+        which is correct for the frame of a single game. See process_combined_frames for several games at once.
+        The default is None.
 
     Returns
     -------
@@ -1474,27 +3496,28 @@ def process_combined_frame(combined_frame):
     # Coordinates don't need to change in the live feed, but event_team_id, event_team_is_home, strength, and event_zone 
     # need to be flipped.
     # Flip event team home flag. This just swaps True and False, however it's important to coerce the type to bool first.
+    is_block = (combined['event'] == 'BLOCK').to_numpy(dtype=bool)
     combined['event_team_is_home'] = combined['event_team_is_home'].astype(bool)
-    combined['event_team_is_home'] = np.where(combined['event']!='BLOCK', 
+    combined['event_team_is_home'] = np.where(~is_block, 
                                               combined['event_team_is_home'], 
                                               ~combined['event_team_is_home'] )
     # Flip team id.
     away_code =  combined['away_code']
     home_code =  combined['home_code']
-    combined['event_team_code'] = np.where(combined['event']!='BLOCK', 
+    combined['event_team_code'] = np.where(~is_block, 
                                          combined['event_team_code'], 
                                          np.where(combined['event_team_code']==away_code, home_code, away_code) )
     # Flip zones. Here, it's a simple swap of offensive and defensive zones, with neutral zone left unchanged
     block_zone_swap = { 'Def. Zone': 'Off. Zone', 
                        'Off. Zone': 'Def. Zone'}
-    combined['event_zone'] = np.where(combined['event']!='BLOCK', 
+    combined['event_zone'] = np.where(~is_block, 
                                       combined['event_zone'], 
                                       combined['event_zone'].replace(block_zone_swap) )
     # Strengths are similar to zones. Here, 'EV' (even strength) is left alone, but 'PP' and 'SH' (power-play and 
     # short-handed) are swapped.
     block_strength_swap = { 'PP': 'SH', 
                            'SH': 'PP' }
-    combined['strength'] = np.where(combined['event']!='BLOCK', 
+    combined['strength'] = np.where(~is_block, 
                                       combined['strength'], 
                                       combined['strength'].replace(block_strength_swap) )    
     
@@ -1518,7 +3541,8 @@ def process_combined_frame(combined_frame):
     # greater than 0.5 indicates that the home attack end has positive x-coordinates. Additionally, any period with
     # mean less than 0.5 indicates that the home attack end has negative x-coordinates. These periods will be rotated
     # 180 degrees for the first part of the standardization.
-    combined['home_end_correct'] = combined.groupby('period')[['home_attacks_positive']].transform('mean')
+    end_columns = ['period'] if end_columns is None else end_columns
+    combined['home_end_correct'] = combined.groupby(end_columns)['home_attacks_positive'].transform('mean')
 
     # Only coordinates need to change. In this case, since the intent is to rotate 180 degrees, x-coordinates and y-coordinates
     # are both negated for periods when the home team is attacking the negative x-coordinate end.
@@ -1550,6 +3574,33 @@ def process_combined_frame(combined_frame):
     combined['dist_difference'] = np.abs(combined['calc_dist'] - combined['shot_dist'])
     return combined
 
+def process_combined_frames(combined_frames):
+    '''
+    Processes the combined frames of several games in a single pass, which avoids paying the pandas overhead of
+    process_combined_frame once per game. The result for each game is the same as from process_combined_frame.
+
+    Parameters
+    ----------
+    combined_frames : list of Pandas data frame
+        Combined data frames obtained from combine_frames, one per game.
+
+    Returns
+    -------
+    list of Pandas data frame
+        Partially cleaned frame for each game, in the same order, with a new default index.
+
+    '''
+    if len(combined_frames) == 0:
+        return []
+    # Number the games in the batch, since unmatched html report rows have no live feed game id.
+    batch = pd.concat(combined_frames, ignore_index=True)
+    batch['batch_game'] = np.repeat(np.arange(len(combined_frames)), [ len(frame) for frame in combined_frames ])
+    processed = process_combined_frame(batch, end_columns=['batch_game', 'period'])
+    # Filtering keeps the rows in order, so each game is a contiguous block.
+    bounds = np.searchsorted(processed['batch_game'].to_numpy(), np.arange(len(combined_frames) + 1))
+    processed = processed.drop(columns=['batch_game'])
+    return [ processed.iloc[start:end].reset_index(drop=True) for start, end in zip(bounds[:-1], bounds[1:]) ]
+
 def construct_combined_frame(live_feed_frame, html_report_frame):
     '''
     Pipeline to merge and process the two frames created from the game live feed and the html play-by-play report.
@@ -1568,12 +3619,128 @@ def construct_combined_frame(live_feed_frame, html_report_frame):
 
     '''
     # Merge the frames.
-    combined = combine_frames(live_feed_frame, html_report_frame)
-    combined = process_combined_frame(combined)
-    return combined.reset_index(drop=True)
-
-def get_game_combined_frame_path(live_feed_link):
-
+    with stage_timer('combine_frames') as record:
+        combined, stats = combine_frames(live_feed_frame, html_report_frame, return_stats=True)
+        # Keep the alignment quality with the timing, so that poorly matched games can be found from the metrics.
+        record.update(stats)
+    with stage_timer('process_combined'):
+        combined = process_combined_frame(combined)
+    with stage_timer('apply_schema'):
+        return apply_combined_frame_schema(combined.reset_index(drop=True))
+
+def construct_combined_frames(frame_pairs):
+    '''
+    Pipeline to merge and process the frames of several games at once. Equivalent to calling
+    construct_combined_frame for each game, but the processing is done in one pass for all of the games.
+
+    Parameters
+    ----------
+    frame_pairs : list of (Pandas data frame, Pandas data frame)
+        Live feed frame and html report frame of each game.
+
+    Returns
+    -------
+    list of Pandas data frame
+        Combined frame of each game, in the same order.
+
+    '''
+    combined_frames = []
+    for live_feed_frame, html_report_frame in frame_pairs:
+        with stage_timer('combine_frames') as record:
+            combined, stats = combine_frames(live_feed_frame, html_report_frame, return_stats=True)
+            record.update(stats)
+        combined_frames.append(combined)
+    with stage_timer('process_combined_batch'):
+        combined_frames = process_combined_frames(combined_frames)
+    with stage_timer('apply_schema'):
+        return [ apply_combined_frame_schema(combined) for combined in combined_frames ]
+
+def apply_combined_frame_schema(frame):
+    '''
+    Converts the columns of a combined frame to the compact types given in COMBINED_FRAME_DTYPES.
+
+    Parameters
+    ----------
+    frame : Pandas data frame
+        Combined frame, as constructed by construct_combined_frame.
+
+    Returns
+    -------
+    compact : Pandas data frame
+        Frame with the same values, using the compact column types.
+
+    '''
+    compact = frame.copy(deep=False)
+    for column, dtype in COMBINED_FRAME_DTYPES.items():
+        if column not in compact:
+            continue
+        series = compact[column]
+        if isinstance(dtype, list):
+            # Never drop values outside of the fixed categories. Keep them as extra categories instead.
+            unknown = set(series.dropna().unique()) - set(dtype)
+            if unknown:
+                logger.warning('Unexpected values in column ' + column + ': ' + str(sorted(unknown)))
+            compact[column] = pd.Categorical(series, categories=dtype + sorted(unknown))
+        elif dtype.startswith('int') and series.isna().any():
+            compact[column] = series.astype(dtype.capitalize())
+        else:
+            compact[column] = series.astype(dtype)
+    return compact
+
+def get_frame_schema_savings(frame):
+    '''
+    Reports the memory saved by applying the compact schema to a frame (see apply_combined_frame_schema). Useful for
+    frames saved before the schema was introduced.
+
+    Parameters
+    ----------
+    frame : Pandas data frame
+        Combined frame.
+
+    Returns
+    -------
+    report : Pandas data frame
+        One row per column with the types and the bytes used before and after applying the schema, followed by a
+        'total' row.
+
+    '''
+    compact = apply_combined_frame_schema(frame)
+    report = pd.DataFrame({
+        'dtype_before': frame.dtypes.astype(str),
+        'dtype_after': compact.dtypes.astype(str),
+        'bytes_before': frame.memory_usage(index=False, deep=True),
+        'bytes_after': compact.memory_usage(index=False, deep=True)
+    })
+    report.loc['total'] = ['', '', report['bytes_before'].sum(), report['bytes_after'].sum()]
+    report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+    report['fraction_saved'] = report['bytes_saved'] / report['bytes_before']
+    return report
+
+def concat_frames(frames):
+    '''
+    Concatenates frames, keeping categorical columns categorical even when their categories differ between frames.
+
+    Parameters
+    ----------
+    frames : list of Pandas data frames
+        Frames with the same columns.
+
+    Returns
+    -------
+    Pandas data frame
+        Concatenated frame, with a new range index.
+
+    '''
+    concatenated = pd.concat(frames, ignore_index=True)
+    for column in concatenated.columns:
+        if any( isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames ) and \
+                not isinstance(concatenated[column].dtype, pd.CategoricalDtype):
+            concatenated[column] = pd.api.types.union_categoricals(
+                [ frame[column].astype('category') for frame in frames ])
+    return concatenated
+
+def get_game_combined_frame_path(live_feed_link):
+
     '''
     Obtains the path to the Pandas data frame created from the html report for the game corresponding to the given link.
 
@@ -1618,12 +3785,39 @@ def read_game_combined_frame(live_feed_link):
     
     frame_path = get_game_combined_frame_path(live_feed_link)
     if frame_path.exists():
-        logging.info('Reading combined data frame for ' + extract_id_from_live_feed_link(live_feed_link))
-        game_frame = pd.read_pickle(str(frame_path))
+        logger.info('Reading combined data frame for ' + extract_id_from_live_feed_link(live_feed_link))
+        with stage_timer('read_combined_frame', live_feed_link) as metrics:
+            game_frame = pd.read_pickle(str(frame_path))
+            metrics['bytes_read'] = frame_path.stat().st_size
         return game_frame
     else:
         return None
     
+def write_game_combined_frame(live_feed_link, combined_frame):
+    '''
+    Saves the combined frame for a game locally.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    combined_frame : Pandas data frame
+        Data frame combining the live feed and the html report data.
+
+    Returns
+    -------
+    None.
+
+    '''
+    # Make sure that the folder exists.
+    combined_frame_path = get_game_combined_frame_path(live_feed_link)
+    combined_frame_path.parent.resolve().mkdir(parents=True, exist_ok=True)
+    with stage_timer('write_combined_frame', live_feed_link) as write_metrics:
+        combined_frame.to_pickle(str(combined_frame_path))
+        write_metrics['bytes_written'] = combined_frame_path.stat().st_size
+
 def get_game_combined_frame(live_feed_link, refresh_combine=False, refresh_all=False, refresh_feed=False, 
                             refresh_feed_frame=False, refresh_html=False, refresh_html_frame=False):
     '''
@@ -1657,39 +3851,42 @@ def get_game_combined_frame(live_feed_link, refresh_combine=False, refresh_all=F
     Returns
     -------
     Pandas data frame
-        Data frame combining the live feed and the html report data.
+        Data frame combining the live feed and the html report data. Returns None if either part is unavailable.
 
     '''
     
     # If any of the refresh options are true, the combined local file shouldn't be read as it will need to be 
     # recreated
     refresh_any = refresh_combine | refresh_all | refresh_feed | refresh_feed_frame | refresh_html | refresh_html_frame
-    #logging.debug('Here?')
-    read_from_file = read_game_combined_frame(live_feed_link) if not refresh_any else None
-    #logging.debug('Or here?')
-    if read_from_file is None:
-        # There are multiple reasons the file may need to be recreated. In the event of refresh_combine, the 
-        # constituent frames can simply be read. For refresh_all, everything needs to be re-created.
-        # Pass refresh states onto the individual loading functions, with refresh_all overriding everything else if true.
-        feed_frame = get_game_live_feed_frame(live_feed_link, refresh_all | refresh_feed, refresh_all | refresh_feed_frame)
-        html_frame = get_game_html_report_frame(live_feed_link, refresh_all | refresh_html, refresh_all | refresh_html_frame)
-        
-        # Combining the frames is a required action. 
-        #logging.debug('Do we execute this?')
-        combined_frame = construct_combined_frame(feed_frame, html_frame)
-        #logging.debug('Or this?')
-        
-        # If the combination occurred successfully, save the file.
-        if combined_frame is not None:
-            # Make sure that the folder exists.
-            combined_frame_path = get_game_combined_frame_path(live_feed_link)
-            combined_frame_path.parent.resolve().mkdir(parents=True, exist_ok=True)
-            # The directory exists, so the file can be saved.                
-            combined_frame.to_pickle(str(combined_frame_path)) 
-        return combined_frame           
+    #logger.debug('Here?')
+    with stage_timer('combined', live_feed_link) as metrics:
+        read_from_file = read_game_combined_frame(live_feed_link) if not refresh_any else None
+        metrics['cache_hit'] = read_from_file is not None
+        #logger.debug('Or here?')
+        if read_from_file is None:
+            # There are multiple reasons the file may need to be recreated. In the event of refresh_combine, the 
+            # constituent frames can simply be read. For refresh_all, everything needs to be re-created.
+            # Pass refresh states onto the individual loading functions, with refresh_all overriding everything else if true.
+            feed_frame = get_game_live_feed_frame(live_feed_link, refresh_all | refresh_feed, refresh_all | refresh_feed_frame)
+            html_frame = get_game_html_report_frame(live_feed_link, refresh_all | refresh_html, refresh_all | refresh_html_frame)
+            # Either part may be unavailable, for example if the html report couldn't be downloaded.
+            if feed_frame is None or html_frame is None:
+                logger.error('Unable to combine frames for ' + live_feed_link + ': missing ' +
+                             ('live feed frame' if feed_frame is None else 'html report frame'))
+                return None
             
-    else:
-        return read_from_file
+            # Combining the frames is a required action. 
+            #logger.debug('Do we execute this?')
+            combined_frame = construct_combined_frame(feed_frame, html_frame)
+            #logger.debug('Or this?')
+            
+            # If the combination occurred successfully, save the file.
+            if combined_frame is not None:
+                write_game_combined_frame(live_feed_link, combined_frame)
+            return combined_frame           
+                
+        else:
+            return read_from_file
 
 def retrieve_all(link_list, refresh=False, refresh_feed=False, refresh_html=False):
     '''
@@ -1716,8 +3913,99 @@ def retrieve_all(link_list, refresh=False, refresh_feed=False, refresh_html=Fals
     '''
     for live_feed_link in link_list:
         get_live_feed(live_feed_link, refresh | refresh_feed)
-        get_game_html_report(live_feed_link, refresh | refresh_html)
- 
+        get_game_html_report_content(live_feed_link, refresh | refresh_html)
+
+def retrieve_game_part(live_feed_link, part, refresh=False, rate_limits=None):
+    '''
+    Downloads and locally stores a single raw file for a game. Used as the unit of work by retrieve_all_concurrent.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live'
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    part : str
+        Either 'feed' for the game live feed or 'html' for the html play-by-play report.
+    refresh : bool, optional
+        If True, forces re-download of the file, even if a local version already exists. The default is False.
+    rate_limits : dict, optional
+        Per-host limits used instead of HOST_RATE_LIMITS. See wait_for_host_rate_limit. The default is None.
+
+    Returns
+    -------
+    bool
+        True if the file was obtained, False otherwise.
+
+    '''
+    if part == 'feed':
+        return get_live_feed(live_feed_link, refresh, rate_limits=rate_limits) is not None
+    else:
+        return get_game_html_report_content(live_feed_link, refresh, rate_limits) is not None
+
+def retrieve_all_concurrent(link_list, refresh=False, refresh_feed=False, refresh_html=False,
+                            max_workers=DOWNLOAD_MAX_WORKERS, rate_limits=None):
+    '''
+    Concurrent version of retrieve_all. The live feed and html report for each game are requested as separate tasks,
+    so both files for a game are downloaded in parallel. Files are stored in the same locations as retrieve_all.
+
+    Parameters
+    ----------
+    link_list : list of str
+        List of API links to the game live feeds.
+    refresh : bool, optional
+        If true, forces re-download of all files, even if local versions already exist. Overwrites
+        any existing files. The default is False.
+    refresh_feed : bool, optional
+        If true, forces re-download of all game live feed files, even if local versions already exist. Overwrites
+        any existing files. Ignored if refresh is True. The default is False.
+    refresh_html : bool, optional
+        If true, forces re-download of all html play-by-play report files, even if local versions already exist. Overwrites
+        any existing files. Ignored if refresh is True. The default is False.
+    max_workers : int, optional
+        Maximum number of requests in flight at any time. The default is DOWNLOAD_MAX_WORKERS.
+    rate_limits : dict, optional
+        Maps host names to the maximum number of requests per second sent to that host by this call, in place of
+        their HOST_RATE_LIMITS. Other callers keep using HOST_RATE_LIMITS. The default is None.
+
+    Returns
+    -------
+    summary : Pandas DataFrame
+        One row per game, in the order of link_list, with columns 'game_id', 'live_feed_link', 'feed_ok', 'html_ok',
+        and 'error'. 'error' gives the exception messages for any part of the game that raised, None otherwise.
+
+    '''
+    results = { link: {'feed_ok': False, 'html_ok': False, 'error': None} for link in link_list }
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for live_feed_link in link_list:
+            future = executor.submit(retrieve_game_part, live_feed_link, 'feed', refresh | refresh_feed, rate_limits)
+            futures[future] = (live_feed_link, 'feed')
+            future = executor.submit(retrieve_game_part, live_feed_link, 'html', refresh | refresh_html, rate_limits)
+            futures[future] = (live_feed_link, 'html')
+
+        for future in as_completed(futures):
+            live_feed_link, part = futures[future]
+            try:
+                results[live_feed_link][part + '_ok'] = future.result()
+            except Exception as err:
+                # A failure for one file shouldn't stop the remaining downloads. Record it for the summary instead.
+                logger.error('Error retrieving ' + part + ' for ' + live_feed_link + ' (' + repr(err) + ')')
+                message = part + ': ' + repr(err)
+                previous = results[live_feed_link]['error']
+                results[live_feed_link]['error'] = message if previous is None else previous + '; ' + message
+
+    summary = pd.DataFrame({
+        'game_id': [ extract_id_from_live_feed_link(link) for link in link_list ],
+        'live_feed_link': link_list,
+        'feed_ok': [ results[link]['feed_ok'] for link in link_list ],
+        'html_ok': [ results[link]['html_ok'] for link in link_list ],
+        'error': [ results[link]['error'] for link in link_list ]
+    })
+    logger.info('Retrieved ' + str(int((summary['feed_ok'] & summary['html_ok']).sum())) + ' of '
+                 + str(len(summary)) + ' games')
+    return summary
+
 def get_game_combined_frame_from_local(live_feed_link, refresh_combine=False, refresh_all=False, refresh_feed=False, 
                                        refresh_html=False):
     '''
@@ -1751,98 +4039,1477 @@ def get_game_combined_frame_from_local(live_feed_link, refresh_combine=False, re
     refresh_html_frame = refresh_all | refresh_html
     return get_game_combined_frame(live_feed_link, refresh_combine=refresh_combine, refresh_feed_frame=refresh_feed_frame, 
                             refresh_html_frame=refresh_html_frame)
-#%% Obtain and process data.
-def check_live_feeds_for_missing_data(live_feed_links):
+#%% Build manifest: rebuild only stale stages
+def get_build_manifest_path():
     '''
-    Checks game live feeds to determine if a play-by-play is included in the feed. Produces a list of live feeds
-    with no play by play.
+    Provides path to the local build manifest database.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the SQLite database holding the build manifest.
+
+    '''
+    current_dir = Path.cwd()
+    return current_dir.joinpath(BUILD_MANIFEST_PATH)
+
+def open_build_manifest():
+    '''
+    Opens the build manifest, creating it if needed.
+
+    Returns
+    -------
+    sqlite3.Connection
+        Connection to the manifest database. The caller is responsible for closing it.
+
+    '''
+    manifest_path = get_build_manifest_path()
+    manifest_path.parent.resolve().mkdir(parents=True, exist_ok=True)
+    # Worker processes may write to the manifest at the same time, so wait for locks rather than failing.
+    manifest = sqlite3.connect(str(manifest_path), timeout=60)
+    manifest.execute('''CREATE TABLE IF NOT EXISTS stages (
+                            game_id TEXT NOT NULL,
+                            stage TEXT NOT NULL,
+                            input_hash TEXT NOT NULL,
+                            version INTEGER NOT NULL,
+                            output_hash TEXT NOT NULL,
+                            output_size INTEGER NOT NULL,
+                            output_mtime_ns INTEGER NOT NULL,
+                            built_at TEXT NOT NULL,
+                            PRIMARY KEY (game_id, stage))''')
+    return manifest
+
+def get_stage_output_path(live_feed_link, stage):
+    '''
+    Obtains the path of the file produced by a pipeline stage for a game.
 
     Parameters
     ----------
-    live_feed_links : list of str
-        List of live feed links.
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    stage : str
+        One of the keys of STAGE_INPUTS.
 
     Returns
     -------
-    bad_links : list of str
-        List of links where the live-feed contained no play-by-play.
+    pathlib.Path
+        Path object for the stage output, whether or not it exists.
 
     '''
-    bad_links = []
-    for live_feed_link in live_feed_links:
-        feed = get_live_feed(live_feed_link)
-        if len(feed['liveData']['plays']['allPlays']) == 0:
-            bad_links.append(live_feed_link)
-    return bad_links
+    if stage == 'raw_feed':
+        return get_local_live_feed_path(live_feed_link)
+    elif stage == 'raw_html':
+        # Reports saved in the older format are still valid inputs.
+        html_report_path = get_game_html_report_path(live_feed_link)
+        legacy_path = get_legacy_game_html_report_path(live_feed_link)
+        return legacy_path if (not html_report_path.exists()) and legacy_path.exists() else html_report_path
+    elif stage == 'feed_frame':
+        return get_game_live_feed_frame_path(live_feed_link)
+    elif stage == 'html_frame':
+        return get_game_html_report_frame_path(live_feed_link)
+    else:
+        return get_game_combined_frame_path(live_feed_link)
 
-def get_missing_link_path():
+def run_stage(live_feed_link, stage):
     '''
-    Provides path to local file saving live feed links with missing play-by-play
+    Builds (or, for raw stages, downloads) the output of a single pipeline stage for a game, assuming that its
+    inputs are up to date.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    stage : str
+        One of the keys of STAGE_INPUTS.
 
     Returns
     -------
-    bad_link_path : Path object
-        Path to json file storing live feed links missing play-by-play.
+    bool
+        True if the stage produced its output, False otherwise.
 
     '''
-    current_dir = Path.cwd()
-    relative_path = DATA_FOLDER + 'bad_links.json'
-    bad_link_path = current_dir.joinpath(relative_path)   
-    return bad_link_path
+    if stage == 'raw_feed':
+        return get_live_feed(live_feed_link) is not None
+    elif stage == 'raw_html':
+        return get_game_html_report_content(live_feed_link) is not None
+    elif stage == 'feed_frame':
+        return get_game_live_feed_frame(live_feed_link, refresh_frame=True) is not None
+    elif stage == 'html_frame':
+        return get_game_html_report_frame(live_feed_link, refresh_frame=True) is not None
+    else:
+        return get_game_combined_frame(live_feed_link, refresh_combine=True) is not None
 
-def read_missing_links():
+def hash_file(path):
     '''
-    Reads local file storing live feed links with missing play-by-play, if it exists.
+    Computes a content hash of a file.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File to hash.
 
     Returns
     -------
-    bad_links : list of str
-        List of links where the live-feed contained no play-by-play.
+    str
+        Hex digest of the file contents.
 
     '''
-    bad_link_path = get_missing_link_path()
-    if bad_link_path.exists():
-        logging.info('Reading bad links.')
-        with bad_link_path.open('r') as infile:
-            bad_links = json.load(infile)
-        return bad_links
-    else:
-        return None        
+    digest = hashlib.blake2b(digest_size=16)
+    with path.open('rb') as infile:
+        for block in iter(lambda: infile.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
-def get_missing_links(live_feed_links):
+def update_game_stages(live_feed_link, manifest=None, stages=None, prebuilt=()):
     '''
-    Get local file storing live feed links with missing play-by-play, if it exists. Otherwise, produce and save
-    the list of links.
+    Brings every pipeline stage for a game up to date, rebuilding exactly the stages that are stale.
+
+    A derived stage is stale if its output is missing, if the code version in STAGE_VERSIONS has changed since it was
+    built, or if the content hash of any of its inputs differs from the hash recorded when it was built. Raw stages
+    are only stale if their file is missing. Hashes of unchanged files (same size and modification time) are taken
+    from the manifest rather than recomputed.
 
     Parameters
     ----------
-    live_feed_links : list of str
-        List of live feed links.
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    manifest : sqlite3.Connection, optional
+        Open build manifest. If None, the manifest is opened and closed by this function. The default is None.
+    stages : list of str, optional
+        Stages to bring up to date, which must include the inputs of each of them. If None, brings every stage in
+        STAGE_INPUTS up to date. The default is None.
+    prebuilt : collection of str, optional
+        Stages whose output the caller has just built from up to date inputs, such as the combined frames built by
+        build_game_combined_frames. They are recorded as rebuilt without being run again. The default is ().
 
     Returns
     -------
-    list of str
-        List of links where the live-feed contained no play-by-play.
+    rebuilt : list of str
+        The stages that were rebuilt, in build order.
 
     '''
-    read_from_file = read_missing_links()
-    if read_from_file is None:
-        bad_links = check_live_feeds_for_missing_data(live_feed_links)
-        bad_link_path = get_missing_link_path()
-        bad_link_path.touch()
-        with bad_link_path.open('w') as outfile:
-            json.dump(bad_links, outfile)       
-        return bad_links
-    else:
-        return read_from_file
-    
-# Get all game links from the desired seasons.
-game_links = get_game_feed_links(SEASON_LIST)
-# Process links where live feed file is missing play-by-play. Ignore these.
-missing_links = get_missing_links(game_links)
-# There are two games in the list with broken play-by-play in the HTML reports. Ignore these as well.
-broken_links = ['/api/v1/game/2010020124/feed/live', '/api/v1/game/2013020971/feed/live']
-bad_links = missing_links + broken_links
-
-# Create frames for each game.
-combined_frame_list = [get_game_combined_frame_from_local(link) for link in game_links if link not in bad_links]
\ No newline at end of file
+    if manifest is None:
+        with closing(open_build_manifest()) as manifest:
+            return update_game_stages(live_feed_link, manifest, stages, prebuilt)
+
+    game_id = extract_id_from_live_feed_link(live_feed_link)
+    records = { row[0]: row[1:] for row in manifest.execute(
+        'SELECT stage, input_hash, version, output_hash, output_size, output_mtime_ns FROM stages WHERE game_id = ?',
+        (game_id,)) }
+    output_hashes = {}
+    rebuilt = []
+    for stage, inputs in STAGE_INPUTS.items():
+        if (stages is not None) and (stage not in stages):
+            continue
+        input_hash = hashlib.blake2b(' '.join(output_hashes[dep] for dep in inputs).encode(),
+                                     digest_size=16).hexdigest()
+        version = STAGE_VERSIONS.get(stage, 0)
+        record = records.get(stage)
+        path = get_stage_output_path(live_feed_link, stage)
+        stale = (stage in prebuilt) or (not path.exists()) or \
+            ((len(inputs) > 0) and ((record is None) or (record[0] != input_hash) or (record[1] != version)))
+        if stale and (stage not in prebuilt):
+            logger.info('Rebuilding ' + stage + ' for ' + game_id)
+            if not run_stage(live_feed_link, stage):
+                raise ValueError('Unable to build ' + stage + ' for ' + game_id)
+        if stale:
+            rebuilt.append(stage)
+            # Raw file paths depend on which format exists, so look them up again after building.
+            path = get_stage_output_path(live_feed_link, stage)
+
+        stat = path.stat()
+        if (not stale) and (record is not None) and (record[3] == stat.st_size) and (record[4] == stat.st_mtime_ns):
+            output_hash = record[2]
+        else:
+            output_hash = hash_file(path)
+        output_hashes[stage] = output_hash
+        if stale or (record is None) or (record[:3] != (input_hash, version, output_hash)) or \
+                (record[3:] != (stat.st_size, stat.st_mtime_ns)):
+            manifest.execute('INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                             (game_id, stage, input_hash, version, output_hash, stat.st_size, stat.st_mtime_ns,
+                              datetime.now().isoformat(timespec='seconds')))
+    manifest.commit()
+    return rebuilt
+
+def is_game_stale(live_feed_link, manifest):
+    '''
+    Checks, without hashing or building anything, whether update_game_stages would find a stage of a game stale. A
+    stage whose output changed size or modification time since it was recorded counts as stale, even if its contents
+    are the same.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    manifest : sqlite3.Connection
+        Open build manifest.
+
+    Returns
+    -------
+    bool
+        True if any stage is missing from the manifest, missing on disk, or out of date.
+
+    '''
+    game_id = extract_id_from_live_feed_link(live_feed_link)
+    records = { row[0]: row[1:] for row in manifest.execute(
+        'SELECT stage, input_hash, version, output_hash, output_size, output_mtime_ns FROM stages WHERE game_id = ?',
+        (game_id,)) }
+    output_hashes = {}
+    for stage, inputs in STAGE_INPUTS.items():
+        record = records.get(stage)
+        path = get_stage_output_path(live_feed_link, stage)
+        if (record is None) or (not path.exists()):
+            return True
+        stat = path.stat()
+        if (record[3], record[4]) != (stat.st_size, stat.st_mtime_ns):
+            return True
+        if len(inputs) > 0:
+            input_hash = hashlib.blake2b(' '.join(output_hashes[dep] for dep in inputs).encode(),
+                                         digest_size=16).hexdigest()
+            if (record[0] != input_hash) or (record[1] != STAGE_VERSIONS.get(stage, 0)):
+                return True
+        output_hashes[stage] = record[2]
+    return False
+
+def get_game_combined_frame_incremental(live_feed_link, manifest=None):
+    '''
+    Obtains the combined data frame for a game, first rebuilding any stale stages. See update_game_stages.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    manifest : sqlite3.Connection, optional
+        Open build manifest. If None, the manifest is opened and closed for this game. The default is None.
+
+    Returns
+    -------
+    Pandas data frame
+        Data frame combining the live feed and the html report data.
+
+    '''
+    update_game_stages(live_feed_link, manifest)
+    return read_game_combined_frame(live_feed_link)
+
+#%% Build combined frames in parallel
+def build_game_combined_frame(live_feed_link, refresh_combine=False, refresh_all=False, refresh_feed=False,
+                              refresh_html=False, incremental=False):
+    '''
+    Builds and saves the combined data frame for a single game, returning a small status record rather than the
+    frame itself. Used as the unit of work by build_combined_frames_parallel, so that worker processes write their
+    own pickles and only the status needs to be sent back to the parent process.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    refresh_combine, refresh_all, refresh_feed, refresh_html : bool, optional
+        See get_game_combined_frame_from_local. The defaults are False. Ignored if incremental is True.
+    incremental : bool, optional
+        If True, rebuilds exactly the stale stages of the game using update_game_stages. The default is False.
+
+    Returns
+    -------
+    dict
+        Status record with keys 'game_id', 'live_feed_link', 'ok', 'rows', 'seconds', 'error', 'rebuilt', and
+        'metrics'. 'rebuilt' lists the stages rebuilt, separated by commas, for incremental builds. It is None
+        otherwise. 'metrics' holds the stage metrics recorded in this process since they were last collected, which
+        are removed from the process (see get_metrics).
+
+    '''
+    start = time.perf_counter()
+    status = {'game_id': extract_id_from_live_feed_link(live_feed_link), 'live_feed_link': live_feed_link,
+              'ok': False, 'rows': 0, 'seconds': 0.0, 'error': None, 'rebuilt': None}
+    try:
+        if incremental:
+            status['rebuilt'] = ','.join(update_game_stages(live_feed_link))
+            frame = read_game_combined_frame(live_feed_link)
+        else:
+            frame = get_game_combined_frame_from_local(live_feed_link, refresh_combine=refresh_combine,
+                                                       refresh_all=refresh_all, refresh_feed=refresh_feed,
+                                                       refresh_html=refresh_html)
+        status['ok'] = frame is not None
+        status['rows'] = len(frame) if frame is not None else 0
+    except Exception as err:
+        # A single bad game shouldn't take down the whole pool. Record the failure instead.
+        logger.error('Error building combined frame for ' + live_feed_link + ' (' + repr(err) + ')')
+        status['error'] = repr(err)
+    status['seconds'] = time.perf_counter() - start
+    # Hand the stage metrics back with the status, since workers run in separate processes. Worker pools start with
+    # reset_metrics, so that forked workers don't hand back the records they inherited from the parent.
+    status['metrics'] = get_metrics(clear=True)
+    return status
+
+def build_game_combined_frames(link_list):
+    '''
+    Brings every pipeline stage of several games up to date, like build_game_combined_frame with incremental set,
+    but builds the stale combined frames of all of the games together with construct_combined_frames. Used as the
+    unit of work by run_batch and build_combined_frames_parallel.
+
+    Parameters
+    ----------
+    link_list : list of str
+        List of API links to the game live feeds.
+
+    Returns
+    -------
+    list of dict
+        Status record of each game, in the same order as link_list. See build_game_combined_frame. The time taken by
+        the batched build is shared equally among the games built in it, and the stage metrics of all of the games
+        are given with the last record.
+
+    '''
+    statuses = []
+    stale = []
+    with closing(open_build_manifest()) as manifest:
+        for live_feed_link in link_list:
+            start = time.perf_counter()
+            status = {'game_id': extract_id_from_live_feed_link(live_feed_link), 'live_feed_link': live_feed_link,
+                      'ok': False, 'rows': 0, 'seconds': 0.0, 'error': None, 'rebuilt': [], 'metrics': []}
+            try:
+                # Bring the inputs up to date first. The combined stage is then the only one that can be stale.
+                status['rebuilt'] = update_game_stages(live_feed_link, manifest,
+                                                       stages=[ stage for stage in STAGE_INPUTS if stage != 'combined' ])
+                if is_game_stale(live_feed_link, manifest):
+                    feed_frame = get_game_live_feed_frame(live_feed_link)
+                    html_frame = get_game_html_report_frame(live_feed_link)
+                    if (feed_frame is None) or (html_frame is None):
+                        raise ValueError('Unable to build combined for ' + status['game_id'])
+                    stale.append((status, feed_frame, html_frame))
+                else:
+                    frame = read_game_combined_frame(live_feed_link)
+                    status['ok'] = frame is not None
+                    status['rows'] = len(frame) if frame is not None else 0
+            except Exception as err:
+                logger.error('Error building combined frame for ' + live_feed_link + ' (' + repr(err) + ')')
+                status['error'] = repr(err)
+            status['seconds'] = time.perf_counter() - start
+            statuses.append(status)
+
+        if stale:
+            start = time.perf_counter()
+            try:
+                combined_frames = construct_combined_frames([ (feed_frame, html_frame)
+                                                              for _, feed_frame, html_frame in stale ])
+            except Exception as err:
+                # Combine the games one at a time, so that only the game at fault fails.
+                logger.error('Error building combined frames in a batch, retrying one game at a time (' + repr(err)
+                             + ')')
+                combined_frames = []
+                for status, feed_frame, html_frame in stale:
+                    try:
+                        combined_frames.append(construct_combined_frame(feed_frame, html_frame))
+                    except Exception as err:
+                        logger.error('Error building combined frame for ' + status['live_feed_link'] + ' (' +
+                                     repr(err) + ')')
+                        status['error'] = repr(err)
+                        combined_frames.append(None)
+            for (status, _, _), frame in zip(stale, combined_frames):
+                if frame is None:
+                    continue
+                try:
+                    write_game_combined_frame(status['live_feed_link'], frame)
+                    update_game_stages(status['live_feed_link'], manifest, prebuilt=['combined'])
+                    status['rebuilt'].append('combined')
+                    status['ok'] = True
+                    status['rows'] = len(frame)
+                except Exception as err:
+                    logger.error('Error saving combined frame for ' + status['live_feed_link'] + ' (' + repr(err) +
+                                 ')')
+                    status['error'] = repr(err)
+            shared_seconds = (time.perf_counter() - start) / len(stale)
+            for status, _, _ in stale:
+                status['seconds'] += shared_seconds
+
+    for status in statuses:
+        status['rebuilt'] = ','.join(status['rebuilt'])
+    if statuses:
+        # Hand the stage metrics back with the statuses, since workers run in separate processes. Worker pools start
+        # with reset_metrics, so that forked workers don't hand back the records they inherited from the parent.
+        statuses[-1]['metrics'] = get_metrics(clear=True)
+    return statuses
+
+def split_into_batches(link_list, jobs):
+    '''
+    Splits games into batches for build_game_combined_frames, of at most COMBINED_BATCH_SIZE games, and small enough
+    that every worker gets at least one batch.
+
+    Parameters
+    ----------
+    link_list : list of str
+        List of API links to the game live feeds.
+    jobs : int
+        Number of worker processes.
+
+    Returns
+    -------
+    list of list of str
+        Batches of links, in the same order as link_list.
+
+    '''
+    batch_size = max(1, min(COMBINED_BATCH_SIZE, -(-len(link_list) // jobs)))
+    return [ link_list[start:start + batch_size] for start in range(0, len(link_list), batch_size) ]
+
+def build_combined_frames_parallel(link_list, jobs=None, refresh_combine=False, refresh_all=False, refresh_feed=False,
+                                   refresh_html=False, incremental=False):
+    '''
+    Builds and saves the combined data frames for every game in link_list, spreading the games over a pool of
+    worker processes. Only uses locally-saved raw files, like get_game_combined_frame_from_local.
+
+    Parameters
+    ----------
+    link_list : list of str
+        List of API links to the game live feeds.
+    jobs : int, optional
+        Number of worker processes. If None or less than 1, uses one process per CPU. If 1, games are built in the
+        current process without creating a pool. The default is None.
+    refresh_combine, refresh_all, refresh_feed, refresh_html : bool, optional
+        See get_game_combined_frame_from_local. The defaults are False. Ignored if incremental is True.
+    incremental : bool, optional
+        If True, rebuilds exactly the stale stages of each game using update_game_stages, building combined frames
+        in batches (see build_game_combined_frames). The default is False.
+
+    Returns
+    -------
+    Pandas DataFrame
+        One status record per game (see build_game_combined_frame), in the same order as link_list.
+
+    '''
+    jobs = os.cpu_count() if (jobs is None) or (jobs < 1) else jobs
+    build = partial(build_game_combined_frame, refresh_combine=refresh_combine, refresh_all=refresh_all,
+                    refresh_feed=refresh_feed, refresh_html=refresh_html, incremental=incremental)
+    if incremental:
+        # Combined frames are built in batches, which is faster than one game at a time.
+        batches = split_into_batches(list(link_list), jobs)
+        if jobs == 1:
+            statuses = [ status for batch in batches for status in build_game_combined_frames(batch) ]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=reset_metrics) as executor:
+                statuses = [ status for batch_statuses in executor.map(build_game_combined_frames, batches)
+                             for status in batch_statuses ]
+    elif jobs == 1:
+        statuses = [ build(link) for link in link_list ]
+    else:
+        # Hand out games in chunks to limit inter-process overhead, while keeping enough chunks per worker
+        # that slow games don't leave the other workers idle. Executor.map returns results in submission order.
+        chunksize = max(1, len(link_list) // (jobs * 8))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=reset_metrics) as executor:
+            statuses = list(executor.map(build, link_list, chunksize=chunksize))
+    for status in statuses:
+        record_metrics(status.pop('metrics'))
+    summary = pd.DataFrame(statuses, columns=['game_id', 'live_feed_link', 'ok', 'rows', 'seconds', 'error', 'rebuilt'])
+    logger.info('Built ' + str(int(summary['ok'].sum())) + ' of ' + str(len(summary)) + ' combined frames')
+    return summary
+
+#%% Resumable batch runs
+def get_batch_paths(name):
+    '''
+    Obtains the checkpoint and dead-letter files of a batch.
+
+    Parameters
+    ----------
+    name : str
+        Name of the batch. Example: 'backfill'.
+
+    Returns
+    -------
+    checkpoint_path : pathlib.Path
+        File listing the games completed by the batch, one json record per line. The last record for a game is the
+        current one.
+    dead_letter_path : pathlib.Path
+        File listing the games that failed, one json record per line. The last record for a game is the current one.
+
+    '''
+    batch_folder = Path.cwd().joinpath(BATCH_FOLDER)
+    return batch_folder.joinpath(name + '.checkpoint.jsonl'), batch_folder.joinpath(name + '.dead_letter.jsonl')
+
+def read_json_lines(path):
+    '''
+    Reads a file holding one json record per line, ignoring a partially-written last line.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File to read.
+
+    Returns
+    -------
+    list of dict
+        Records in the file. Empty if the file doesn't exist.
+
+    '''
+    if not path.exists():
+        return []
+    records = []
+    with path.open('r') as infile:
+        for line in infile:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A run that was killed while writing can leave a truncated line.
+                logger.warning('Skipping unreadable line in ' + str(path))
+    return records
+
+def append_json_line(path, record):
+    '''
+    Appends a json record to a file, making sure it reaches the disk.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File to append to.
+    record : dict
+        Record to append.
+
+    Returns
+    -------
+    None.
+
+    '''
+    path.parent.resolve().mkdir(parents=True, exist_ok=True)
+    with path.open('a') as outfile:
+        outfile.write(json.dumps(record) + '\n')
+        outfile.flush()
+        os.fsync(outfile.fileno())
+
+def read_batch_checkpoint(name):
+    '''
+    Lists the games completed by a batch.
+
+    Parameters
+    ----------
+    name : str
+        Name of the batch.
+
+    Returns
+    -------
+    set of str
+        Game ids of the completed games. Games whose last record invalidates them, because a later rebuild failed,
+        aren't included.
+
+    '''
+    checkpoint_path, _ = get_batch_paths(name)
+    latest = {}
+    for record in read_json_lines(checkpoint_path):
+        latest[record['game_id']] = record
+    return { game_id for game_id, record in latest.items() if not record.get('invalidated', False) }
+
+def read_dead_letters(name):
+    '''
+    Lists the games of a batch that failed and haven't succeeded since.
+
+    Parameters
+    ----------
+    name : str
+        Name of the batch.
+
+    Returns
+    -------
+    Pandas DataFrame
+        One row per failed game, with columns 'game_id', 'live_feed_link', 'attempts', 'error', and 'failed_at'.
+
+    '''
+    _, dead_letter_path = get_batch_paths(name)
+    latest = {}
+    for record in read_json_lines(dead_letter_path):
+        latest[record['game_id']] = record
+    return pd.DataFrame([ record for record in latest.values() if not record.get('resolved', False) ],
+                        columns=['game_id', 'live_feed_link', 'attempts', 'error', 'failed_at'])
+
+def run_batch(link_list, name='default', jobs=1, retry=False, max_attempts=BATCH_MAX_ATTEMPTS, rebuild=None):
+    '''
+    Builds the combined frames for every game in link_list, rebuilding only stale stages (see update_game_stages),
+    and records progress so that an interrupted run can be resumed. Games completed by an earlier run of the batch are
+    skipped, unless a stage has gone stale since (see is_game_stale), for example because STAGE_VERSIONS changed or a
+    raw file was refreshed. Games are built in batches (see build_game_combined_frames). A game that fails doesn't
+    stop the batch; it is added to the dead-letter list of the batch with its error instead, and is no longer
+    completed if an earlier run completed it. Dead-letter games are only tried again if retry is True.
+
+    Parameters
+    ----------
+    link_list : list of str
+        List of API links to the game live feeds.
+    name : str, optional
+        Name of the batch, which identifies its checkpoint and dead-letter files. The default is 'default'.
+    jobs : int, optional
+        Number of worker processes. If None or less than 1, uses one process per CPU. If 1, games are built in the
+        current process. The default is 1.
+    retry : bool, optional
+        If True, also tries the games in the dead-letter list again, unless they have already failed max_attempts
+        times. The default is False.
+    max_attempts : int, optional
+        Maximum number of times a game is tried. The default is BATCH_MAX_ATTEMPTS.
+    rebuild : list of str, optional
+        Links of games to bring up to date even if an earlier run of the batch completed them, such as games whose
+        raw files changed (see sync_schedules). They are also tried if they are in the dead-letter list, with their
+        attempts counted again from zero, since their inputs changed. The default is None.
+
+    Returns
+    -------
+    Pandas DataFrame
+        One status record (see build_game_combined_frame) per game built in this run, in the order they finished.
+
+    '''
+    checkpoint_path, dead_letter_path = get_batch_paths(name)
+    dead_letters = read_dead_letters(name).set_index('game_id')
+    # A game in the dead-letter list isn't done, even if an earlier run completed it.
+    completed = read_batch_checkpoint(name) - set(dead_letters.index)
+    rebuild_ids = { extract_id_from_live_feed_link(link) for link in (rebuild or []) }
+    pending = []
+    stale = 0
+    with closing(open_build_manifest()) as manifest:
+        for live_feed_link in link_list:
+            game_id = extract_id_from_live_feed_link(live_feed_link)
+            if game_id in rebuild_ids:
+                pending.append(live_feed_link)
+                continue
+            if (game_id in completed) and (not is_game_stale(live_feed_link, manifest)):
+                continue
+            # Stale games that failed to rebuild are in the dead-letter list like any other failed game.
+            if game_id in dead_letters.index and \
+                    ((not retry) or dead_letters.loc[game_id, 'attempts'] >= max_attempts):
+                continue
+            stale += game_id in completed
+            pending.append(live_feed_link)
+    # Games rebuilt because their inputs changed get a fresh set of attempts.
+    dead_letters.loc[dead_letters.index.intersection(list(rebuild_ids)), 'attempts'] = 0
+    logger.info('Batch ' + name + ': ' + str(len(completed)) + ' games already done, ' + str(len(pending)) +
+                ' to build (' + str(stale) + ' of them stale)')
+
+    def record_status(status):
+        record_metrics(status.pop('metrics'))
+        game_id = status['game_id']
+        finished_at = datetime.now().isoformat(timespec='seconds')
+        if status['ok']:
+            append_json_line(checkpoint_path, {'game_id': game_id, 'live_feed_link': status['live_feed_link'],
+                                               'rows': status['rows'], 'finished_at': finished_at})
+            if game_id in dead_letters.index:
+                append_json_line(dead_letter_path, {'game_id': game_id, 'resolved': True})
+        else:
+            status['error'] = status['error'] if status['error'] is not None else 'No frame produced'
+            # The frame from the earlier run is out of date, so the game is no longer done.
+            if game_id in completed:
+                append_json_line(checkpoint_path, {'game_id': game_id, 'invalidated': True,
+                                                   'failed_at': finished_at})
+            attempts = int(dead_letters.loc[game_id, 'attempts']) + 1 if game_id in dead_letters.index else 1
+            append_json_line(dead_letter_path, {'game_id': game_id, 'live_feed_link': status['live_feed_link'],
+                                                'attempts': attempts, 'error': status['error'],
+                                                'failed_at': finished_at})
+        return status
+
+    jobs = os.cpu_count() if (jobs is None) or (jobs < 1) else jobs
+    # Combined frames are built in batches (see build_game_combined_frames), which is faster than one game at a time.
+    batches = split_into_batches(pending, jobs)
+    statuses = []
+    if jobs == 1:
+        for batch in batches:
+            statuses.extend(record_status(status) for status in build_game_combined_frames(batch))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=reset_metrics) as executor:
+            futures = [ executor.submit(build_game_combined_frames, batch) for batch in batches ]
+            # Record each batch as soon as it finishes, so that an interruption loses as little work as possible.
+            for future in as_completed(futures):
+                statuses.extend(record_status(status) for status in future.result())
+    summary = pd.DataFrame(statuses, columns=['game_id', 'live_feed_link', 'ok', 'rows', 'seconds', 'error', 'rebuilt'])
+    logger.info('Batch ' + name + ': built ' + str(int(summary['ok'].sum())) + ' of ' + str(len(summary)) +
+                ' games')
+    return summary
+
+def retry_dead_letters(name='default', jobs=1, max_attempts=BATCH_MAX_ATTEMPTS):
+    '''
+    Tries the failed games of a batch again. See run_batch.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the batch. The default is 'default'.
+    jobs : int, optional
+        Number of worker processes. See run_batch. The default is 1.
+    max_attempts : int, optional
+        Maximum number of times a game is tried. The default is BATCH_MAX_ATTEMPTS.
+
+    Returns
+    -------
+    Pandas DataFrame
+        Status of each game tried. See run_batch.
+
+    '''
+    return run_batch(list(read_dead_letters(name)['live_feed_link']), name=name, jobs=jobs, retry=True,
+                     max_attempts=max_attempts)
+
+#%% Season-partitioned shot store
+def get_shot_store_season_path(season):
+    '''
+    Obtains the folder holding the shot store files for a season.
+
+    Parameters
+    ----------
+    season : str
+        The season. Example: '20182019' for the 2018-19 season.
+
+    Returns
+    -------
+    pathlib.Path
+        Path object for the season folder, which may not exist yet.
+
+    '''
+    current_dir = Path.cwd()
+    relative_path = SHOT_STORE_FOLDER + 'season=' + season
+    return current_dir.joinpath(relative_path)
+
+def get_shot_store_pending_paths(season):
+    '''
+    Lists the per-game files appended to the season since it was last compacted.
+
+    Parameters
+    ----------
+    season : str
+        The season. Example: '20182019' for the 2018-19 season.
+
+    Returns
+    -------
+    list of pathlib.Path
+        Paths of the pending per-game files, sorted by game id.
+
+    '''
+    pending_folder = get_shot_store_season_path(season).joinpath('pending')
+    if not pending_folder.exists():
+        return []
+    return sorted(pending_folder.glob('game_*.parquet'))
+
+def append_game_to_shot_store(live_feed_link, frame):
+    '''
+    Appends the combined frame for a game to the shot store for its season. Appending a game that is already in the
+    store replaces its rows. The season is compacted once it has more than SHOT_STORE_MAX_PENDING appended games.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    frame : Pandas DataFrame
+        Combined frame for the game.
+
+    Returns
+    -------
+    None.
+
+    '''
+    game_id = extract_id_from_live_feed_link(live_feed_link)
+    season = extract_season_from_link(live_feed_link)
+    stored = frame.copy()
+    stored.insert(0, 'game_id', game_id)
+    pending_folder = get_shot_store_season_path(season).joinpath('pending')
+    pending_folder.mkdir(parents=True, exist_ok=True)
+    stored.to_parquet(str(pending_folder.joinpath('game_' + game_id + '.parquet')), index=False,
+                      compression=SHOT_STORE_COMPRESSION)
+    if len(get_shot_store_pending_paths(season)) > SHOT_STORE_MAX_PENDING:
+        compact_shot_store(season)
+
+def read_shot_store_season(season, columns=None):
+    '''
+    Reads the shot store for a single season.
+
+    Parameters
+    ----------
+    season : str
+        The season. Example: '20182019' for the 2018-19 season.
+    columns : list of str, optional
+        Columns to read. If None, reads all columns. The default is None.
+
+    Returns
+    -------
+    Pandas DataFrame
+        Stored shots for the season, or None if nothing is stored for the season.
+
+    '''
+    # The game id is always needed to let pending files replace compacted rows.
+    read_columns = None if columns is None else ['game_id'] + [ c for c in columns if c != 'game_id' ]
+    season_file = get_shot_store_season_path(season).joinpath('shots.parquet')
+    pending_frames = [ pd.read_parquet(str(path), columns=read_columns)
+                       for path in get_shot_store_pending_paths(season) ]
+    frames = []
+    if season_file.exists():
+        logger.info('Reading shot store for ' + season)
+        compacted = pd.read_parquet(str(season_file), columns=read_columns)
+        if pending_frames:
+            pending_ids = set(pd.concat([ frame['game_id'] for frame in pending_frames ]))
+            compacted = compacted[~compacted['game_id'].isin(pending_ids)]
+        frames.append(compacted)
+    frames += pending_frames
+    if not frames:
+        return None
+    frame = concat_frames(frames)
+    if (columns is not None) and ('game_id' not in columns):
+        frame.drop('game_id', axis=1, inplace=True)
+    return frame
+
+def compact_shot_store(season):
+    '''
+    Merges the pending per-game files for a season into the season file, keeping the number of files bounded.
+
+    Parameters
+    ----------
+    season : str
+        The season. Example: '20182019' for the 2018-19 season.
+
+    Returns
+    -------
+    None.
+
+    '''
+    pending_paths = get_shot_store_pending_paths(season)
+    if not pending_paths:
+        return
+    frame = read_shot_store_season(season)
+    frame.sort_values('game_id', kind='stable', inplace=True)
+    season_file = get_shot_store_season_path(season).joinpath('shots.parquet')
+    # Write to a temporary file first so that an interrupted compaction never leaves a partial season file.
+    temp_file = season_file.with_suffix('.tmp')
+    frame.to_parquet(str(temp_file), index=False, compression=SHOT_STORE_COMPRESSION)
+    os.replace(str(temp_file), str(season_file))
+    for path in pending_paths:
+        path.unlink()
+    logger.info('Compacted shot store for ' + season + ' (' + str(len(pending_paths)) + ' games appended)')
+
+def read_shot_store(seasons, columns=None):
+    '''
+    Reads the stored shots for one or more seasons.
+
+    Parameters
+    ----------
+    seasons : str or list of str
+        Season or list of seasons. Example: '20182019' for the 2018-19 season.
+    columns : list of str, optional
+        Columns to read. If None, reads all columns. Reading only the needed columns is much faster.
+        The default is None.
+
+    Returns
+    -------
+    Pandas DataFrame
+        Shots for all of the requested seasons, with a 'game_id' column identifying the game (if columns is None or
+        includes 'game_id'). Returns None if nothing is stored for any of the seasons.
+
+    '''
+    if (type(seasons)==str):
+        seasons = [seasons]
+    frames = [ read_shot_store_season(season, columns) for season in seasons ]
+    frames = [ frame for frame in frames if frame is not None ]
+    if not frames:
+        return None
+    return concat_frames(frames)
+
+def build_shot_store(link_list):
+    '''
+    Appends the combined frames for every game in link_list to the shot store and compacts the affected seasons.
+    Only uses locally-saved raw files, like get_game_combined_frame_from_local. Not safe to run in several processes
+    at once.
+
+    Parameters
+    ----------
+    link_list : list of str
+        List of API links to the game live feeds.
+
+    Returns
+    -------
+    int
+        Number of games added to the store.
+
+    '''
+    added = 0
+    seasons = set()
+    for live_feed_link in link_list:
+        frame = get_game_combined_frame_from_local(live_feed_link)
+        if frame is not None:
+            append_game_to_shot_store(live_feed_link, frame)
+            seasons.add(extract_season_from_link(live_feed_link))
+            added += 1
+    for season in sorted(seasons):
+        compact_shot_store(season)
+    return added
+
+#%% Streaming season build
+def iter_game_combined_frames(link_list, incremental=True, skipped=None):
+    '''
+    Generates the combined frame for each game in turn, so that only one game needs to be held in memory at a time.
+    Games whose frame cannot be obtained are skipped, and recorded in skipped.
+
+    Parameters
+    ----------
+    link_list : list of str
+        List of API links to the game live feeds.
+    incremental : bool, optional
+        If True, rebuilds the stale stages of each game using the build manifest (see update_game_stages). Otherwise
+        uses get_game_combined_frame_from_local. The default is True.
+    skipped : list, optional
+        The links of skipped games are appended to this list. The default is None.
+
+    Yields
+    ------
+    live_feed_link : str
+        The live feed link of the game.
+    frame : Pandas DataFrame
+        Combined frame for the game.
+
+    '''
+    with closing(open_build_manifest()) as manifest:
+        for live_feed_link in link_list:
+            try:
+                if incremental:
+                    frame = get_game_combined_frame_incremental(live_feed_link, manifest)
+                else:
+                    frame = get_game_combined_frame_from_local(live_feed_link)
+            except Exception as e:
+                logger.error('Unable to build combined frame for ' + live_feed_link + ': ' + repr(e))
+                frame = None
+            if frame is not None:
+                yield live_feed_link, frame
+            elif skipped is not None:
+                skipped.append(live_feed_link)
+
+def iter_shot_store_games(season_file, excluded_ids, columns=None):
+    '''
+    Generates the stored rows of each game in a season file in turn, reading one row group at a time.
+
+    Parameters
+    ----------
+    season_file : pathlib.Path
+        Season file of the shot store.
+    excluded_ids : collection of str
+        Ids of games to leave out. It is checked as each row group is read, so it may grow during the iteration.
+    columns : list of str, optional
+        Columns to give each frame, in order, adding missing columns. If None, keeps the stored columns. The default
+        is None.
+
+    Yields
+    ------
+    live_feed_link : str
+        The live feed link of the game.
+    frame : Pandas DataFrame
+        Stored rows for the game, without the 'game_id' column.
+
+    '''
+    import pyarrow.parquet
+    season_data = pyarrow.parquet.ParquetFile(str(season_file))
+    for i in range(season_data.num_row_groups):
+        stored = season_data.read_row_group(i).to_pandas()
+        stored = stored[~stored['game_id'].isin(list(excluded_ids))]
+        for game_id, frame in stored.groupby('game_id', sort=False):
+            frame = frame.drop('game_id', axis=1).reset_index(drop=True)
+            if columns is not None:
+                frame = frame.reindex(columns=columns)
+            yield '/api/v1/game/' + game_id + '/feed/live', frame
+
+def write_frames_streaming(frames, path, memory_limit=STREAM_MEMORY_LIMIT):
+    '''
+    Writes a stream of per-game frames to a single Parquet file. Frames are buffered until they use memory_limit
+    bytes and then written out as one row group, so memory use is bounded regardless of the number of games.
+
+    Parameters
+    ----------
+    frames : iterable of (str, Pandas DataFrame)
+        Pairs of live feed link and combined frame, such as those generated by iter_game_combined_frames.
+    path : pathlib.Path
+        File to write. It is only replaced once the whole stream has been written.
+    memory_limit : int, optional
+        Maximum number of bytes of frames to buffer before writing a row group. The default is STREAM_MEMORY_LIMIT.
+
+    Returns
+    -------
+    dict
+        Summary with keys 'games', 'rows', and 'row_groups'.
+
+    '''
+    import pyarrow.parquet
+    summary = {'games': 0, 'rows': 0, 'row_groups': 0}
+    temp_file = path.with_suffix('.tmp')
+    writer = None
+    buffered = []
+    buffered_bytes = 0
+
+    def flush():
+        nonlocal writer
+        batch = concat_frames(buffered)
+        if writer is None:
+            schema = pyarrow.Schema.from_pandas(batch, preserve_index=False)
+            # A column that is entirely missing in the first batch has no type yet; later games may have values.
+            # Later batches may also have more categories than fit the index type inferred from the first one.
+            for i, field in enumerate(schema):
+                if pyarrow.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pyarrow.large_string()))
+                elif pyarrow.types.is_dictionary(field.type):
+                    schema = schema.set(i, field.with_type(pyarrow.dictionary(pyarrow.int32(), field.type.value_type)))
+            writer = pyarrow.parquet.ParquetWriter(str(temp_file), schema, compression=SHOT_STORE_COMPRESSION)
+        table = pyarrow.Table.from_pandas(batch, schema=writer.schema, preserve_index=False)
+        writer.write_table(table, row_group_size=len(batch))
+        summary['row_groups'] += 1
+        buffered.clear()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        for live_feed_link, frame in frames:
+            stored = frame.copy()
+            stored.insert(0, 'game_id', extract_id_from_live_feed_link(live_feed_link))
+            buffered.append(stored)
+            buffered_bytes += int(stored.memory_usage(deep=True).sum())
+            summary['games'] += 1
+            summary['rows'] += len(stored)
+            if buffered_bytes >= memory_limit:
+                flush()
+                buffered_bytes = 0
+        if buffered:
+            flush()
+    except BaseException:
+        # Don't leave a partial file behind. The writer is closed first, so that its file can be removed.
+        if writer is not None:
+            writer.close()
+        temp_file.unlink(missing_ok=True)
+        raise
+    if writer is None:
+        logger.info('No frames to write to ' + str(path))
+        return summary
+    writer.close()
+    os.replace(str(temp_file), str(path))
+    return summary
+
+def build_shot_store_streaming(link_list, memory_limit=STREAM_MEMORY_LIMIT, incremental=True):
+    '''
+    Rebuilds the shot store season files for the games in link_list one game at a time, never holding more than
+    memory_limit bytes of frames in memory. The rows of each rebuilt game replace its rows in the season file, and
+    its pending per-game file is removed since it is superseded. Other games already in the season file are kept,
+    including games in link_list whose frame cannot be obtained; those are logged and counted as skipped.
+
+    Parameters
+    ----------
+    link_list : list of str
+        List of API links to the game live feeds.
+    memory_limit : int, optional
+        Maximum number of bytes of frames to buffer before writing a row group. The default is STREAM_MEMORY_LIMIT.
+    incremental : bool, optional
+        See iter_game_combined_frames. The default is True.
+
+    Returns
+    -------
+    Pandas DataFrame
+        One row per season, with the number of games, rows, and row groups written, and the number of games in
+        link_list that were skipped.
+
+    '''
+    season_links = {}
+    for live_feed_link in link_list:
+        season_links.setdefault(extract_season_from_link(live_feed_link), []).append(live_feed_link)
+    summaries = []
+    for season, links in sorted(season_links.items()):
+        logger.info('Streaming shot store build for ' + season)
+        season_file = get_shot_store_season_path(season).joinpath('shots.parquet')
+        skipped = []
+        rebuilt_ids = set()
+        columns = []
+
+        def iter_season_frames():
+            for live_feed_link, frame in iter_game_combined_frames(links, incremental=incremental, skipped=skipped):
+                rebuilt_ids.add(extract_id_from_live_feed_link(live_feed_link))
+                if not columns:
+                    columns.extend(frame.columns)
+                yield live_feed_link, frame
+            # Games that weren't rebuilt keep their stored rows, so a failed game is never dropped from the store.
+            if season_file.exists():
+                yield from iter_shot_store_games(season_file, rebuilt_ids, columns or None)
+
+        summary = write_frames_streaming(iter_season_frames(), season_file, memory_limit=memory_limit)
+        for path in get_shot_store_pending_paths(season):
+            if path.stem[len('game_'):] in rebuilt_ids:
+                path.unlink()
+        if skipped:
+            logger.warning('Kept the stored rows of ' + str(len(skipped)) + ' games in ' + season
+                           + ' that could not be rebuilt: ' + ', '.join(skipped))
+        summaries.append(dict(season=season, skipped=len(skipped), **summary))
+    return pd.DataFrame(summaries, columns=['season', 'games', 'rows', 'row_groups', 'skipped'])
+
+#%% Feed catalog
+# Feed catalogs whose schema this process has already created, and per-thread connections used to record downloads.
+_feed_catalog_schemas = set()
+_feed_catalog_lock = threading.Lock()
+_feed_catalog_local = threading.local()
+
+def get_feed_catalog_path():
+    '''
+    Provides path to the local feed catalog database.
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the SQLite database holding the feed catalog.
+
+    '''
+    current_dir = Path.cwd()
+    return current_dir.joinpath(FEED_CATALOG_PATH)
+
+def open_feed_catalog():
+    '''
+    Opens the feed catalog, creating it if needed. The flags in KNOWN_GAME_FLAGS are always present. The schema is
+    only set up the first time the catalog is opened by this process.
+
+    Returns
+    -------
+    sqlite3.Connection
+        Connection to the catalog database. The caller is responsible for closing it.
+
+    '''
+    catalog_path = get_feed_catalog_path()
+    catalog_path.parent.resolve().mkdir(parents=True, exist_ok=True)
+    # Feeds are downloaded from several threads at once, so wait for locks rather than failing.
+    catalog = sqlite3.connect(str(catalog_path), timeout=60)
+    with _feed_catalog_lock:
+        if (catalog_path in _feed_catalog_schemas) and catalog_path.exists():
+            return catalog
+        _feed_catalog_schemas.add(catalog_path)
+    catalog.executescript('''CREATE TABLE IF NOT EXISTS games (
+                                   game_id TEXT PRIMARY KEY,
+                                   live_feed_link TEXT NOT NULL,
+                                   season TEXT,
+                                   game_type TEXT,
+                                   game_date TEXT,
+                                   away_code TEXT,
+                                   home_code TEXT,
+                                   play_count INTEGER NOT NULL,
+                                   feed_size INTEGER NOT NULL,
+                                   feed_checksum TEXT NOT NULL,
+                                   has_html INTEGER NOT NULL DEFAULT 0);
+                               CREATE INDEX IF NOT EXISTS games_play_count ON games (play_count);
+                               CREATE TABLE IF NOT EXISTS flags (
+                                   game_id TEXT NOT NULL,
+                                   flag TEXT NOT NULL,
+                                   PRIMARY KEY (game_id, flag));''')
+    catalog.executemany('INSERT OR IGNORE INTO flags VALUES (?, ?)', KNOWN_GAME_FLAGS.items())
+    catalog.commit()
+    return catalog
+
+def get_thread_feed_catalog():
+    '''
+    Provides a connection to the feed catalog for the current thread, opening it on first use. The connection is
+    kept open for the life of the thread, so that recording each download doesn't reopen the catalog.
+
+    Returns
+    -------
+    sqlite3.Connection
+        Connection to the catalog database. It must not be closed or shared with other threads.
+
+    '''
+    catalog_path = get_feed_catalog_path()
+    connections = _feed_catalog_local.__dict__.setdefault('connections', {})
+    if (catalog_path not in connections) or (not catalog_path.exists()):
+        connections[catalog_path] = open_feed_catalog()
+    return connections[catalog_path]
+
+def catalog_live_feed(live_feed_link, live_feed=None, catalog=None, content=None):
+    '''
+    Records the summary of a locally-saved live feed in the feed catalog.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    live_feed : dict, optional
+        The live feed, if already loaded. If None, the feed is read from the local file. The default is None.
+    catalog : sqlite3.Connection, optional
+        Open feed catalog. If None, uses the connection of the current thread (see get_thread_feed_catalog). The
+        default is None.
+    content : bytes, optional
+        Contents of the local feed file, if already in memory, such as the value returned by save_live_feed. If None,
+        the file is read to compute its checksum. The default is None.
+
+    Returns
+    -------
+    bool
+        True if the feed was recorded, False if there is no local feed for the link.
+
+    '''
+    if catalog is None:
+        catalog = get_thread_feed_catalog()
+
+    feed_path = get_local_live_feed_path(live_feed_link)
+    if not feed_path.exists():
+        return False
+    if live_feed is None:
+        live_feed = read_live_feed_partial(live_feed_link)
+    game_data = live_feed['gameData']
+    teams = game_data['teams']
+    has_html = get_game_html_report_path(live_feed_link).exists() or \
+        get_legacy_game_html_report_path(live_feed_link).exists()
+    catalog.execute('INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (extract_id_from_live_feed_link(live_feed_link), live_feed_link, str(game_data['game']['season']),
+                     game_data['game']['type'], game_data['datetime']['dateTime'],
+                     teams['away'].get('triCode', teams['away'].get('teamName')),
+                     teams['home'].get('triCode', teams['home'].get('teamName')),
+                     len(live_feed['liveData']['plays']['allPlays']),
+                     feed_path.stat().st_size if content is None else len(content),
+                     hash_file(feed_path) if content is None else hashlib.blake2b(content, digest_size=16).hexdigest(),
+                     int(has_html)))
+    catalog.commit()
+    return True
+
+def catalog_html_report(live_feed_link, catalog=None):
+    '''
+    Marks the html report of a game as saved locally in the feed catalog. Games whose feed is not yet in the catalog
+    are left alone; their html report is detected when the feed is recorded.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    catalog : sqlite3.Connection, optional
+        Open feed catalog. If None, uses the connection of the current thread (see get_thread_feed_catalog). The
+        default is None.
+
+    Returns
+    -------
+    None.
+
+    '''
+    if catalog is None:
+        catalog = get_thread_feed_catalog()
+    catalog.execute('UPDATE games SET has_html = 1 WHERE game_id = ?', (extract_id_from_live_feed_link(live_feed_link),))
+    catalog.commit()
+
+def update_feed_catalog(live_feed_links, catalog=None):
+    '''
+    Makes sure that every game in live_feed_links is in the feed catalog, downloading missing feeds and recording
+    local feeds that were saved before the catalog existed. Each feed is only loaded once, when it is first recorded.
+
+    Parameters
+    ----------
+    live_feed_links : list of str
+        List of live feed links.
+    catalog : sqlite3.Connection, optional
+        Open feed catalog. If None, the catalog is opened and closed by this function. The default is None.
+
+    Returns
+    -------
+    int
+        Number of games added to the catalog.
+
+    '''
+    if catalog is None:
+        with closing(open_feed_catalog()) as catalog:
+            return update_feed_catalog(live_feed_links, catalog)
+
+    catalogued = { row[0] for row in catalog.execute('SELECT game_id FROM games') }
+    added = 0
+    for live_feed_link in live_feed_links:
+        if extract_id_from_live_feed_link(live_feed_link) in catalogued:
+            continue
+        live_feed = read_live_feed_partial(live_feed_link)
+        if live_feed is None:
+            # Downloading the feed records it in the catalog.
+            added += int(get_live_feed(live_feed_link) is not None)
+        else:
+            added += int(catalog_live_feed(live_feed_link, live_feed, catalog))
+    return added
+
+def flag_game(live_feed_link, flag, catalog=None):
+    '''
+    Flags a game in the feed catalog, excluding it from the build. See get_bad_links.
+
+    Parameters
+    ----------
+    live_feed_link : str
+        The live feed link of the game for the frame. Example: '/api/v1/game/2018020240/feed/live' 
+        for the game in the 2018-2019 season with id 020240. See the documentation for get_game_feed_links
+        for more information.
+    flag : str
+        Short description of the problem. Example: 'broken_html_report'.
+    catalog : sqlite3.Connection, optional
+        Open feed catalog. If None, the catalog is opened and closed by this function. The default is None.
+
+    Returns
+    -------
+    None.
+
+    '''
+    if catalog is None:
+        with closing(open_feed_catalog()) as catalog:
+            return flag_game(live_feed_link, flag, catalog)
+    catalog.execute('INSERT OR IGNORE INTO flags VALUES (?, ?)', (extract_id_from_live_feed_link(live_feed_link), flag))
+    catalog.commit()
+
+#%% Obtain and process data.
+def check_live_feeds_for_missing_data(live_feed_links):
+    '''
+    Checks game live feeds to determine if a play-by-play is included in the feed. Produces a list of live feeds
+    with no play by play. Uses the play counts recorded in the feed catalog, so each feed is loaded at most once.
+
+    Parameters
+    ----------
+    live_feed_links : list of str
+        List of live feed links.
+
+    Returns
+    -------
+    bad_links : list of str
+        List of links where the live-feed contained no play-by-play.
+
+    '''
+    with closing(open_feed_catalog()) as catalog:
+        update_feed_catalog(live_feed_links, catalog)
+        empty = { row[0] for row in catalog.execute('SELECT live_feed_link FROM games WHERE play_count = 0') }
+    return [ live_feed_link for live_feed_link in live_feed_links if live_feed_link in empty ]
+
+def get_missing_link_path():
+    '''
+    Provides path to local file saving live feed links with missing play-by-play
+
+    Returns
+    -------
+    bad_link_path : Path object
+        Path to json file storing live feed links missing play-by-play.
+
+    '''
+    current_dir = Path.cwd()
+    relative_path = DATA_FOLDER + 'bad_links.json'
+    bad_link_path = current_dir.joinpath(relative_path)
+    return bad_link_path
+
+def get_missing_links(live_feed_links):
+    '''
+    Get the live feed links with missing play-by-play. See check_live_feeds_for_missing_data. The list is also
+    exported to the file given by get_missing_link_path, which is read by the data wrangling notebook.
+
+    Parameters
+    ----------
+    live_feed_links : list of str
+        List of live feed links.
+
+    Returns
+    -------
+    list of str
+        List of links where the live-feed contained no play-by-play.
+
+    '''
+    bad_links = check_live_feeds_for_missing_data(live_feed_links)
+    bad_link_path = get_missing_link_path()
+    bad_link_path.parent.resolve().mkdir(parents=True, exist_ok=True)
+    with bad_link_path.open('w') as outfile:
+        json.dump(bad_links, outfile)
+    return bad_links
+
+def get_bad_links(live_feed_links):
+    '''
+    Finds the games that should be left out of the build: those whose live feed has no play-by-play and those
+    flagged in the feed catalog (see KNOWN_GAME_FLAGS and flag_game).
+
+    Parameters
+    ----------
+    live_feed_links : list of str
+        List of live feed links.
+
+    Returns
+    -------
+    set of str
+        Links of the games to leave out.
+
+    '''
+    with closing(open_feed_catalog()) as catalog:
+        update_feed_catalog(live_feed_links, catalog)
+        bad_ids = { row[0] for row in catalog.execute('''SELECT game_id FROM games WHERE play_count = 0
+                                                         UNION SELECT game_id FROM flags''') }
+    return { live_feed_link for live_feed_link in live_feed_links
+             if extract_id_from_live_feed_link(live_feed_link) in bad_ids }
+
+#%% Entry point
+def main(argv=None):
+    '''
+    Runs the full pipeline: obtains the game links for every season in SEASON_LIST, builds the frames for every
+    usable game, and streams them into the shot store.
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        Command line arguments. If None, uses sys.argv. The default is None.
+
+    Returns
+    -------
+    Pandas DataFrame
+        Summary of the shot store build. See build_shot_store_streaming.
+
+    '''
+    parser = argparse.ArgumentParser(description='Build combined shot data frames for every game in SEASON_LIST.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of worker processes used to build frames. Use 0 for one per CPU. Default: 1.')
+    parser.add_argument('-m', '--memory-limit', type=int, default=STREAM_MEMORY_LIMIT // 2**20,
+                        help='Megabytes of frames buffered before each write to the shot store. Default: '
+                        + str(STREAM_MEMORY_LIMIT // 2**20) + '.')
+    parser.add_argument('-b', '--batch', type=str, default='default',
+                        help='Name of the batch, used to resume interrupted runs. Default: default.')
+    parser.add_argument('-r', '--retry', action='store_true',
+                        help='Try the games that failed in earlier runs of the batch again.')
+    parser.add_argument('-s', '--sync', action='store_true',
+                        help='Sync the schedules first, and refresh the raw files of new or changed games.')
+    parser.add_argument('--api-root-url', type=str, default=None,
+                        help='Stem for API requests. Default: ' + API_ROOT_URL + '.')
+    parser.add_argument('--html-report-root-url', type=str, default=None,
+                        help='Stem for html report requests. Default: ' + HTML_REPORT_ROOT_URL + '.')
+    parser.add_argument('--http-recording', choices=['record', 'replay'], default=HTTP_SETTINGS['recording'],
+                        help='Save every response, or answer every request from saved responses, in '
+                        + HTTP_SETTINGS['recording_folder'] + '.')
+    args = parser.parse_args(argv)
+    # Logging is set up here rather than on import, so that importing the module leaves logging to the caller.
+    logging.basicConfig(filename='logs.log', level=logging.INFO, format='%(asctime)s %(message)s',
+                        datefmt='%m/%d/%Y %I:%M:%S %p')
+    set_base_urls(args.api_root_url, args.html_report_root_url)
+    configure_http_session(recording=args.http_recording)
+
+    # Pick up games played since the last run. Their raw files are refreshed with conditional requests, so unchanged
+    # files aren't downloaded again.
+    changed_links = None
+    if args.sync:
+        changed_links = sync_schedules(SEASON_LIST)
+        retrieve_all_concurrent(changed_links, refresh=True)
+    # Get all game links from the desired seasons.
+    game_links = get_game_feed_links(SEASON_LIST)
+    # Ignore games where the live feed is missing play-by-play, along with games flagged in the feed catalog (such as
+    # the two games with broken play-by-play in the HTML reports). The games missing play-by-play are also exported
+    # for the data wrangling notebook.
+    get_missing_links(game_links)
+    bad_links = get_bad_links(game_links)
+    # Games that aren't over according to the last schedule sync are built once a later sync finds them final.
+    unfinished_links = set(get_unfinished_links(SEASON_LIST))
+    good_links = [link for link in game_links if (link not in bad_links) and (link not in unfinished_links)]
+
+    # Create frames for each game. Only stages that are stale according to the build manifest are rebuilt. Progress
+    # is checkpointed, so an interrupted run picks up where it stopped, and failed games are set aside to retry.
+    run_batch(good_links, name=args.batch, jobs=args.jobs, retry=args.retry,
+              rebuild=changed_links)
+    completed = read_batch_checkpoint(args.batch)
+    dead_letters = read_dead_letters(args.batch)
+    if len(dead_letters) > 0:
+        logger.warning(str(len(dead_letters)) + ' games failed. See ' + str(get_batch_paths(args.batch)[1]))
+    # Stream the frames into the season-partitioned shot store, one game at a time.
+    store_links = [ link for link in good_links if extract_id_from_live_feed_link(link) in completed ]
+    store_summary = build_shot_store_streaming(store_links, memory_limit=args.memory_limit * 2**20)
+
+    # Report where the time went.
+    metrics_summary = get_metrics_summary()
+    logger.info('Stage metrics:\n' + metrics_summary.to_string())
+    write_metrics_file()
+    return store_summary
+
+if __name__ == '__main__':
+    main()
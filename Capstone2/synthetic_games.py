@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""
+Generates synthetic NHL games, as a statsapi live feed and a matching play-by-play html report, for benchmarking and
+checking produce_game_frames without network access.
+
+The generated data follows the layout of the real feeds and reports closely enough to exercise every parsing path:
+shots of all four kinds with shot types, zones, distances, assists, and the occasional penalty shot, non-shot events
+with faceoffs after stoppages, and on-ice tables for both teams. Games are reproducible from their seed.
+
+Created on Fri Oct 16 14:02:11 2026
+
+@author: Nathan Wodarz
+"""
+
+import random
+import json
+
+#%% Constants
+# Live feed event names and the corresponding html report event codes.
+SHOT_EVENT_WEIGHTS = {('Shot', 'SHOT'): 0.5, ('Missed Shot', 'MISS'): 0.25, ('Blocked Shot', 'BLOCK'): 0.2,
+                      ('Goal', 'GOAL'): 0.05}
+OTHER_EVENT_WEIGHTS = {('Faceoff', 'FAC'): 0.3, ('Hit', 'HIT'): 0.25, ('Giveaway', 'GIVE'): 0.1,
+                       ('Takeaway', 'TAKE'): 0.1, ('Stoppage', 'STOP'): 0.2, ('Penalty', 'PENL'): 0.05}
+# Fraction of events that are shots, in a typical game.
+DEFAULT_SHOT_SHARE = 0.4
+# Typical number of events in a game.
+DEFAULT_EVENT_COUNT = 330
+# Positions on the ice for the away and home teams, with the relative frequency of each situation. The generic 'F'
+# position appears in some older reports.
+DEFAULT_ON_ICE_SHAPES = {
+    ('CLRDDG', 'CLRDDG'): 0.75,
+    ('CLRDDG', 'CLDDG'): 0.08,
+    ('CLDDG', 'CLRDDG'): 0.08,
+    ('CLDDG', 'CLDDG'): 0.03,
+    ('CLRFDD', 'CLRDDG'): 0.02,
+    ('CLRDDG', 'CLRFDD'): 0.02,
+    ('CFDDG', 'CLRDDG'): 0.02
+}
+SHOT_TYPES = [('Wrist Shot', 'Wrist'), ('Slap Shot', 'Slap'), ('Snap Shot', 'Snap'), ('Backhand', 'Backhand'),
+              ('Tip-In', 'Tip-In'), ('Wrap-around', 'Wrap-around'), ('Deflected', 'Deflected')]
+MISS_TYPES = ['Wide of Net', 'Over Net', 'Hit Crossbar', 'Goalpost']
+ZONES = ['Off. Zone', 'Neu. Zone', 'Def. Zone']
+PERIOD_SECONDS = 1200
+PERIOD_ORDINALS = ['1st', '2nd', '3rd', 'OT']
+AWAY_TEAM = {'id': 6, 'triCode': 'BOS', 'teamName': 'Bruins', 'name': 'Boston Bruins'}
+HOME_TEAM = {'id': 10, 'triCode': 'TOR', 'teamName': 'Maple Leafs', 'name': 'Toronto Maple Leafs'}
+VENUE = 'Scotiabank Arena'
+
+#%% Generate games
+def make_roster(rng, team):
+    '''
+    Generates jersey numbers and names for the players of a team.
+
+    Parameters
+    ----------
+    rng : random.Random
+        Random number generator.
+    team : dict
+        Team description, with keys 'id' and 'triCode'.
+
+    Returns
+    -------
+    list of (int, str)
+        Jersey number and upper-case last name of each of the 20 players.
+
+    '''
+    numbers = rng.sample(range(1, 99), 20)
+    return [ (number, team['triCode'] + 'PLAYER' + str(k)) for k, number in enumerate(numbers) ]
+
+def make_on_ice_cell(positions, roster):
+    '''
+    Produces the html for the on-ice table of a single team.
+
+    Parameters
+    ----------
+    positions : str or None
+        One character per player on the ice, giving the position. None gives an empty cell, as for some stoppages.
+    roster : list of (int, str)
+        Roster of the team. See make_roster.
+
+    Returns
+    -------
+    str
+        Html for the table cell.
+
+    '''
+    if positions is None:
+        return '<td class="bborder">&nbsp;</td>'
+    players = ''.join('<td align="center"><table cellpadding="0" cellspacing="0" border="0"><tr><td align="center">'
+                      '<font style="cursor:hand;" title="' + position + ' - ' + name + '">' + str(number) +
+                      '</font></td></tr><tr><td align="center">' + position + '</td></tr></table></td>'
+                      '<td align="center">&nbsp;</td>'
+                      for position, (number, name) in zip(positions, roster))
+    return '<td class="bborder"><table border="0" cellpadding="0" cellspacing="0"><tr>' + players + '</tr></table></td>'
+
+def get_strength(shooter_positions, opponent_positions):
+    '''
+    Determines the strength code of an event from the players on the ice.
+
+    Parameters
+    ----------
+    shooter_positions, opponent_positions : str
+        Positions on the ice for the event team and the opposing team.
+
+    Returns
+    -------
+    str
+        'EV', 'PP', or 'SH'.
+
+    '''
+    skaters = len(shooter_positions.replace('G', ''))
+    opponent_skaters = len(opponent_positions.replace('G', ''))
+    if skaters == opponent_skaters:
+        return 'EV'
+    return 'PP' if skaters > opponent_skaters else 'SH'
+
+def make_shot_description(rng, code, team, opponent, roster, opponent_roster, event_zone):
+    '''
+    Produces the html report description of a shot.
+
+    Parameters
+    ----------
+    rng : random.Random
+        Random number generator.
+    code : str
+        Html report event code: 'SHOT', 'MISS', 'BLOCK', or 'GOAL'.
+    team, opponent : dict
+        The shooting team and the opposing team.
+    roster, opponent_roster : list of (int, str)
+        Rosters of the shooting team and the opposing team.
+    event_zone : str
+        Zone of the shot, from the viewpoint of the team credited with the event.
+
+    Returns
+    -------
+    description : str
+        Description of the shot.
+    shot_type : str or None
+        Live feed shot type, if any.
+
+    '''
+    number, name = rng.choice(roster)
+    shooter = '#' + str(number) + ' ' + name
+    if code == 'SHOT':
+        parts = [team['triCode'] + ' ONGOAL - ' + shooter]
+    elif code == 'BLOCK':
+        blocker_number, blocker_name = rng.choice(opponent_roster)
+        parts = [team['triCode'] + ' ' + shooter + ' BLOCKED BY ' + opponent['triCode'] + ' #' + str(blocker_number) +
+                 ' ' + blocker_name]
+    else:
+        parts = [team['triCode'] + ' ' + shooter]
+    shot_type = None
+    if rng.random() < 0.92:
+        shot_type, html_shot_type = rng.choice(SHOT_TYPES)
+        parts.append(html_shot_type)
+    if code == 'MISS':
+        parts.append(rng.choice(MISS_TYPES))
+    parts.append(event_zone)
+    if code != 'BLOCK':
+        parts.append(str(rng.randint(3, 90)) + ' ft.')
+    description = ', '.join(parts)
+    if (code == 'GOAL') and (rng.random() < 0.9):
+        assists = rng.sample(roster, rng.randint(1, 2))
+        description += '<br>' + ('Assists: ' if len(assists) > 1 else 'Assist: ') + \
+            '; '.join('#' + str(number) + ' ' + name + '(' + str(rng.randint(1, 40)) + ')' for number, name in assists)
+    if rng.random() < 0.003:
+        description += ', Penalty Shot'
+    return description, shot_type
+
+def make_game(game_id='2018020001', n_events=DEFAULT_EVENT_COUNT, shot_share=DEFAULT_SHOT_SHARE,
+              on_ice_shapes=None, overtime=False, seed=0):
+    '''
+    Generates a synthetic game.
+
+    Parameters
+    ----------
+    game_id : str, optional
+        Ten-character game id. Example: '2018020240'. The default is '2018020001'.
+    n_events : int, optional
+        Number of events in the game. The default is DEFAULT_EVENT_COUNT.
+    shot_share : float, optional
+        Fraction of the events that are shots (including blocked shots, misses, and goals). The default is
+        DEFAULT_SHOT_SHARE.
+    on_ice_shapes : dict, optional
+        Pairs of away and home on-ice positions, such as ('CLRDDG', 'CLDDG'), with their relative frequency. If None,
+        uses DEFAULT_ON_ICE_SHAPES. The default is None.
+    overtime : bool, optional
+        If True, the last events of the game take place in overtime. The default is False.
+    seed : int, optional
+        Seed for the random number generator. The default is 0.
+
+    Returns
+    -------
+    live_feed : dict
+        Live feed for the game, in the layout used by the statsapi.
+    html_report : bytes
+        Html play-by-play report for the game.
+
+    '''
+    rng = random.Random(seed)
+    on_ice_shapes = DEFAULT_ON_ICE_SHAPES if on_ice_shapes is None else on_ice_shapes
+    shapes = list(on_ice_shapes)
+    shape_weights = list(on_ice_shapes.values())
+    shot_events = list(SHOT_EVENT_WEIGHTS)
+    other_events = list(OTHER_EVENT_WEIGHTS)
+    rosters = {AWAY_TEAM['id']: make_roster(rng, AWAY_TEAM), HOME_TEAM['id']: make_roster(rng, HOME_TEAM)}
+    n_periods = 4 if overtime else 3
+    events_per_period = max(1, n_events // n_periods)
+
+    plays = []
+    rows = []
+    previous_stoppage = False
+    for idx in range(n_events):
+        period = min(n_periods, idx // events_per_period + 1)
+        # Spread the events of each period evenly, with some jitter, keeping times non-decreasing.
+        period_idx = idx - (period - 1) * events_per_period
+        elapsed = min(PERIOD_SECONDS - 1, int(PERIOD_SECONDS * (period_idx + rng.random()) / (events_per_period + 1)))
+        if plays and plays[-1]['about']['period'] == period:
+            elapsed = max(elapsed, int(plays[-1]['about']['periodTime'][:2]) * 60 +
+                          int(plays[-1]['about']['periodTime'][3:]))
+        minutes, seconds = divmod(elapsed, 60)
+        remaining_minutes, remaining_seconds = divmod(PERIOD_SECONDS - elapsed, 60)
+
+        if previous_stoppage:
+            event_name, code = ('Faceoff', 'FAC')
+        elif rng.random() < shot_share:
+            event_name, code = rng.choices(shot_events, weights=SHOT_EVENT_WEIGHTS.values())[0]
+        else:
+            event_name, code = rng.choices(other_events, weights=OTHER_EVENT_WEIGHTS.values())[0]
+        previous_stoppage = code == 'STOP'
+        is_home = rng.random() < 0.5
+        team, opponent = (HOME_TEAM, AWAY_TEAM) if is_home else (AWAY_TEAM, HOME_TEAM)
+        away_positions, home_positions = rng.choices(shapes, weights=shape_weights)[0]
+        if (code == 'STOP') and (rng.random() < 0.3):
+            away_positions = home_positions = None
+
+        play = {
+            'players': [ {'player': {'id': 8470000 + rng.randint(0, 9999), 'fullName': 'Player'},
+                          'playerType': 'Shooter'} ],
+            'result': {'event': event_name, 'eventCode': 'TOR' + str(idx), 'eventTypeId': code,
+                       'description': event_name},
+            'about': {'eventIdx': idx, 'eventId': idx + 1, 'period': period, 'periodType':
+                      'OVERTIME' if period > 3 else 'REGULAR', 'ordinalNum': PERIOD_ORDINALS[period - 1],
+                      'periodTime': '{:02d}:{:02d}'.format(minutes, seconds),
+                      'periodTimeRemaining': '{:02d}:{:02d}'.format(remaining_minutes, remaining_seconds),
+                      'dateTime': '2018-11-10T00:00:00Z', 'goals': {'away': 0, 'home': 0}},
+            'coordinates': {}
+        }
+        if code != 'STOP':
+            play['team'] = {'id': team['id'], 'name': team['name'], 'link': '/api/v1/teams/' + str(team['id']),
+                            'triCode': team['triCode']}
+            if rng.random() < 0.97:
+                play['coordinates'] = {'x': float(rng.randint(-99, 99)), 'y': float(rng.randint(-42, 42))}
+
+        if code in ('SHOT', 'MISS', 'BLOCK', 'GOAL'):
+            event_zone = rng.choices(ZONES, weights=[0.9, 0.07, 0.03])[0]
+            description, shot_type = make_shot_description(rng, code, team, opponent, rosters[team['id']],
+                                                           rosters[opponent['id']], event_zone)
+            if shot_type is not None:
+                play['result']['secondaryType'] = shot_type
+            if (away_positions is None) or (home_positions is None):
+                strength = 'EV'
+            elif is_home:
+                strength = get_strength(home_positions, away_positions)
+            else:
+                strength = get_strength(away_positions, home_positions)
+        else:
+            number, name = rng.choice(rosters[team['id']])
+            description = team['triCode'] + ' ' + event_name.upper() + ' - #' + str(number) + ' ' + name
+            strength = '&nbsp;'
+        plays.append(play)
+
+        rows.append('<tr id="PL-' + str(idx + 1) + '" class="' + ('evenColor' if idx % 2 else 'oddColor') + '">\n'
+                    '<td align="center" class="+ bborder">' + str(idx + 1) + '</td>\n'
+                    '<td class="+ bborder" align="center">' + str(period) + '</td>\n'
+                    '<td class="+ bborder" align="center">' + strength + '</td>\n'
+                    '<td class="+ bborder" align="center">' + str(minutes) + ':' + '{:02d}'.format(seconds) +
+                    '<br>' + str(remaining_minutes) + ':' + '{:02d}'.format(remaining_seconds) + '</td>\n'
+                    '<td class="+ bborder" align="center">' + code + '</td>\n'
+                    '<td class="+ bborder">' + description + '</td>\n' +
+                    make_on_ice_cell(away_positions, rosters[AWAY_TEAM['id']]) + '\n' +
+                    make_on_ice_cell(home_positions, rosters[HOME_TEAM['id']]) + '\n</tr>')
+
+    players = { 'ID' + str(8470000 + k): {'id': 8470000 + k, 'fullName': 'Player ' + str(k), 'birthDate': '1990-01-01',
+                                          'birthCity': 'City', 'height': '6\' 1"', 'weight': 200,
+                                          'primaryPosition': {'code': 'C', 'name': 'Center'}}
+                for k in range(40) }
+    live_feed = {
+        'copyright': 'Synthetic game',
+        'gamePk': int(game_id),
+        'link': '/api/v1/game/' + game_id + '/feed/live',
+        'metaData': {'wait': 10, 'timeStamp': '20181110_000000'},
+        'gameData': {
+            'game': {'pk': int(game_id), 'season': game_id[:4] + str(int(game_id[:4]) + 1), 'type': 'R'},
+            'datetime': {'dateTime': '2018-11-10T00:00:00Z'},
+            'status': {'abstractGameState': 'Final'},
+            'teams': {'away': AWAY_TEAM, 'home': HOME_TEAM},
+            'players': players,
+            'venue': {'name': VENUE}
+        },
+        'liveData': {
+            'plays': {'allPlays': plays, 'scoringPlays': [], 'penaltyPlays': [], 'playsByPeriod': [],
+                      'currentPlay': plays[-1] if plays else {}},
+            'linescore': {'currentPeriod': n_periods},
+            'boxscore': {'teams': { side: {'players': { key: {'person': value, 'stats': {'timeOnIce': '15:00'}}
+                                                        for key, value in players.items() }}
+                                    for side in ('away', 'home') }},
+            'decisions': {}
+        }
+    }
+    html_report = '<html><head><meta http-equiv="Content-Type" content="text/html; charset=utf-8"></head><body>' + \
+        '<table border="0" cellpadding="0" cellspacing="0" width="100%">' + '\n'.join(rows) + '</table></body></html>'
+    return live_feed, html_report.encode('utf-8')
+
+def make_season(season='20182019', n_games=1271, **kwargs):
+    '''
+    Generates synthetic games for a season, one at a time.
+
+    Parameters
+    ----------
+    season : str, optional
+        The season. Example: '20182019' for the 2018-19 season. The default is '20182019'.
+    n_games : int, optional
+        Number of games. The default is 1271, the number of regular season games in 2018-19.
+    **kwargs
+        Passed on to make_game. Each game is given its own seed.
+
+    Yields
+    ------
+    live_feed_link : str
+        The live feed link of the game.
+    live_feed : dict
+        Live feed for the game.
+    html_report : bytes
+        Html play-by-play report for the game.
+
+    '''
+    seed = kwargs.pop('seed', 0)
+    for k in range(n_games):
+        game_id = season[:4] + '02' + '{:04d}'.format(k + 1)
+        live_feed, html_report = make_game(game_id, seed=seed * n_games + k, **kwargs)
+        yield '/api/v1/game/' + game_id + '/feed/live', live_feed, html_report
+
+def write_game(folder, game_id, live_feed, html_report):
+    '''
+    Saves a synthetic game in the layout used by produce_game_frames for raw files, so that the pipeline can be run
+    on it without downloading anything.
+
+    Parameters
+    ----------
+    folder : pathlib.Path
+        Folder playing the role of the working directory of produce_game_frames.
+    game_id : str
+        Ten-character game id.
+    live_feed : dict
+        Live feed for the game.
+    html_report : bytes
+        Html play-by-play report for the game.
+
+    Returns
+    -------
+    None.
+
+    '''
+    import gzip
+    feed_path = folder.joinpath('data/raw/feeds/livefeed_' + game_id + '.json')
+    feed_path.parent.mkdir(parents=True, exist_ok=True)
+    with feed_path.open('w') as outfile:
+        json.dump(live_feed, outfile)
+    html_path = folder.joinpath('data/raw/html/htmlreport_' + game_id + '.html.gz')
+    html_path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(str(html_path), 'wb') as outfile:
+        outfile.write(html_report)